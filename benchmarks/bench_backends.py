@@ -0,0 +1,165 @@
+"""Latency and agreement of detection backends: a .pt model against its ONNX/OpenVINO exports.
+
+Samples frames evenly from every clip in data/videos, decodes them once and runs
+YOLODetector.detect on them with each model. The first model is the reference:
+for the others, ball and hoop boxes are compared with its boxes per frame, as the
+share of frames where both agree on whether the object is there, the share of the
+reference's boxes matched at IoU >= --iou, and the mean IoU of those matched.
+
+Usage:
+  python benchmarks/bench_backends.py --models best.pt best.onnx best_openvino_model [--frames-per-clip 50]
+  python benchmarks/bench_backends.py --models best.pt best_int8.onnx --threads 4 --save backends.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from models import YOLODetector
+from processors import find_videos
+
+PERCENTILES = (50, 95, 99)
+OBJECTS = ("ball", "hoop")
+
+def sample_frames(video_path, count):
+    """Up to count frames spread evenly over the clip"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {video_path}")
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        wanted = set(np.linspace(0, max(total - 1, 0), min(count, total) or count).astype(int).tolist())
+        frames = []
+        frame_num = 0
+        while len(frames) < len(wanted):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame_num in wanted:
+                frames.append(frame)
+            frame_num += 1
+        return frames
+    finally:
+        cap.release()
+
+def iou(a, b):
+    inter_w = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    inter_h = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = inter_w * inter_h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+def agreement(reference, detections, iou_thresh):
+    """Per object: presence agreement, share of reference boxes matched and mean matched IoU"""
+    summary = {}
+    for index, name in enumerate(OBJECTS):
+        pairs = [(ref[index], det[index]) for ref, det in zip(reference, detections)]
+        present = [(ref, det) for ref, det in pairs if ref is not None]
+        overlaps = [iou(ref, det) for ref, det in present if det is not None]
+        matched = [value for value in overlaps if value >= iou_thresh]
+        summary[name] = {
+            "presence": round(sum((ref is None) == (det is None) for ref, det in pairs) / len(pairs), 4) if pairs else None,
+            "reference_boxes": len(present),
+            "matched": round(len(matched) / len(present), 4) if present else None,
+            "mean_iou": round(float(np.mean(matched)), 4) if matched else None,
+        }
+    return summary
+
+def run_model(model_path, clips, threads=None):
+    """Detections for every sampled frame and per-frame latencies in ms"""
+    load_start = time.perf_counter()
+    yolo_detector = YOLODetector(model_path, threads=threads)
+    load_sec = time.perf_counter() - load_start
+    # One untimed run at the clips' frame size, which the load-time warm-up doesn't cover
+    first = next((frames[0] for frames in clips.values() if frames), None)
+    if first is not None:
+        yolo_detector.detect(first)
+    detections = []
+    latencies = []
+    for frames in clips.values():
+        for frame in frames:
+            start = time.perf_counter_ns()
+            detections.append(yolo_detector.detect(frame))
+            latencies.append((time.perf_counter_ns() - start) / 1e6)
+    return detections, latencies, load_sec
+
+def run(args):
+    clips = {}
+    for video_path in find_videos(args.videos):
+        clips[os.path.basename(video_path)] = sample_frames(video_path, args.frames_per_clip)
+    frames = sum(len(frames) for frames in clips.values())
+    print(f"{frames} frames from {len(clips)} clips\n")
+
+    print(f"{'model':>24} {'load s':>7} {'fps':>6} {'p50/p95/p99 ms':>22} "
+          + " ".join(f"{name + ' presence/matched/IoU':>28}" for name in OBJECTS))
+    results = []
+    reference = None
+    for model_path in args.models:
+        detections, latencies, load_sec = run_model(model_path, clips, args.threads)
+        values = np.percentile(latencies, PERCENTILES) if latencies else [0.0] * len(PERCENTILES)
+        mean_ms = float(np.mean(latencies)) if latencies else 0.0
+        result = {
+            "model": model_path,
+            "load_sec": round(load_sec, 3),
+            "fps": round(1000 / mean_ms, 2) if mean_ms else 0.0,
+            "latency_ms": {f"p{p}": round(float(v), 3) for p, v in zip(PERCENTILES, values)},
+        }
+        result["latency_ms"]["mean"] = round(mean_ms, 3)
+        if reference is None:
+            reference = detections
+        else:
+            result["agreement"] = agreement(reference, detections, args.iou)
+        results.append(result)
+
+        latency = result["latency_ms"]
+        print(f"{os.path.basename(model_path.rstrip('/'))[:24]:>24} {load_sec:>7.2f} {result['fps']:>6.1f} "
+              f"{latency['p50']:>6.2f}/{latency['p95']:>7.2f}/{latency['p99']:>7.2f} "
+              + " ".join(_format_agreement(result.get("agreement", {}).get(name)) for name in OBJECTS))
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "threads": args.threads,
+            "opencv": cv2.__version__,
+            "frames": frames,
+            "iou": args.iou,
+        },
+        "models": results,
+    }
+
+def _format_agreement(summary):
+    if summary is None:
+        return f"{'reference':>28}"
+    text = "/".join("-" if summary[key] is None else f"{summary[key]:.3f}"
+                    for key in ("presence", "matched", "mean_iou"))
+    return f"{text:>28}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", default="data/videos", help="Folder of videos (default: data/videos)")
+    parser.add_argument("--models", nargs="+", default=["best.pt"],
+                        help="Models to compare, the first being the reference (default: best.pt)")
+    parser.add_argument("--frames-per-clip", type=int, default=50,
+                        help="Frames sampled evenly from each clip (default: 50)")
+    parser.add_argument("--threads", type=int, help="Inference threads of the ONNX/OpenVINO backends")
+    parser.add_argument("--iou", type=float, default=0.5,
+                        help="IoU at which a box matches the reference's (default: 0.5)")
+    parser.add_argument("--save", help="Write the results to a JSON file")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.save}")
+
+if __name__ == "__main__":
+    main()
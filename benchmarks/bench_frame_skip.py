@@ -0,0 +1,101 @@
+"""Accuracy of frame skipping with motion-model prediction against full detection.
+
+Runs full detection over every video once (through the detection cache, so reruns
+are cheap), then replays each video's detections with a FrameSkipper standing in
+for the detector, as the analyzer does with a batch size of 1. Skipped frames get
+predicted boxes, and the results are compared with full detection: made/attempted,
+the share of frames that still need the detector, and the error of the predicted
+ball centers.
+
+Usage: python benchmarks/bench_frame_skip.py [--videos data/videos] [--model best.pt] [--max-skip 1 2 3]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from models import DetectionCache, YOLODetector
+from processors import FrameSkipper, ShotDetector, VideoAnalyzer, find_videos
+from processors.video_index import VideoIndex
+
+def replay(track, timestamps, fps, frame_skipper=None):
+    """Score a video from its full detections, optionally skipping frames.
+
+    Returns (made, attempted, detected_frames, ball center errors on predicted frames,
+    frames where the ball was predicted but not detected or the other way round).
+    """
+    shot_detector = ShotDetector(nominal_fps=fps)
+    detected = 0
+    errors = []
+    mismatches = 0
+    for index in range(min(len(track), len(timestamps))):
+        timestamp = float(timestamps[index])
+        ball_bbox, hoop_bbox = track.get(index)
+        if frame_skipper is None or frame_skipper.should_detect(shot_detector, timestamp):
+            detected += 1
+            if frame_skipper:
+                frame_skipper.observe(timestamp, ball_bbox, hoop_bbox)
+        else:
+            true_ball = ball_bbox
+            ball_bbox, hoop_bbox = frame_skipper.predict(timestamp)
+            if (ball_bbox is None) != (true_ball is None):
+                mismatches += 1
+            elif ball_bbox is not None:
+                errors.append(np.hypot((ball_bbox[0] + ball_bbox[2] - true_ball[0] - true_ball[2]) / 2,
+                                       (ball_bbox[1] + ball_bbox[3] - true_ball[1] - true_ball[3]) / 2))
+        shot_detector.update(ball_bbox[:4] if ball_bbox else None,
+                             hoop_bbox[:4] if hoop_bbox else None, index + 1, timestamp)
+    made, attempted = shot_detector.get_stats()
+    return made, attempted, detected, errors, mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", default="data/videos", help="Folder of videos (default: data/videos)")
+    parser.add_argument("--model", default="best.pt", help="YOLO model path (default: best.pt)")
+    parser.add_argument("--max-skip", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--cache-dir", help="Detection cache directory")
+    args = parser.parse_args()
+
+    yolo_detector = YOLODetector(args.model)
+    detection_cache = DetectionCache(args.cache_dir)
+    analyzer = VideoAnalyzer(yolo_detector, detection_cache=detection_cache)
+
+    totals = {max_skip: [0, 0, 0, [], 0] for max_skip in [0] + args.max_skip}
+    total_frames = 0
+    print(f"{'video':>16} {'skip':>4} {'made/att':>9} {'detected':>9} {'err px':>7} {'p95 px':>7} {'lost':>5}")
+    for video_path in find_videos(args.videos):
+        with contextlib.redirect_stdout(io.StringIO()):  # the shot detector is chatty
+            result = analyzer.analyze(video_path)
+            track = detection_cache.load(detection_cache.key_for(video_path, yolo_detector))
+            timestamps = VideoIndex.load_or_build(video_path).timestamps_ms / 1000.0
+            runs = {max_skip: replay(track, timestamps, result["source_fps"],
+                                     FrameSkipper(max_skip) if max_skip else None)
+                    for max_skip in totals}
+        total_frames += len(track)
+
+        for max_skip, (made, attempted, detected, errors, mismatches) in runs.items():
+            total = totals[max_skip]
+            total[0] += made
+            total[1] += attempted
+            total[2] += detected
+            total[3] += errors
+            total[4] += mismatches
+            mean_error = f"{np.mean(errors):.1f}" if errors else "-"
+            p95_error = f"{np.percentile(errors, 95):.1f}" if errors else "-"
+            print(f"{result['video'][:16]:>16} {max_skip:>4} {made:>4}/{attempted:<4} "
+                  f"{detected / len(track):>8.0%} {mean_error:>7} {p95_error:>7} {mismatches:>5}")
+
+    print()
+    print("Totals (skip 0 is full detection; 'lost' counts predicted frames where the")
+    print("prediction and full detection disagree on whether there is a ball at all)")
+    for max_skip, (made, attempted, detected, errors, mismatches) in totals.items():
+        mean_error = f"{np.mean(errors):.1f}" if errors else "-"
+        print(f"  skip {max_skip}: {made}/{attempted} made, detector on {detected / max(total_frames, 1):.0%} "
+              f"of frames, mean ball error {mean_error} px, lost {mismatches}")
+
+if __name__ == "__main__":
+    main()
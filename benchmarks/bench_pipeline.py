@@ -0,0 +1,246 @@
+"""Accuracy and throughput regression benchmark of the full pipeline over data/videos.
+
+Runs every clip through decode, YOLODetector.detect, ShotDetector.update and
+rendering (FrameProcessor.render_frame, with an offscreen Qt stats panel), one frame
+at a time as in the GUI, without the detection cache. Frames are decoded ahead by a
+FrameDecoder as in the GUI, so decode latency is the time spent waiting for the
+next frame. Records per-stage latency
+percentiles, end-to-end frames/sec, peak RSS and made/attempted per clip against
+the labels in data/ground_truth.json.
+
+With --compare, the run is checked against a saved baseline and the script exits
+with status 1 if total throughput drops by more than --max-regression or any clip's
+made/attempted changes.
+
+Usage:
+  python benchmarks/bench_pipeline.py [--videos data/videos] [--model best.pt] [--imgsz 640] [--save baseline.json]
+  python benchmarks/bench_pipeline.py --decoder pyav --compare baseline.json
+  python benchmarks/bench_pipeline.py --compare baseline.json [--max-regression 0.1]
+  python benchmarks/bench_pipeline.py --compare baseline.json --current run.json   # no new run
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from models import BallTracker, YOLODetector
+from processors import END_OF_VIDEO, FrameDecoder, FrameProcessor, ShotDetector, find_videos, load_ground_truth
+
+STAGES = ("decode", "detect", "shot", "render")
+PERCENTILES = (50, 95, 99)
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it can't be read"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def make_frame_processor(yolo_detector):
+    """FrameProcessor with the GUI's rendering components, on an offscreen Qt platform"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from ui.stats_display import StatsDisplay
+
+    app = QApplication.instance() or QApplication([])
+    frame_processor = FrameProcessor(None)
+    frame_processor.set_components(None, None, yolo_detector, BallTracker(), StatsDisplay())
+    return app, frame_processor
+
+def run_clip(video_path, yolo_detector, frame_processor, max_frames=None, decoder_backend=None):
+    """Run one clip through every stage; returns its result and per-stage latencies in ns"""
+    decoder = FrameDecoder(video_path, backend=decoder_backend)
+    if not decoder.open():
+        raise IOError(f"Could not open video: {video_path}")
+    shot_detector = ShotDetector(nominal_fps=decoder.fps)
+    frame_processor.shot_detector = shot_detector
+    frame_processor.ball_tracker.clear_trail()
+    latencies = {stage: [] for stage in STAGES}
+
+    frame_num = 0
+    start = time.perf_counter_ns()
+    try:
+        decoder.start()
+        while max_frames is None or frame_num < max_frames:
+            t0 = time.perf_counter_ns()
+            decoded = decoder.read()
+            t1 = time.perf_counter_ns()
+            if decoded is END_OF_VIDEO:
+                break
+            frame_num, timestamp, frame = decoded.frame_num, decoded.timestamp, decoded.image
+            ball_bbox, hoop_bbox = yolo_detector.detect(frame)
+            t2 = time.perf_counter_ns()
+            shot_status, stats, arc_angle, inst_speed, avg_speed, hoop_dist, shot_outcome = shot_detector.update(
+                ball_bbox[:4] if ball_bbox else None, hoop_bbox[:4] if hoop_bbox else None, frame_num, timestamp)
+            t3 = time.perf_counter_ns()
+            frame_processor.render_frame(frame, {
+                "frame_num": frame_num, "ball_bbox": ball_bbox, "hoop_bbox": hoop_bbox,
+                "shot_status": shot_status, "stats": stats, "shot_outcome": shot_outcome,
+            })
+            t4 = time.perf_counter_ns()
+            decoder.release(decoded)
+            for stage, elapsed in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+                latencies[stage].append(elapsed)
+    finally:
+        decoder.stop()
+    elapsed_sec = (time.perf_counter_ns() - start) / 1e9
+
+    made, attempted = shot_detector.get_stats()
+    return {
+        "video": os.path.basename(video_path),
+        "frames": frame_num,
+        "elapsed_sec": round(elapsed_sec, 3),
+        "fps": round(frame_num / elapsed_sec, 2) if elapsed_sec > 0 else 0.0,
+        "made": made,
+        "attempted": attempted,
+        "stages_ms": summarize_latencies(latencies),
+    }, latencies
+
+def summarize_latencies(latencies):
+    """p50/p95/p99 and mean per stage, in milliseconds"""
+    summary = {}
+    for stage, values in latencies.items():
+        if not values:
+            continue
+        values_ms = np.asarray(values) / 1e6
+        summary[stage] = {f"p{p}": round(float(v), 3) for p, v in zip(PERCENTILES, np.percentile(values_ms, PERCENTILES))}
+        summary[stage]["mean"] = round(float(values_ms.mean()), 3)
+    return summary
+
+def run(args):
+    truth = load_ground_truth(args.ground_truth) if os.path.exists(args.ground_truth) else {}
+    yolo_detector = YOLODetector(args.model, imgsz=args.imgsz)
+    app, frame_processor = make_frame_processor(yolo_detector)
+
+    clips = []
+    all_latencies = {stage: [] for stage in STAGES}
+    print(f"{'video':>16} {'frames':>6} {'fps':>6} {'made/att':>9} {'truth':>9} "
+          + " ".join(f"{stage + ' p50/p95/p99 ms':>24}" for stage in STAGES))
+    for video_path in find_videos(args.videos):
+        clip, latencies = run_clip(video_path, yolo_detector, frame_processor, args.max_frames, args.decoder)
+        label = truth.get(clip["video"])
+        if label is not None and "shots" in label:
+            label = {"made": sum(1 for shot in label["shots"] if shot["made"]), "attempted": len(label["shots"])}
+        clip["truth"] = label
+        clips.append(clip)
+        for stage in STAGES:
+            all_latencies[stage] += latencies[stage]
+
+        truth_text = f"{label['made']}/{label['attempted']}" if label else "-"
+        print(f"{clip['video'][:16]:>16} {clip['frames']:>6} {clip['fps']:>6.1f} "
+              f"{clip['made']:>4}/{clip['attempted']:<4} {truth_text:>9} "
+              + " ".join(_format_stage(clip["stages_ms"].get(stage)) for stage in STAGES))
+
+    frames = sum(clip["frames"] for clip in clips)
+    elapsed = sum(clip["elapsed_sec"] for clip in clips)
+    labelled = [clip for clip in clips if clip["truth"]]
+    return {
+        "environment": {
+            "model": args.model,
+            "imgsz": yolo_detector.inference_size(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "decoder": args.decoder or os.environ.get("SHOTTRACKER_DECODER", "opencv"),
+            "max_frames": args.max_frames,
+        },
+        "total": {
+            "frames": frames,
+            "elapsed_sec": round(elapsed, 3),
+            "fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages_ms": summarize_latencies(all_latencies),
+            "labelled_clips": len(labelled),
+            "clips_matching_truth": sum(1 for clip in labelled
+                                        if (clip["made"], clip["attempted"]) ==
+                                        (clip["truth"]["made"], clip["truth"]["attempted"])),
+        },
+        "clips": clips,
+    }
+
+def compare(current, baseline, max_regression):
+    """Print differences with a baseline run; returns the list of failures"""
+    failures = []
+    base_fps, fps = baseline["total"]["fps"], current["total"]["fps"]
+    change = (fps - base_fps) / base_fps if base_fps else 0.0
+    print(f"Throughput: {fps:.1f} frames/sec vs {base_fps:.1f} baseline ({change:+.1%})")
+    if change < -max_regression:
+        failures.append(f"throughput dropped {-change:.1%}, more than the allowed {max_regression:.0%}")
+
+    for stage in STAGES:
+        base_stage = baseline["total"]["stages_ms"].get(stage)
+        stage_ms = current["total"]["stages_ms"].get(stage)
+        if base_stage and stage_ms:
+            print(f"  {stage:>6}: p50 {stage_ms['p50']:.2f} ms vs {base_stage['p50']:.2f}, "
+                  f"p95 {stage_ms['p95']:.2f} vs {base_stage['p95']:.2f}, p99 {stage_ms['p99']:.2f} vs {base_stage['p99']:.2f}")
+    base_rss, rss = baseline["total"].get("peak_rss_mb"), current["total"].get("peak_rss_mb")
+    if base_rss and rss:
+        print(f"  peak RSS {rss:.0f} MB vs {base_rss:.0f} MB")
+
+    base_clips = {clip["video"]: clip for clip in baseline["clips"]}
+    for clip in current["clips"]:
+        base_clip = base_clips.get(clip["video"])
+        if base_clip is None:
+            print(f"  {clip['video']}: not in the baseline")
+        elif (clip["made"], clip["attempted"]) != (base_clip["made"], base_clip["attempted"]):
+            failures.append(f"{clip['video']}: {clip['made']}/{clip['attempted']} made, "
+                            f"baseline {base_clip['made']}/{base_clip['attempted']}")
+    return failures
+
+def _format_stage(stage_ms):
+    if not stage_ms:
+        return f"{'-':>24}"
+    return f"{stage_ms['p50']:>7.2f}/{stage_ms['p95']:>7.2f}/{stage_ms['p99']:>7.2f}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", default="data/videos", help="Folder of videos (default: data/videos)")
+    parser.add_argument("--model", default="best.pt", help="YOLO model path (default: best.pt)")
+    parser.add_argument("--imgsz", type=int, help="Inference size (default: the model's own)")
+    parser.add_argument("--decoder", choices=["opencv", "pyav"],
+                        help="Video decoder (default: $SHOTTRACKER_DECODER or opencv)")
+    parser.add_argument("--ground-truth", default="data/ground_truth.json",
+                        help="Labels per clip (default: data/ground_truth.json)")
+    parser.add_argument("--max-frames", type=int, help="Stop each clip after this many frames")
+    parser.add_argument("--save", help="Write this run's results to a JSON file")
+    parser.add_argument("--compare", help="Baseline results JSON to check this run against")
+    parser.add_argument("--current", help="With --compare, check these saved results instead of running")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="Largest allowed drop in total frames/sec, as a fraction (default: 0.1)")
+    args = parser.parse_args()
+
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        current = run(args)
+        total = current["total"]
+        print(f"\nTotal: {total['frames']} frames at {total['fps']:.1f} frames/sec, "
+              f"peak RSS {total['peak_rss_mb']} MB, "
+              f"{total['clips_matching_truth']}/{total['labelled_clips']} labelled clips match")
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump(current, f, indent=2)
+            print(f"Results written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        failures = compare(current, baseline, args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION: {failure}")
+        return 1 if failures else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
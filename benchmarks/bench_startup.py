@@ -0,0 +1,97 @@
+"""Startup time of the GUI: from launching the process to the main window's first paint.
+
+Each run starts a fresh interpreter, so imports are timed cold (apart from the OS
+file cache), and records when the app's modules are imported, when MainApp is
+constructed, when the window is first painted and when the detection model is
+ready. Run it from the folder the app is normally started in, so best.pt and the
+fonts are found the same way.
+
+Usage:
+  python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+MILESTONES = ("imported", "constructed", "first_paint", "model_ready")
+
+def child():
+    """Start the app, print the time of each milestone as JSON and quit"""
+    times = {}
+    sys.argv = sys.argv[:1]
+    sys.path.insert(0, SRC_DIR)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtCore import QEvent, QObject, QTimer
+    from PyQt5.QtWidgets import QApplication
+    import main as app_main
+    times["imported"] = time.time()
+
+    app = QApplication(sys.argv)
+    window = app_main.MainApp()
+    times["constructed"] = time.time()
+
+    def finish():
+        if "first_paint" in times and "model_ready" in times:
+            app.quit()
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and "first_paint" not in times:
+                times["first_paint"] = time.time()
+                QTimer.singleShot(0, finish)
+            return False
+
+    def model_ready(*args):
+        times["model_ready"] = time.time()
+        finish()
+
+    def watch_model():
+        # The loader may only be created once the window is up
+        model_loader = getattr(window, "model_loader", None)
+        detector = getattr(window, "yolo_detector", None)
+        if model_loader is not None and model_loader.is_loading():
+            model_loader.loaded.connect(model_ready)
+        elif detector is not None and detector.is_loaded():
+            # Loaded before the event loop got to it
+            model_ready()
+        else:
+            QTimer.singleShot(1, watch_model)
+
+    watcher = PaintWatcher()
+    window.installEventFilter(watcher)
+    window.show()
+    QTimer.singleShot(0, watch_model)
+    QTimer.singleShot(120000, app.quit)
+    app.exec_()
+    print(json.dumps(times))
+
+def run_once():
+    launched = time.time()
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                            capture_output=True, text=True, check=True).stdout
+    times = json.loads(output.strip().splitlines()[-1])
+    return {name: times[name] - launched for name in MILESTONES if name in times}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Number of app launches (default: 5)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    runs = [run_once() for _ in range(args.runs)]
+    print(f"{'milestone':>12} {'median s':>9} {'min s':>7} {'max s':>7}")
+    for name in MILESTONES:
+        values = [run[name] for run in runs if name in run]
+        if values:
+            print(f"{name:>12} {statistics.median(values):>9.3f} {min(values):>7.3f} {max(values):>7.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Micro-benchmark of BallTracker.draw_trail against the original full-frame implementation.
+
+Usage: python benchmarks/bench_trail.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from models.ball_tracker import BallTracker
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "4K": (3840, 2160)}
+
+def draw_trail_full_frame(tracker, frame):
+    """The original implementation: one full-frame copy and blend per trail dot"""
+    if not tracker.show_trail or not tracker.positions:
+        return frame
+
+    annotated_frame = frame.copy()
+    for i, (pos, intensity) in enumerate(tracker.positions):
+        fade = intensity * (i+1) / len(tracker.positions)
+        size = int(5 + (8 * fade))
+        alpha = int(180 * fade)
+        overlay = annotated_frame.copy()
+        cv2.circle(overlay, pos, size, tracker.trail_color, -1)
+        cv2.addWeighted(overlay, alpha/255, annotated_frame, 1 - alpha/255, 0, annotated_frame)
+    return annotated_frame
+
+def make_tracker(width, height, rng):
+    """A full-length trail along a parabola, with the odd point near the frame edge"""
+    tracker = BallTracker()
+    xs = np.linspace(width * 0.1, width * 0.9, tracker.max_trail_length)
+    ys = height * 0.8 - (height * 0.6) * np.sin(np.linspace(0, np.pi, tracker.max_trail_length))
+    for x, y in zip(xs, ys):
+        tracker.add_position((int(x), int(y)))
+    tracker.add_position((width - 3, int(rng.integers(0, height))))
+    return tracker
+
+def time_per_frame(draw, tracker, frame, iterations):
+    # Drawing repeatedly onto the same frame costs the same as drawing onto fresh ones
+    draw(tracker, frame)  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        draw(tracker, frame)
+    return (time.perf_counter() - start) / iterations * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'resolution':>10} {'full-frame ms':>14} {'roi ms':>8} {'speedup':>8} {'max diff':>9}")
+    for name, (width, height) in RESOLUTIONS.items():
+        frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        tracker = make_tracker(width, height, rng)
+
+        expected = draw_trail_full_frame(tracker, frame)
+        actual = tracker.draw_trail(frame.copy())
+        max_diff = int(np.abs(expected.astype(np.int16) - actual.astype(np.int16)).max())
+
+        full_ms = time_per_frame(draw_trail_full_frame, tracker, frame.copy(), args.iterations)
+        roi_ms = time_per_frame(lambda t, f: t.draw_trail(f), tracker, frame.copy(), args.iterations)
+        print(f"{name:>10} {full_ms:>14.3f} {roi_ms:>8.3f} {full_ms / max(roi_ms, 1e-9):>7.1f}x {max_diff:>9}")
+
+if __name__ == "__main__":
+    main()
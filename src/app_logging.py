@@ -0,0 +1,137 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "suppressed"}
+
+# The running QueueListener, so setup_logging can be called again
+_listener = None
+# Arguments of the last setup_logging call, for worker processes to repeat it
+_config = None
+
+class RateLimitFilter(logging.Filter):
+    """Lets each message through at most `rate` times a second, after a burst of `burst`.
+
+    Messages are told apart by logger, level and format string, so a message logged
+    with %-style arguments is limited however its values change. The first record let
+    through after some were dropped carries the number dropped as record.suppressed.
+    Warnings and errors are limited too: a failure on every frame is one message.
+    """
+    def __init__(self, rate=1.0, burst=10, max_keys=1000):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> [tokens, last refill time, suppressed count]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    # Messages formatted before logging never repeat; don't keep them forever
+                    self._buckets.clear()
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            record.suppressed, bucket[2] = bucket[2], 0
+        return True
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record):
+        text = super().format(record)
+        if getattr(record, "suppressed", 0):
+            text += f" ({record.suppressed} similar messages suppressed)"
+        return text
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any extra={...} fields of the record alongside the message"""
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        entry.update((name, value) for name, value in vars(record).items() if name not in _RECORD_ATTRIBUTES)
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Leave formatting to the listener thread; only resolve what can't cross threads
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def setup_logging(level=None, log_format=None, rate=1.0, burst=10, stream=None):
+    """Route all logging through a queue to a background thread writing to stderr.
+
+    Logging calls only put the record on the queue, so a slow or blocked stderr never
+    holds up the frame loop. level defaults to SHOTTRACKER_LOG_LEVEL, else INFO;
+    log_format ("text" or "json") to SHOTTRACKER_LOG_FORMAT, else text. Each message
+    is rate limited by RateLimitFilter(rate, burst) before it's queued.
+    """
+    global _listener, _config
+    level = level or os.environ.get("SHOTTRACKER_LOG_LEVEL", "INFO")
+    log_format = log_format or os.environ.get("SHOTTRACKER_LOG_FORMAT", "text")
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+        if not isinstance(level, int):
+            raise ValueError(f"Unknown log level: {level}")
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    handler = _QueueHandler(queue.SimpleQueue())
+    handler.addFilter(RateLimitFilter(rate, burst))
+
+    root = logging.getLogger()
+    stop_logging()
+    for existing in [h for h in root.handlers if isinstance(h, _QueueHandler)]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(handler.queue, output)
+    _listener.start()
+    _config = {"level": level, "log_format": log_format, "rate": rate, "burst": burst}
+    return _listener
+
+def logging_config():
+    """Keyword arguments of the last setup_logging call, or None if it wasn't called"""
+    return dict(_config) if _config else None
+
+def stop_logging():
+    """Write out any queued records and stop the logging thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
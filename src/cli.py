@@ -0,0 +1,308 @@
+import argparse
+import functools
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+def _print_video_result(result):
+    if "error" in result:
+        print(f"Skipping {result['path']}: {result['error']}", file=sys.stderr)
+        return
+    source = " from cached detections" if result["cached_detections"] else ""
+    print(f"{result['video']}: {result['made']}/{result['attempted']} made, "
+          f"{result['frames']} frames in {result['elapsed_sec']:.2f}s "
+          f"({result['processing_fps']:.1f} frames/sec{source})", file=sys.stderr)
+    for station in result.get("stations", []):
+        print(f"  station {station['station']} (hoop at {station['hoop_bbox']}): "
+              f"{station['made']}/{station['attempted']} made", file=sys.stderr)
+
+def _load_shot_params(args):
+    """Shot detection parameters from --shot-params, {} for the defaults or None if unreadable"""
+    from processors import load_shot_params
+
+    if not args.shot_params:
+        return {}
+    try:
+        return load_shot_params(args.shot_params)
+    except (OSError, ValueError) as e:
+        print(f"Could not load shot parameters: {e}", file=sys.stderr)
+        return None
+
+def _detector_config(args):
+    return {
+        "model_path": args.model,
+        "ball_conf": args.ball_conf,
+        "hoop_conf": args.hoop_conf,
+        "imgsz": args.imgsz,
+        "batch_size": args.batch_size,
+        "cache_dir": args.cache_dir,
+        "use_cache": not args.no_cache,
+        "roi_interval": args.roi_interval,
+        "max_skip": args.max_skip,
+        "kalman": not args.no_kalman,
+        "stations": args.stations,
+        "decoder": args.decoder,
+        "decoder_threads": args.decoder_threads,
+    }
+
+def cmd_analyze(args):
+    """Analyze one or more videos headlessly and write per-shot results"""
+    # Imported here so `--help` doesn't pay for loading torch
+    from models import YOLODetector, DetectionCache, KalmanBallTracker
+    from processors import (FrameSkipper, MultiStationTracker, RoiScheduler, ShotDetector, VideoAnalyzer,
+                            write_results)
+
+    shot_params = _load_shot_params(args)
+    if shot_params is None:
+        return 1
+    shot_detector_factory = functools.partial(ShotDetector, **shot_params)
+    yolo_detector = YOLODetector(args.model, imgsz=args.imgsz)
+    yolo_detector.ball_conf_thresh = args.ball_conf
+    yolo_detector.hoop_conf_thresh = args.hoop_conf
+    detection_cache = None if args.no_cache else DetectionCache(args.cache_dir)
+    roi_scheduler = RoiScheduler(args.roi_interval) if args.roi_interval > 0 else None
+    frame_skipper = FrameSkipper(args.max_skip) if args.max_skip > 0 else None
+    kalman_tracker = None if args.no_kalman else KalmanBallTracker()
+    station_tracker = None
+    if args.stations > 0:
+        station_tracker = MultiStationTracker(shot_detector_factory=shot_detector_factory,
+                                              kalman_tracker_factory=None if args.no_kalman else KalmanBallTracker,
+                                              max_stations=args.stations)
+    analyzer = VideoAnalyzer(yolo_detector, shot_detector_factory=shot_detector_factory,
+                             batch_size=args.batch_size, detection_cache=detection_cache,
+                             roi_scheduler=roi_scheduler, frame_skipper=frame_skipper,
+                             kalman_tracker=kalman_tracker, station_tracker=station_tracker,
+                             decoder_backend=args.decoder, decoder_threads=args.decoder_threads)
+
+    results = []
+    total_frames = 0
+    total_elapsed = 0.0
+    for video_path in args.videos:
+        try:
+            result = analyzer.analyze(video_path)
+        except IOError as e:
+            print(f"Skipping {video_path}: {e}", file=sys.stderr)
+            continue
+
+        results.append(result)
+        total_frames += result["frames"]
+        total_elapsed += result["elapsed_sec"]
+        _print_video_result(result)
+
+    if not results:
+        print("No videos analyzed", file=sys.stderr)
+        return 1
+
+    write_results(results, args.output, args.format)
+    if total_elapsed > 0:
+        print(f"Total: {total_frames} frames in {total_elapsed:.2f}s "
+              f"({total_frames / total_elapsed:.1f} frames/sec)", file=sys.stderr)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+def cmd_batch(args):
+    """Analyze every video in a folder across a process pool and write a session report"""
+    from processors import analyze_videos, find_videos, write_results
+
+    if not os.path.isdir(args.folder):
+        print(f"Not a folder: {args.folder}", file=sys.stderr)
+        return 1
+    video_paths = find_videos(args.folder)
+    if not video_paths:
+        print(f"No video files found in {args.folder}", file=sys.stderr)
+        return 1
+    shot_params = _load_shot_params(args)
+    if shot_params is None:
+        return 1
+
+    detector_config = dict(_detector_config(args), shot_params=shot_params)
+    results, session = analyze_videos(video_paths, detector_config, workers=args.workers,
+                                      torch_threads=args.torch_threads, on_result=_print_video_result)
+    write_results(results, args.output, args.format, session=session)
+
+    print(f"Session: {session['made']}/{session['attempted']} made across {session['videos']} videos, "
+          f"{session['frames']} frames in {session['elapsed_sec']:.2f}s with {session['workers']} workers "
+          f"({session['processing_fps']:.1f} frames/sec)", file=sys.stderr)
+    print(f"Report written to {args.output}", file=sys.stderr)
+    return 0 if session["failed"] == 0 else 1
+
+def cmd_calibrate(args):
+    """Search shot detection parameters for the best match with labelled videos"""
+    import json
+    import numpy as np
+    from models import YOLODetector, DetectionCache, KalmanBallTracker
+    from processors import (FrameSkipper, RoiScheduler, VideoAnalyzer, calibrate, load_ground_truth,
+                            parse_grid, save_shot_params)
+
+    try:
+        truth = load_ground_truth(args.ground_truth)
+        grid = parse_grid(args.param)
+    except (OSError, ValueError) as e:
+        print(f"Could not set up calibration: {e}", file=sys.stderr)
+        return 1
+
+    yolo_detector = YOLODetector(args.model, imgsz=args.imgsz)
+    yolo_detector.ball_conf_thresh = args.ball_conf
+    yolo_detector.hoop_conf_thresh = args.hoop_conf
+    analyzer = VideoAnalyzer(yolo_detector, batch_size=args.batch_size, detection_cache=DetectionCache(args.cache_dir),
+                             roi_scheduler=RoiScheduler(args.roi_interval) if args.roi_interval > 0 else None,
+                             frame_skipper=FrameSkipper(args.max_skip) if args.max_skip > 0 else None,
+                             kalman_tracker=None if args.no_kalman else KalmanBallTracker(),
+                             decoder_backend=args.decoder, decoder_threads=args.decoder_threads)
+
+    # Detections come from the cache; only videos not analyzed with these settings run through YOLO
+    clips = []
+    for name, label in sorted(truth.items()):
+        video_path = os.path.join(args.videos, name)
+        try:
+            track = analyzer.detection_track(video_path)
+        except IOError as e:
+            print(f"Skipping {name}: {e}", file=sys.stderr)
+            continue
+        clips.append((name, np.array(track.ball_xyxy), np.array(track.hoop_xyxy), label))
+    if not clips:
+        print("No labelled videos to calibrate on", file=sys.stderr)
+        return 1
+
+    report = calibrate(clips, grid, workers=args.workers, match_tolerance=args.match_tolerance)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    save_shot_params(report["params"], args.params_output)
+
+    print(f"Tried {report['candidates']} parameter sets on {len(clips)} videos", file=sys.stderr)
+    for label, result in (("defaults", report["defaults"]), ("best", report)):
+        overall = result["overall"]
+        print(f"{label:>8}: score {overall['score']:.3f}, attempts P/R {overall['attempt_precision']:.2f}/"
+              f"{overall['attempt_recall']:.2f}, made P/R {overall['made_precision']:.2f}/"
+              f"{overall['made_recall']:.2f}", file=sys.stderr)
+    print("Best parameters: " + ", ".join(f"{name}={value}" for name, value in report["params"].items()),
+          file=sys.stderr)
+    for name, video in report["videos"].items():
+        print(f"  {name}: {video['made']}/{video['attempted']} made, attempts P/R "
+              f"{video['attempt_precision']:.2f}/{video['attempt_recall']:.2f}, made P/R "
+              f"{video['made_precision']:.2f}/{video['made_recall']:.2f}", file=sys.stderr)
+    print(f"Report written to {args.output}, parameters to {args.params_output} "
+          f"(use them with --shot-params {args.params_output})", file=sys.stderr)
+    return 0
+
+def cmd_export(args):
+    """Export a .pt model to ONNX or OpenVINO for faster CPU inference"""
+    from models import export_model
+
+    try:
+        path = export_model(args.model, args.format, imgsz=args.imgsz, int8=args.int8, data=args.data,
+                            dynamic=not args.static)
+    except Exception as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Exported model written to {path}; use it with --model {path}", file=sys.stderr)
+    return 0
+
+def _add_detection_arguments(parser):
+    parser.add_argument("-f", "--format", choices=["json", "csv"],
+                        help="Output format (default: from the output file extension)")
+    parser.add_argument("--no-cache", action="store_true", help="Always run inference, ignoring cached detections")
+    parser.add_argument("--stations", type=int, default=0, metavar="N",
+                        help="Score up to N hoops in view separately, e.g. full-court or multi-station "
+                             "footage; detects every frame and doesn't use the detection cache "
+                             "(default: 0, one hoop)")
+    parser.add_argument("--shot-params", metavar="FILE",
+                        help="Shot detection parameters JSON, e.g. as written by calibrate "
+                             "(default: the built-in parameters)")
+    _add_model_arguments(parser)
+
+def _add_model_arguments(parser):
+    parser.add_argument("-m", "--model", default="best.pt",
+                        help="YOLO model path: a .pt model or an ONNX/OpenVINO export of one (default: best.pt)")
+    parser.add_argument("-b", "--batch-size", type=int, default=8,
+                        help="Frames per inference call (default: 8)")
+    parser.add_argument("--imgsz", type=int,
+                        help="Inference size, the longest side frames are shrunk to before detection "
+                             "(default: the size the model was trained or exported at)")
+    parser.add_argument("--ball-conf", type=float, default=0.5, help="Ball confidence threshold")
+    parser.add_argument("--hoop-conf", type=float, default=0.3, help="Hoop confidence threshold")
+    parser.add_argument("--cache-dir", help="Detection cache directory (default: ~/.cache/shottracker/detections)")
+    parser.add_argument("--roi-interval", type=int, default=0, metavar="K",
+                        help="Once the hoop is stable, detect only around it, searching the full frame "
+                             "every K frames (default: 0, always full frame)")
+    parser.add_argument("--max-skip", type=int, default=0, metavar="N",
+                        help="Skip detection on up to N frames in a row while no shot is near the hoop, "
+                             "predicting the ball from its motion (default: 0, detect every frame)")
+    parser.add_argument("--no-kalman", action="store_true",
+                        help="Use the most confident ball box every frame instead of tracking the ball")
+    parser.add_argument("--decoder", choices=["opencv", "pyav"],
+                        help="Video decoder; pyav decodes with FFmpeg threads and needs PyAV installed "
+                             "(default: $SHOTTRACKER_DECODER or opencv)")
+    parser.add_argument("--decoder-threads", type=int, default=0, metavar="N",
+                        help="Decoding threads per video (default: 0, the decoder's own choice)")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="shottracker", description="Basketball shot analysis")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper,
+                        help="Log messages at this level and above (default: $SHOTTRACKER_LOG_LEVEL or INFO)")
+    parser.add_argument("--log-format", choices=["text", "json"],
+                        help="Log as text or one JSON object per line (default: $SHOTTRACKER_LOG_FORMAT or text)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    analyze = subparsers.add_parser("analyze", help="Analyze videos without the GUI")
+    analyze.add_argument("videos", nargs="+", help="Video files to analyze")
+    analyze.add_argument("-o", "--output", default="shot_results.json",
+                         help="Output file (default: shot_results.json)")
+    _add_detection_arguments(analyze)
+    analyze.set_defaults(func=cmd_analyze)
+
+    batch = subparsers.add_parser("batch", help="Analyze a whole folder of videos in parallel")
+    batch.add_argument("folder", help="Folder containing the videos")
+    batch.add_argument("-o", "--output", default="session_report.json",
+                       help="Output file (default: session_report.json)")
+    batch.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                       help="Worker processes, each with its own model (default: all cores)")
+    batch.add_argument("--torch-threads", type=int, default=1,
+                       help="Torch threads per worker (default: 1)")
+    _add_detection_arguments(batch)
+    batch.set_defaults(func=cmd_batch)
+
+    calibration = subparsers.add_parser("calibrate", help="Tune shot detection parameters against labelled videos")
+    calibration.add_argument("ground_truth", help="Ground-truth JSON with made/attempted or shot frame ranges per video")
+    calibration.add_argument("--videos", default="data/videos",
+                             help="Folder of the labelled videos (default: data/videos)")
+    calibration.add_argument("-o", "--output", default="calibration.json",
+                             help="Output file (default: calibration.json)")
+    calibration.add_argument("--params-output", default="shot_params.json",
+                             help="File the best parameters are written to, for --shot-params "
+                                  "(default: shot_params.json)")
+    calibration.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                             help="Processes scoring parameter sets (default: all cores)")
+    calibration.add_argument("-p", "--param", action="append", metavar="NAME=V1,V2,...",
+                             help="Values to search for a parameter, replacing its default range; repeatable")
+    calibration.add_argument("--match-tolerance", type=int, default=15, metavar="FRAMES",
+                             help="Frames a detected shot may lie outside a labelled shot's range and still "
+                                  "match it (default: 15)")
+    _add_model_arguments(calibration)
+    calibration.set_defaults(func=cmd_calibrate)
+
+    export = subparsers.add_parser("export", help="Export a model to ONNX or OpenVINO for faster CPU inference")
+    export.add_argument("model", nargs="?", default="best.pt", help="PyTorch model to export (default: best.pt)")
+    export.add_argument("--format", choices=["onnx", "openvino"], default="onnx", help="Export format (default: onnx)")
+    export.add_argument("--imgsz", type=int, default=640, help="Inference size (default: 640)")
+    export.add_argument("--int8", action="store_true",
+                        help="Quantize weights to INT8: dynamic quantization for ONNX, calibrated on --data "
+                             "images for OpenVINO")
+    export.add_argument("--data", default="data/basketball.yaml",
+                        help="Dataset YAML with calibration images for OpenVINO INT8 (default: data/basketball.yaml)")
+    export.add_argument("--static", action="store_true",
+                        help="Fix the batch size to 1 and the input size to --imgsz instead of exporting "
+                             "dynamic shapes")
+    export.set_defaults(func=cmd_export)
+
+    return parser
+
+def main(argv=None):
+    from app_logging import setup_logging
+
+    args = build_parser().parse_args(argv)
+    setup_logging(args.log_level, args.log_format)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
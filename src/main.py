@@ -1,3 +1,4 @@
+import logging
 import sys
 import os
 sys.path.insert(0, os.path.dirname(__file__))
@@ -6,14 +7,13 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QLabel, QVBoxLayout, QWi
                              QSizePolicy, QStyle, QScrollArea, QGridLayout, QSlider, QFrame, QDialog, QListWidget, QListWidgetItem)
 from PyQt5.QtGui import QImage, QPixmap, QPainter, QColor, QPen, QFont, QIcon, QFontDatabase
 from PyQt5.QtCore import Qt, QTimer, QPoint, QRectF
-import cv2
-import numpy as np
-from ultralytics import YOLO
 
-# Import our modules
-from ui import VideoPlayer, StatsDisplay, VideoBrowser, ConfigDialog
-from models import BallTracker, YOLODetector
-from processors import FrameProcessor, ShotDetector
+# Import our modules. The detection and video stack (models, processors, OpenCV) is
+# imported in create_processing, once the window is up.
+from ui import VideoPlayer, StatsDisplay, VideoBrowser, ConfigDialog, ModelLoader
+from app_logging import setup_logging
+
+logger = logging.getLogger(__name__)
 
 class MainApp(QMainWindow):
     def __init__(self):
@@ -31,10 +31,13 @@ class MainApp(QMainWindow):
         self.video_folder_path = "data/videos"
         self.model_path = "best.pt"
         
-        # Create main components
-        self.yolo_detector = YOLODetector(self.model_path)
-        self.shot_detector = self.create_shot_detector()
-        self.ball_tracker = BallTracker()
+        # Created by create_processing, after the window has been shown
+        self.yolo_detector = None
+        self.shot_detector = None
+        self.ball_tracker = None
+        self.frame_processor = None
+        self.model_loader = None
+        self.pending_video_path = None  # Video selected before the model finished loading
         
         # Setup UI
         self.central_widget = QWidget()
@@ -80,9 +83,28 @@ class MainApp(QMainWindow):
         self.scroll_area.setFrameShape(QFrame.NoFrame)
         self.scroll_area.setWidget(self.right_panel_widget)
         self.main_layout.addWidget(self.scroll_area, 1)
-        
-        # Set up frame processor
-        self.frame_processor = FrameProcessor(self)
+
+        self.stats_display.set_status("Loading model...")
+        self.processing_scheduled = False
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.processing_scheduled:
+            # After the first paint, so the window shows while the rest loads
+            self.processing_scheduled = True
+            QTimer.singleShot(0, self.create_processing)
+
+    def create_processing(self):
+        """Import and create the detection components and start loading the model in the background"""
+        from models import BallTracker, YOLODetector, DetectionCache, KalmanBallTracker
+        from processors import FrameProcessor, StageProfiler
+
+        self.yolo_detector = YOLODetector(self.model_path, load=False)
+        self.shot_detector = self.create_shot_detector()
+        self.ball_tracker = BallTracker()
+        self.frame_processor = FrameProcessor(self, detection_cache=DetectionCache(),
+                                              kalman_tracker=KalmanBallTracker(),
+                                              profiler=StageProfiler.from_environment())
         self.frame_processor.set_components(
             self.video_player, 
             self.shot_detector, 
@@ -91,10 +113,18 @@ class MainApp(QMainWindow):
             self.stats_display
         )
 
+        self.model_loader = ModelLoader(self.yolo_detector)
+        self.model_loader.loaded.connect(self.on_model_loaded)
+        self.model_loader.start(self.model_path)
+
     def load_custom_fonts(self):
         """Load sports-style fonts if available"""
         sports_fonts = ["Roboto", "Roboto Condensed", "Oswald"]
         font_db = QFontDatabase()
+        # Fonts installed on the system are already available
+        missing = {font.replace(" ", "").lower() for font in sports_fonts if font not in font_db.families()}
+        if not missing:
+            return
         
         # Font directories to check
         font_dirs = [
@@ -107,7 +137,9 @@ class MainApp(QMainWindow):
         for font_dir in font_dirs:
             if os.path.exists(font_dir):
                 for font_file in os.listdir(font_dir):
-                    if font_file.lower().endswith(('.ttf', '.otf')):
+                    # Only files of the missing families, e.g. RobotoCondensed-Bold.ttf or Oswald[wght].ttf
+                    family = font_file.split("-")[0].split("[")[0].split("_")[0].split(".")[0].lower()
+                    if family in missing and font_file.lower().endswith(('.ttf', '.otf')):
                         font_path = os.path.join(font_dir, font_file)
                         font_db.addApplicationFont(font_path)
 
@@ -206,12 +238,47 @@ class MainApp(QMainWindow):
 
     def create_shot_detector(self):
         """Create a new instance of the shot detector"""
+        from processors import ShotDetector
         return ShotDetector()
 
+    def on_model_loaded(self, success, message):
+        """Called once the background model load finishes"""
+        if not success:
+            logger.error(message)
+            self.pending_video_path = None
+            if self.yolo_detector.is_loaded():
+                # The model in use stays
+                self.stats_display.set_status("Error loading model, keeping the current one.")
+            else:
+                self.stats_display.set_status("Error loading model.")
+                self.stats_display.set_result("MODEL ERROR", is_made=False)
+            return
+        if self.video_player.pipeline is None:
+            # Nothing is running inference, so a staged model can be switched to right away
+            self.yolo_detector.apply_staged_model()
+        else:
+            self.stats_display.set_status("New model loaded, switching at the next frame.")
+            return
+        logger.info("Model %s loaded", self.yolo_detector.model_path)
+        if self.pending_video_path:
+            video_path, self.pending_video_path = self.pending_video_path, None
+            self.load_video(video_path)
+        else:
+            self.stats_display.set_status("Model loaded. Select video.")
+
     def load_video(self, video_path):
         """Load a video file and reset the app state"""
         # Stop any existing video
         self.video_player.stop_video()
+
+        # Start once the model is ready
+        if self.model_loader is None or (not self.yolo_detector.is_loaded() and self.model_loader.is_loading()):
+            self.pending_video_path = video_path
+            self.stats_display.set_status("Loading model...")
+            return
+        if not self.yolo_detector.is_loaded():
+            self.stats_display.set_status("No model loaded. Check settings.")
+            return
         
         # Reset the shot detector completely or create a new one
         if hasattr(self, 'shot_detector') and self.shot_detector:
@@ -237,21 +304,34 @@ class MainApp(QMainWindow):
         # Load video
         if self.video_player.load_video(video_path):
             self.stats_display.set_status("Video loaded, playing...")
-            print(f"Video loaded: {video_path}")
-            print("Shot detector and statistics reset")
+            logger.info("Video loaded: %s", video_path)
         else:
             self.stats_display.set_status("Error loading video")
             
     def open_settings_dialog(self):
         """Open the configuration dialog"""
+        if self.frame_processor is None:
+            return
+        from processors import ResolutionController
+
+        pending = self.frame_processor.pending_inference_size
+        imgsz, controller = pending or (self.yolo_detector.imgsz, self.frame_processor.resolution_controller)
         dialog = ConfigDialog(
             self.video_browser.get_video_folder_path(), 
             self.yolo_detector.model_path, 
-            self
+            self,
+            current_imgsz=imgsz,
+            adaptive=controller is not None
         )
         
         if dialog.exec_() == QDialog.Accepted:
             new_video_path, new_model_path = dialog.get_paths()
+            new_imgsz, adaptive = dialog.get_inference_settings()
+            
+            # Switched between frames if a video is playing
+            if (new_imgsz, adaptive) != (imgsz, controller is not None):
+                self.frame_processor.set_inference_size(
+                    new_imgsz, ResolutionController(max_imgsz=new_imgsz) if adaptive else None)
             
             # Update video folder path
             if new_video_path != self.video_browser.get_video_folder_path():
@@ -259,23 +339,22 @@ class MainApp(QMainWindow):
             
             # Update model if changed
             if new_model_path != self.yolo_detector.model_path:
-                # Stop video playback
-                self.video_player.stop_video()
-                
-                # Try to load new model
-                success, message = self.yolo_detector.load_model(new_model_path)
-                
-                if success:
-                    self.stats_display.set_status("New model loaded. Select video.")
-                else:
-                    self.stats_display.set_status("Error loading model.")
-                    self.stats_display.set_result("MODEL ERROR", is_made=False)
+                # Load the new model in the background while playback carries on; it takes
+                # over between frames and on_model_loaded reports the outcome
+                self.model_loader.start(new_model_path, stage=self.yolo_detector.is_loaded())
+                self.stats_display.set_status("Loading model...")
+
+    def closeEvent(self, event):
+        """Stop playback threads before the window closes"""
+        self.video_player.stop_video()
+        super().closeEvent(event)
 
 def main():
     # Suppress NSOpenPanel warning on macOS
     if sys.platform == 'darwin':
         os.environ['QT_MAC_WANTS_LAYER'] = '1'
 
+    setup_logging()
     app = QApplication(sys.argv)
     main_app = MainApp()
     main_app.show()
@@ -1,2 +1,5 @@
 from .ball_tracker import BallTracker
-from .yolo_detector import YOLODetector 
\ No newline at end of file
+from .yolo_detector import YOLODetector
+from .exported_model import ExportedModel, export_model
+from .detection_cache import DetectionCache, DetectionTrack
+from .kalman_tracker import KalmanBallTracker
@@ -31,11 +31,11 @@ class BallTracker:
         return self.show_trail
             
     def draw_trail(self, frame):
-        """Draw the ball trail on the given frame"""
+        """Draw the ball trail onto the given frame in place and return it"""
         if not self.show_trail or not self.positions:
             return frame
             
-        annotated_frame = frame.copy()
+        frame_height, frame_width = frame.shape[:2]
         
         # Draw each trail position
         for i, (pos, intensity) in enumerate(self.positions):
@@ -48,9 +48,17 @@ class BallTracker:
             # Red trail with fading transparency
             alpha = int(180 * fade)
             
-            # Create a separate overlay for each trail dot
-            overlay = annotated_frame.copy()
-            cv2.circle(overlay, pos, size, self.trail_color, -1)
-            cv2.addWeighted(overlay, alpha/255, annotated_frame, 1 - alpha/255, 0, annotated_frame)
+            # Only pixels under the dot change, so blend just the region around it
+            # instead of the whole frame
+            x, y = pos
+            x1, y1 = max(x - size - 1, 0), max(y - size - 1, 0)
+            x2, y2 = min(x + size + 2, frame_width), min(y + size + 2, frame_height)
+            if x1 >= x2 or y1 >= y2:
+                continue
                 
-        return annotated_frame 
\ No newline at end of file
+            roi = frame[y1:y2, x1:x2]
+            overlay = roi.copy()
+            cv2.circle(overlay, (x - x1, y - y1), size, self.trail_color, -1)
+            cv2.addWeighted(overlay, alpha/255, roi, 1 - alpha/255, 0, roi)
+                
+        return frame
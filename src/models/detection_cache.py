@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "shottracker", "detections")
+
+# Column layout of a detection table, one row per frame. Boxes of frames
+# without a detection are NaN; FILLED is 1.0 once a frame has been through the model.
+FILLED = 0
+BALL_COLUMNS = slice(1, 6)   # x1, y1, x2, y2, conf
+HOOP_COLUMNS = slice(6, 11)  # x1, y1, x2, y2, conf
+NUM_COLUMNS = 11
+
+_HASH_CHUNK_SIZE = 1 << 20
+_hash_memo = {}
+_hash_lock = threading.Lock()
+
+def file_hash(path):
+    """Content hash of a file, remembered per (path, size, mtime) so it is computed once"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        # e.g. a model name that ultralytics resolves itself; fall back to the name
+        return hashlib.blake2b(str(path).encode(), digest_size=16).hexdigest()
+    if os.path.isdir(path):
+        # e.g. an OpenVINO export folder: hash every file in it
+        digest = hashlib.blake2b(digest_size=16)
+        for name in sorted(os.listdir(path)):
+            if os.path.isfile(os.path.join(path, name)):
+                digest.update(f"{name}:{file_hash(os.path.join(path, name))}|".encode())
+        return digest.hexdigest()
+
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        if memo_key in _hash_memo:
+            return _hash_memo[memo_key]
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    value = digest.hexdigest()
+
+    with _hash_lock:
+        _hash_memo[memo_key] = value
+    return value
+
+class DetectionTrack:
+    """Per-frame ball and hoop detections for one video, stored as a float32 table.
+
+    Frames are indexed from 0. Boxes come back in the same (x1, y1, x2, y2, conf)
+    format YOLODetector.detect returns.
+    """
+    def __init__(self, data, length_known=False):
+        self.data = data
+        # True once the end of the video has been reached, so len() is the real frame count
+        self.length_known = length_known
+        self.modified = False
+
+    @classmethod
+    def empty(cls, num_frames=0):
+        return cls(cls._blank_rows(num_frames))
+
+    @staticmethod
+    def _blank_rows(num_rows):
+        data = np.full((num_rows, NUM_COLUMNS), np.nan, dtype=np.float32)
+        data[:, FILLED] = 0.0
+        return data
+
+    def __len__(self):
+        return len(self.data)
+
+    def has(self, index):
+        return 0 <= index < len(self.data) and self.data[index, FILLED] > 0
+
+    def get(self, index):
+        """Return the cached (ball_bbox, hoop_bbox) of a frame"""
+        row = self.data[index]
+        return self._row_to_bbox(row[BALL_COLUMNS]), self._row_to_bbox(row[HOOP_COLUMNS])
+
+    def set(self, index, ball_bbox, hoop_bbox):
+        """Store the detections of a frame, growing the table if needed"""
+        if index >= len(self.data):
+            self.data = np.concatenate([self.data, self._blank_rows(max(index + 1 - len(self.data), 256))])
+        elif not self.data.flags.writeable:
+            # Loaded memory-mapped read-only; switch to an in-memory copy on first write
+            self.data = np.array(self.data)
+
+        row = self.data[index]
+        row[FILLED] = 1.0
+        row[BALL_COLUMNS] = ball_bbox if ball_bbox else np.nan
+        row[HOOP_COLUMNS] = hoop_bbox if hoop_bbox else np.nan
+        self.modified = True
+
+    def set_length(self, num_frames):
+        """Record the real frame count once the end of the video is reached"""
+        if num_frames < len(self.data):
+            self.data = self.data[:num_frames]
+        elif num_frames > len(self.data):
+            self.data = np.concatenate([self.data, self._blank_rows(num_frames - len(self.data))])
+        if not self.length_known:
+            self.modified = True
+        self.length_known = True
+
+    def is_complete(self):
+        return self.length_known and bool(np.all(self.data[:, FILLED] > 0))
+
+    @property
+    def ball_xyxy(self):
+        return self.data[:, BALL_COLUMNS][:, :4]
+
+    @property
+    def hoop_xyxy(self):
+        return self.data[:, HOOP_COLUMNS][:, :4]
+
+    @staticmethod
+    def _row_to_bbox(values):
+        if np.isnan(values[4]):
+            return None
+        x1, y1, x2, y2 = (int(v) for v in values[:4])
+        return (x1, y1, x2, y2, float(values[4]))
+
+class DetectionCache:
+    """Persistent on-disk store of per-frame detections.
+
+    Entries are keyed by the content hash of the video and of the model weights plus
+    the detector's confidence thresholds, since those are the only inputs the boxes
+    depend on. Tables are saved as .npy files and memory-mapped when loaded.
+    """
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.environ.get("SHOTTRACKER_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+    def key_for(self, video_path, yolo_detector, *tags):
+        """Cache key of a video as analyzed by a given detector.
+        
+        tags are strings for any other settings that change the detections.
+        """
+        parts = [
+            file_hash(video_path),
+            file_hash(yolo_detector.model_path),
+            f"{yolo_detector.ball_conf_thresh:.4f}",
+            f"{yolo_detector.hoop_conf_thresh:.4f}",
+            *tags,
+        ]
+        if yolo_detector.imgsz:
+            parts.append(f"imgsz:{yolo_detector.imgsz}")
+        return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+    def load(self, key):
+        """Return the cached DetectionTrack for a key, or None"""
+        data_path, meta_path = self._paths(key)
+        if not os.path.exists(data_path) or not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            data = np.load(data_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable detection cache entry %s: %s", key, e)
+            return None
+        if data.ndim != 2 or data.shape[1] != NUM_COLUMNS:
+            return None
+        return DetectionTrack(data, length_known=meta.get("length_known", False))
+
+    def save(self, key, track, **meta):
+        """Write a track to disk, replacing any previous entry atomically"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data_path, meta_path = self._paths(key)
+
+        tmp_data_path = data_path + ".tmp.npy"
+        np.save(tmp_data_path, np.ascontiguousarray(track.data, dtype=np.float32))
+        os.replace(tmp_data_path, data_path)
+
+        meta.update({"frames": len(track), "length_known": track.length_known})
+        tmp_meta_path = meta_path + ".tmp"
+        with open(tmp_meta_path, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_meta_path, meta_path)
+        track.modified = False
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".npy", base + ".json"
@@ -0,0 +1,207 @@
+import abc
+import ast
+import os
+
+import cv2
+import numpy as np
+
+# Ultralytics' prediction defaults, so exported models give the boxes the torch model does
+CONF_THRESH = 0.25
+IOU_THRESH = 0.7
+MAX_DET = 300
+MAX_NMS = 30000  # Most confident candidates kept for NMS
+CLASS_OFFSET = 7680  # Boxes are shifted by class * this, so NMS never merges different classes
+PAD_VALUE = 114
+
+def is_exported_model(model_path):
+    """True for an ONNX file or an OpenVINO model (its .xml or export folder)"""
+    path = str(model_path).rstrip("/\\")
+    return path.endswith((".onnx", ".xml", "_openvino_model"))
+
+def load_exported_model(model_path, threads=None):
+    if str(model_path).endswith(".onnx"):
+        return OnnxModel(model_path, threads)
+    return OpenVinoModel(model_path, threads)
+
+def letterbox(image, new_shape, auto=False, stride=32):
+    """Resize an image keeping its aspect ratio and pad it to new_shape (h, w), as ultralytics does.
+
+    With auto the padding only goes up to the next multiple of stride, for models
+    with dynamic input sizes. Returns the image, the (x, y) scale and the (x, y) padding.
+    """
+    h, w = image.shape[:2]
+    r = min(new_shape[0] / h, new_shape[1] / w)
+    new_w, new_h = round(w * r), round(h * r)
+    pad_w, pad_h = new_shape[1] - new_w, new_shape[0] - new_h
+    if auto:
+        pad_w, pad_h = pad_w % stride, pad_h % stride
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = round(pad_h / 2 - 0.1), round(pad_h / 2 + 0.1)
+    left, right = round(pad_w / 2 - 0.1), round(pad_w / 2 + 0.1)
+    if top or bottom or left or right:
+        image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(PAD_VALUE,) * 3)
+    return image, (new_w / w, new_h / h), (left, top)
+
+def non_max_suppression(prediction, conf_thresh=CONF_THRESH, iou_thresh=IOU_THRESH, max_det=MAX_DET):
+    """Boxes from one image's raw model output, as an (N, 6) array of x1, y1, x2, y2, conf, cls.
+
+    prediction is (4 + classes, anchors) of center x, center y, width, height and
+    class scores. Each anchor keeps its best class; boxes above conf_thresh go
+    through class-aware greedy NMS, most confident first.
+    """
+    scores = prediction[4:]
+    cls = scores.argmax(0)
+    conf = scores[cls, np.arange(scores.shape[1])]
+    candidates = np.flatnonzero(conf > conf_thresh)
+    if not len(candidates):
+        return np.zeros((0, 6), dtype=np.float32)
+    order = candidates[np.argsort(-conf[candidates], kind="stable")][:MAX_NMS]
+
+    cx, cy, w, h = prediction[:4, order]
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    shifted = boxes + (cls[order] * CLASS_OFFSET)[:, None]
+    areas = (shifted[:, 2] - shifted[:, 0]) * (shifted[:, 3] - shifted[:, 1])
+    keep = []
+    remaining = np.arange(len(order))
+    while len(remaining) and len(keep) < max_det:
+        best, rest = remaining[0], remaining[1:]
+        keep.append(best)
+        inter_w = np.clip(np.minimum(shifted[best, 2], shifted[rest, 2]) - np.maximum(shifted[best, 0], shifted[rest, 0]), 0, None)
+        inter_h = np.clip(np.minimum(shifted[best, 3], shifted[rest, 3]) - np.maximum(shifted[best, 1], shifted[rest, 1]), 0, None)
+        inter = inter_w * inter_h
+        remaining = rest[inter / (areas[best] + areas[rest] - inter) <= iou_thresh]
+    keep = np.array(keep)
+    return np.concatenate([boxes[keep], conf[order[keep], None], cls[order[keep], None]], axis=1).astype(np.float32)
+
+class ExportedModel(abc.ABC):
+    """A YOLO detection model exported by ultralytics, run without torch.
+
+    predict() does the letterboxing and NMS itself and returns one (N, 6) array of
+    x1, y1, x2, y2, conf, cls per image, in image coordinates, like the torch model's
+    boxes.data. Subclasses load the model and implement _run on an NCHW batch.
+    """
+    def __init__(self, model_path, metadata, input_shape):
+        self.model_path = model_path
+        self.names = {int(k): v for k, v in _literal(metadata.get("names", {})).items()}
+        self.stride = int(_literal(metadata.get("stride", 32)))
+        imgsz = _literal(metadata.get("imgsz", [640, 640]))
+        self.imgsz = tuple(imgsz) if isinstance(imgsz, (list, tuple)) else (imgsz, imgsz)
+        # Fixed batch size, or None if any batch size works
+        self.batch = input_shape[0] if isinstance(input_shape[0], int) and input_shape[0] > 0 else None
+        # Whether images can be run at sizes other than imgsz
+        self.dynamic = not all(isinstance(dim, int) and dim > 0 for dim in input_shape[2:])
+
+    def predict(self, images, imgsz=None):
+        """Boxes for each image; imgsz overrides the input size of dynamic models"""
+        shape = (imgsz, imgsz) if imgsz and self.dynamic else self.imgsz
+        # Like ultralytics, pad dynamic models only up to the stride when all images match
+        auto = self.dynamic and len({image.shape for image in images}) == 1
+        results = []
+        step = self.batch or len(images) or 1
+        for i in range(0, len(images), step):
+            chunk = images[i:i + step]
+            letterboxed = [letterbox(image, shape, auto, self.stride) for image in chunk]
+            blobs = [boxed for boxed, _, _ in letterboxed]
+            # A fixed batch size is filled up with blank images
+            blobs += [np.full_like(blobs[0], PAD_VALUE)] * (step - len(blobs))
+            output = self._run(cv2.dnn.blobFromImages(blobs, 1 / 255.0, swapRB=True))
+            for image, (_, gain, pad), prediction in zip(chunk, letterboxed, output):
+                results.append(self._to_image_boxes(prediction, image.shape, gain, pad))
+        return results
+
+    @staticmethod
+    def _to_image_boxes(prediction, image_shape, gain, pad):
+        if prediction.shape[-1] == 6:
+            # End-to-end models output their final (max_det, 6) boxes, no NMS needed
+            data = prediction[prediction[:, 4] > CONF_THRESH][:MAX_DET].astype(np.float32)
+        else:
+            data = non_max_suppression(prediction)
+        data[:, [0, 2]] = ((data[:, [0, 2]] - pad[0]) / gain[0]).clip(0, image_shape[1])
+        data[:, [1, 3]] = ((data[:, [1, 3]] - pad[1]) / gain[1]).clip(0, image_shape[0])
+        return data
+
+    @abc.abstractmethod
+    def _run(self, blob):
+        """The raw model output for an NCHW float32 blob, one prediction per image"""
+
+class OnnxModel(ExportedModel):
+    """ONNX model run with ONNX Runtime on the CPU"""
+    def __init__(self, model_path, threads=None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        super().__init__(model_path, self.session.get_modelmeta().custom_metadata_map, model_input.shape)
+
+    def _run(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+class OpenVinoModel(ExportedModel):
+    """OpenVINO model (an export folder or its .xml file) run on the CPU"""
+    def __init__(self, model_path, threads=None):
+        import openvino
+        import yaml
+
+        xml_path = model_path
+        if os.path.isdir(model_path):
+            xml_path = next(os.path.join(model_path, name) for name in sorted(os.listdir(model_path))
+                            if name.endswith(".xml"))
+        metadata_path = os.path.join(os.path.dirname(xml_path), "metadata.yaml")
+        metadata = {}
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                metadata = yaml.safe_load(f) or {}
+
+        core = openvino.Core()
+        model = core.read_model(xml_path)
+        input_shape = [dim.get_length() if dim.is_static else None for dim in model.input(0).get_partial_shape()]
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        self.request = core.compile_model(model, "CPU", config).create_infer_request()
+        super().__init__(model_path, metadata, input_shape)
+
+    def _run(self, blob):
+        self.request.infer({0: blob})
+        return self.request.get_output_tensor(0).data.copy()
+
+def export_model(model_path, export_format="onnx", imgsz=640, int8=False, data=None, dynamic=True):
+    """Export a .pt model to ONNX or OpenVINO with ultralytics; returns the exported path.
+
+    dynamic exports accept any batch and input size, so region-of-interest crops run
+    at their own size. int8 quantizes the weights: for ONNX with ONNX Runtime's
+    dynamic quantization (written next to the export as *_int8.onnx), for OpenVINO
+    with NNCF calibrated on the images of the `data` dataset YAML.
+    """
+    from ultralytics import YOLO
+
+    if export_format not in ("onnx", "openvino"):
+        raise ValueError(f"Unsupported export format: {export_format}")
+    model = YOLO(model_path)
+    if export_format == "openvino":
+        return str(model.export(format="openvino", imgsz=imgsz, dynamic=dynamic, int8=int8, data=data))
+
+    onnx_path = str(model.export(format="onnx", imgsz=imgsz, dynamic=dynamic, simplify=True))
+    if not int8:
+        return onnx_path
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = onnx_path[:-len(".onnx")] + "_int8.onnx"
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+    # Keep the class names, input size and stride ultralytics stores in the model
+    source = onnx.load(onnx_path)
+    quantized = onnx.load(int8_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, int8_path)
+    return int8_path
+
+def _literal(value):
+    # ONNX metadata values are Python literals as strings, e.g. "{0: 'ball', 1: 'hoop'}"
+    return ast.literal_eval(value) if isinstance(value, str) else value
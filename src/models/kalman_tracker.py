@@ -0,0 +1,130 @@
+import numpy as np
+
+# 99.9% point of the chi-square distribution with 2 degrees of freedom: detections
+# whose Mahalanobis distance from the prediction is larger can't be this ball
+GATE_CHI2 = 13.8
+
+class KalmanBallTracker:
+    """Single-ball tracker between the detector and the shot detector.
+
+    Keeps a constant-acceleration Kalman filter of the ball center (x and y are
+    filtered independently, as 3-state position/velocity/acceleration filters)
+    and associates each frame's candidate ball boxes with it. Candidates outside
+    the gate around the predicted position are ignored, so a false positive
+    elsewhere in the frame can't make the track jump. When no candidate fits, a
+    confirmed track (matched confirm_hits times) coasts on its prediction for up
+    to max_coast frames, then ends; the next detection starts a new track with a
+    new track_id. A track that isn't confirmed yet is dropped straight away, so a
+    one-off false positive can't hold on to the ball.
+    """
+    def __init__(self, max_coast=5, confirm_hits=3, position_noise=0.15, jerk_noise=40000.0,
+                 coast_conf_decay=0.8):
+        self.max_coast = max_coast
+        self.confirm_hits = confirm_hits
+        # Measurement noise, as a fraction of the ball's size
+        self.position_noise = position_noise
+        # Spectral density of the jerk driving the acceleration (px/s^3); bounces and
+        # rim hits are sudden changes of acceleration
+        self.jerk_noise = jerk_noise
+        # Confidence of a coasted box, relative to the previous frame's
+        self.coast_conf_decay = coast_conf_decay
+
+        self.track_id = 0
+        self.state = None       # (2, 3): per axis position, velocity, acceleration
+        self.covariance = None  # (2, 3, 3)
+        self.last_time = None
+        self.size = None        # (width, height) of the last matched box
+        self.conf = 0.0
+        self.hits = 0
+        self.coasted = 0
+
+    def cache_tag(self):
+        """Identifies these settings in detection cache keys; tracked boxes differ from raw ones"""
+        return (f"kalman:{self.max_coast}:{self.confirm_hits}:{self.position_noise}:"
+                f"{self.jerk_noise}:{self.coast_conf_decay}")
+
+    def reset(self):
+        """End the current track, e.g. after a seek"""
+        self.state = None
+        self.covariance = None
+        self.coasted = 0
+
+    def update(self, timestamp, ball_boxes):
+        """Associate a frame's candidate ball boxes (most confident first) with the track.
+
+        Returns the ball box for this frame in the detector's (x1, y1, x2, y2, conf)
+        form: the matched detection, a predicted box while coasting, or None.
+        """
+        if self.state is None:
+            if not ball_boxes:
+                return None
+            return self._start(timestamp, ball_boxes[0])
+
+        self._predict(timestamp)
+        best, best_distance = None, GATE_CHI2
+        for box in ball_boxes:
+            distance = self._gate_distance(box)
+            if distance < best_distance:
+                best, best_distance = box, distance
+
+        if best is not None:
+            self._correct(best)
+            self.hits += 1
+            self.coasted = 0
+            return best
+
+        self.coasted += 1
+        if self.hits < self.confirm_hits or self.coasted > self.max_coast:
+            self.reset()
+            # The track is gone; the best candidate, if any, starts the next one
+            return self._start(timestamp, ball_boxes[0]) if ball_boxes else None
+        self.conf *= self.coast_conf_decay
+        center_x, center_y = self.state[:, 0]
+        width, height = self.size
+        return (int(center_x - width / 2), int(center_y - height / 2),
+                int(center_x + width / 2), int(center_y + height / 2), self.conf)
+
+    def _start(self, timestamp, box):
+        x1, y1, x2, y2, conf = box[:5]
+        self.track_id += 1
+        self.size = (x2 - x1, y2 - y1)
+        self.conf = conf
+        self.last_time = timestamp
+        self.hits = 1
+        self.coasted = 0
+        self.state = np.array([[(x1 + x2) / 2, 0.0, 0.0], [(y1 + y2) / 2, 0.0, 0.0]])
+        # Unknown velocity and acceleration: a ball can be anywhere from rolling to a fast pass
+        self.covariance = np.zeros((2, 3, 3))
+        self.covariance[:, 0, 0] = self._measurement_variance()
+        self.covariance[:, 1, 1] = 1500.0 ** 2
+        self.covariance[:, 2, 2] = 3000.0 ** 2
+        return box
+
+    def _measurement_variance(self):
+        return (self.position_noise * max(self.size)) ** 2 + 1.0
+
+    def _predict(self, timestamp):
+        dt = max(timestamp - self.last_time, 1e-3)
+        self.last_time = timestamp
+        transition = np.array([[1.0, dt, dt * dt / 2], [0.0, 1.0, dt], [0.0, 0.0, 1.0]])
+        noise_gain = np.array([dt ** 3 / 6, dt * dt / 2, dt])
+        process_noise = self.jerk_noise * np.outer(noise_gain, noise_gain)
+        self.state = self.state @ transition.T
+        self.covariance = transition @ self.covariance @ transition.T + process_noise
+
+    def _gate_distance(self, box):
+        """Squared Mahalanobis distance of a box center from the predicted position"""
+        x1, y1, x2, y2 = box[:4]
+        residual = np.array([(x1 + x2) / 2, (y1 + y2) / 2]) - self.state[:, 0]
+        innovation_variance = self.covariance[:, 0, 0] + self._measurement_variance()
+        return float(np.sum(residual * residual / innovation_variance))
+
+    def _correct(self, box):
+        x1, y1, x2, y2, conf = box[:5]
+        residual = np.array([(x1 + x2) / 2, (y1 + y2) / 2]) - self.state[:, 0]
+        innovation_variance = self.covariance[:, 0, 0] + self._measurement_variance()
+        gain = self.covariance[:, :, 0] / innovation_variance[:, None]  # (2, 3)
+        self.state = self.state + gain * residual[:, None]
+        self.covariance = self.covariance - gain[:, :, None] * self.covariance[:, 0, None, :]
+        self.size = (x2 - x1, y2 - y1)
+        self.conf = conf
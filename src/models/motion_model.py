@@ -0,0 +1,51 @@
+from collections import deque
+import numpy as np
+
+class BallMotionModel:
+    """Constant-acceleration motion model of the ball, fitted to its recent detections.
+
+    A ball in flight follows a parabola, so a quadratic in time fitted to the last
+    few detected centers (linear with only two) predicts where it is on frames that
+    weren't run through the detector.
+    """
+    def __init__(self, history=6, max_age=0.5):
+        # (time, center_x, center_y, width, height, conf) of the latest detections
+        self.points = deque(maxlen=history)
+        # Seconds after the last detection that predictions are still trusted
+        self.max_age = max_age
+
+    def reset(self):
+        self.points.clear()
+
+    def update(self, timestamp, ball_bbox):
+        """Add a detection (x1, y1, x2, y2, conf); None means the detector saw no ball"""
+        if ball_bbox is None:
+            # A real miss ends the track; predicting through it would invent a ball
+            self.points.clear()
+            return
+        x1, y1, x2, y2, conf = ball_bbox[:5]
+        if self.points and timestamp - self.points[-1][0] > self.max_age:
+            self.points.clear()
+        self.points.append((timestamp, (x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1, conf))
+
+    def predict(self, timestamp):
+        """Predicted ball box at a time, in the detector's (x1, y1, x2, y2, conf) form, or None"""
+        if not self.points:
+            return None
+        last_time, last_x, last_y, width, height, conf = self.points[-1]
+        if timestamp - last_time > self.max_age:
+            return None
+
+        if len(self.points) == 1:
+            center_x, center_y = last_x, last_y
+        else:
+            data = np.asarray(self.points)
+            # Times relative to the last detection keep the fit well conditioned
+            times = data[:, 0] - last_time
+            degree = min(2, len(self.points) - 1)
+            center_x = np.polyval(np.polyfit(times, data[:, 1], degree), timestamp - last_time)
+            center_y = np.polyval(np.polyfit(times, data[:, 2], degree), timestamp - last_time)
+
+        half_width, half_height = width / 2, height / 2
+        return (int(center_x - half_width), int(center_y - half_height),
+                int(center_x + half_width), int(center_y + half_height), conf)
@@ -1,52 +1,258 @@
+import math
+import threading
 import cv2
-from ultralytics import YOLO
+import numpy as np
+
+from .exported_model import ExportedModel, is_exported_model, load_exported_model
+
+# Class indices in the trained basketball model (see data/basketball.yaml)
+BALL_CLASS = 0
+HOOP_CLASS = 1
+
+# Ultralytics' default inference size, for models that don't record their own.
+# Region-of-interest crops are run at their own size rounded up to the model
+# stride, up to the inference size, so they are never upscaled.
+DEFAULT_IMGSZ = 640
+MODEL_STRIDE = 32
+# Most pre-resize buffers kept, across batch positions and image sizes
+MAX_RESIZE_BUFFERS = 32
+
+def _load_yolo(model_path, threads=None):
+    """The model at model_path: an ExportedModel for ONNX/OpenVINO exports, else ultralytics' YOLO"""
+    if is_exported_model(model_path):
+        return load_exported_model(model_path, threads)
+    # Imported on first use: ultralytics pulls in torch, which takes seconds to import
+    from ultralytics import YOLO
+    return YOLO(model_path)
+
+def _warm_up(model):
+    """Run a blank frame through a model, so the first real frame isn't slowed by lazy setup,
+    and check it outputs ball and hoop boxes"""
+    blank = np.zeros((DEFAULT_IMGSZ, DEFAULT_IMGSZ, 3), dtype=np.uint8)
+    if isinstance(model, ExportedModel):
+        model.predict([blank])
+    elif model(blank, verbose=False)[0].boxes is None:
+        raise ValueError("not a detection model")
+    names = getattr(model, "names", None) or {}
+    if len(names) <= max(BALL_CLASS, HOOP_CLASS):
+        raise ValueError(f"expected ball and hoop classes, model has {len(names)}")
 
 class YOLODetector:
-    def __init__(self, model_path="best.pt"):
+    def __init__(self, model_path="best.pt", load=True, threads=None, imgsz=None):
+        """model_path is a .pt model, or an ONNX/OpenVINO export of one (see export_model).
+
+        With load=False the model isn't loaded until load_model is called. threads
+        limits the CPU threads of exported models; torch's are set process-wide.
+        imgsz is the longest side frames are run at, by default the size the model
+        was trained or exported at.
+        """
         self.model_path = model_path
-        self.model = YOLO(self.model_path)
+        self.threads = threads
+        self.model = _load_yolo(self.model_path, threads) if load else None
         self.ball_conf_thresh = 0.5
         self.hoop_conf_thresh = 0.3
+        self.imgsz = imgsz
+        # Destination arrays of _resize by (batch index, shape), reused from call to call.
+        # Inference runs on one thread at a time, so nothing else holds them.
+        self._resize_buffers = {}
+        # (model, model_path) loaded by load_model(stage=True), waiting for apply_staged_model
+        self.staged = None
+        self._staged_lock = threading.Lock()
     
-    def load_model(self, model_path):
-        """Load a new YOLO model"""
+    def load_model(self, model_path, stage=False):
+        """Load, warm up and check a new YOLO model, then use it (see use_model).
+        
+        The current model is kept if any of that fails.
+        """
         try:
-            self.model_path = model_path
-            self.model = YOLO(self.model_path)
-            return True, "Model loaded successfully"
+            model = self.prepare_model(model_path)
         except Exception as e:
-            return False, f"Error loading model: {str(e)}"
+            return False, f"Error loading model {model_path}: {str(e)}"
+        self.use_model(model, model_path, stage)
+        return True, "Model loaded successfully"
+    
+    def prepare_model(self, model_path):
+        """Load, warm up and check a YOLO model without using it; raises if any of that fails"""
+        model = _load_yolo(model_path, self.threads)
+        _warm_up(model)
+        return model
+    
+    def use_model(self, model, model_path, stage=False):
+        """Switch to a prepared model.
+        
+        With stage=True it isn't used until apply_staged_model is called, so a thread
+        running inference can switch to it between frames.
+        """
+        if stage:
+            with self._staged_lock:
+                self.staged = (model, model_path)
+        else:
+            self.model, self.model_path = model, model_path
+    
+    def apply_staged_model(self):
+        """Switch to the model staged by load_model, if any; returns whether it switched.
+        
+        Call from the thread running inference, between frames.
+        """
+        if self.staged is None:
+            return False
+        with self._staged_lock:
+            staged, self.staged = self.staged, None
+        if staged is None:
+            return False
+        self.model, self.model_path = staged
+        return True
     
-    def detect(self, frame):
-        """Run detection on a frame and return ball and hoop bounding boxes"""
+    def is_loaded(self):
+        return self.model is not None
+
+    def inference_size(self, imgsz=None):
+        """Longest side images are run at for a requested imgsz (default self.imgsz).
+        
+        Rounded up to the model stride. Exports with a fixed input size always run at that size.
+        """
+        model = self.model
+        if isinstance(model, ExportedModel):
+            model_imgsz = max(model.imgsz)
+            if not model.dynamic:
+                return model_imgsz
+        else:
+            model_imgsz = getattr(model, "overrides", {}).get("imgsz") or DEFAULT_IMGSZ
+            if isinstance(model_imgsz, (list, tuple)):
+                model_imgsz = max(model_imgsz)
+        return math.ceil((imgsz or self.imgsz or model_imgsz) / MODEL_STRIDE) * MODEL_STRIDE
+
+    def detect(self, frame, roi=None, imgsz=None):
+        """Run detection on a frame and return ball and hoop bounding boxes.
+        
+        roi, an (x1, y1, x2, y2) region of the frame, limits detection to that
+        crop. imgsz overrides the inference size for this frame. Boxes are
+        returned in frame coordinates either way.
+        """
         if frame is None:
             return None, None
             
-        results = self.model(frame, verbose=False)
+        return self._select_best_boxes(self._infer([frame], roi, imgsz)[0])
+    
+    def detect_batch(self, frames, roi=None, imgsz=None):
+        """Run detection on several frames in a single model call.
         
-        ball_bbox = None
-        hoop_bbox = None
+        roi and imgsz, if given, apply to every frame (see detect).
+        Returns a list with one (ball_bbox, hoop_bbox) pair per frame, in order.
+        """
+        return [self._select_best_boxes(data) for data in self._infer(frames, roi, imgsz)]
+    
+    def detect_all(self, frame, roi=None, imgsz=None):
+        """Like detect, but return every ball and hoop box above the thresholds.
         
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                
-                # Assuming class 0 is ball and class 1 is hoop
-                if cls == 0 and conf > self.ball_conf_thresh:
-                    if ball_bbox is None or conf > ball_bbox[4]:
-                        ball_bbox = (x1, y1, x2, y2, conf)
-                elif cls == 1 and conf > self.hoop_conf_thresh:
-                     if hoop_bbox is None or conf > hoop_bbox[4]:
-                        hoop_bbox = (x1, y1, x2, y2, conf)
-                        
+        Returns (ball_boxes, hoop_boxes), each a list ordered by confidence, most
+        confident first.
+        """
+        if frame is None:
+            return [], []
+            
+        return self._select_all_boxes(self._infer([frame], roi, imgsz)[0])
+    
+    def detect_batch_all(self, frames, roi=None, imgsz=None):
+        """detect_all for several frames in a single model call"""
+        return [self._select_all_boxes(data) for data in self._infer(frames, roi, imgsz)]
+    
+    def _infer(self, frames, roi=None, imgsz=None):
+        """Run the model and return one (N, 6) array per frame: x1, y1, x2, y2, conf, cls,
+        in frame coordinates"""
+        if not frames:
+            return []
+        if self.model is None:
+            raise RuntimeError(f"Model {self.model_path} is not loaded")
+            
+        imgsz = self.inference_size(imgsz)
+        images = list(frames)
+        offset_x, offset_y = 0, 0
+        if roi is not None:
+            x1, y1, x2, y2 = roi
+            images = [frame[y1:y2, x1:x2] for frame in frames]
+            imgsz = min(imgsz, math.ceil(max(y2 - y1, x2 - x1) / MODEL_STRIDE) * MODEL_STRIDE)
+            offset_x, offset_y = x1, y1
+            
+        resized = [self._resize(i, image, imgsz) for i, image in enumerate(images)]
+        boxes = []
+        for data, (_, gain_x, gain_y) in zip(self._predict([image for image, _, _ in resized], imgsz), resized):
+            if gain_x != 1.0 or gain_y != 1.0 or offset_x or offset_y:
+                data = data.copy()
+                data[:, [0, 2]] = data[:, [0, 2]] * gain_x + offset_x
+                data[:, [1, 3]] = data[:, [1, 3]] * gain_y + offset_y
+            boxes.append(data)
+        return boxes
+    
+    def _predict(self, images, imgsz):
+        """One (N, 6) array per image from whichever kind of model is loaded"""
+        model = self.model
+        if isinstance(model, ExportedModel):
+            return model.predict(images, imgsz)
+        return [r.boxes.data.cpu().numpy() for r in model(images, verbose=False, imgsz=imgsz)]
+    
+    def _resize(self, index, image, imgsz):
+        """Shrink an image so its longest side is imgsz, into a reused buffer.
+        
+        This is the resize the model's letterbox would do, so the model only pads it.
+        Returns the image and the x and y factors from its coordinates back to the
+        original's. Images already small enough are returned as they are, made
+        contiguous (region-of-interest crops are views into the frame).
+        """
+        h, w = image.shape[:2]
+        r = imgsz / max(h, w)
+        if r >= 1:
+            return np.ascontiguousarray(image), 1.0, 1.0
+        size = (round(w * r), round(h * r))
+        shape = (size[1], size[0]) + image.shape[2:]
+        key = (index, shape, image.dtype.str)
+        buffer = self._resize_buffers.get(key)
+        if buffer is None:
+            if len(self._resize_buffers) >= MAX_RESIZE_BUFFERS:
+                # Crop sizes follow the hoop, so old ones may never come back
+                self._resize_buffers.clear()
+            buffer = self._resize_buffers[key] = np.empty(shape, image.dtype)
+        cv2.resize(image, size, dst=buffer, interpolation=cv2.INTER_LINEAR)
+        return buffer, w / size[0], h / size[1]
+    
+    def _select_best_boxes(self, data):
+        """Pick the most confident ball and hoop box from one frame's detections"""
+        if len(data) == 0:
+            return None, None
+        
+        ball_bbox = self._best_box_for_class(data, BALL_CLASS, self.ball_conf_thresh)
+        hoop_bbox = self._best_box_for_class(data, HOOP_CLASS, self.hoop_conf_thresh)
         return ball_bbox, hoop_bbox
+    
+    def _select_all_boxes(self, data):
+        """All ball and hoop boxes above the thresholds from one frame's detections, most confident first"""
+        if len(data) == 0:
+            return [], []
+        
+        ball_boxes = self._boxes_for_class(data, BALL_CLASS, self.ball_conf_thresh)
+        hoop_boxes = self._boxes_for_class(data, HOOP_CLASS, self.hoop_conf_thresh)
+        return ball_boxes, hoop_boxes
+    
+    @staticmethod
+    def _best_box_for_class(data, cls, conf_thresh):
+        """Return the highest-confidence box of a class above the threshold, or None"""
+        conf = np.where((data[:, 5] == cls) & (data[:, 4] > conf_thresh), data[:, 4], -1.0)
+        best = int(conf.argmax())
+        if conf[best] < 0:
+            return None
+            
+        x1, y1, x2, y2 = (int(v) for v in data[best, :4])
+        return (x1, y1, x2, y2, float(conf[best]))
+    
+    @staticmethod
+    def _boxes_for_class(data, cls, conf_thresh):
+        rows = data[(data[:, 5] == cls) & (data[:, 4] > conf_thresh)]
+        rows = rows[np.argsort(-rows[:, 4], kind="stable")]
+        return [(int(x1), int(y1), int(x2), int(y2), float(conf)) for x1, y1, x2, y2, conf in rows[:, :5]]
         
-    def draw_detections(self, frame, ball_bbox, hoop_bbox):
-        """Draw bounding boxes on the frame"""
-        annotated_frame = frame.copy()
+    def draw_detections(self, frame, ball_bbox, hoop_bbox, in_place=False):
+        """Draw bounding boxes on the frame, or on a copy of it unless in_place is set"""
+        annotated_frame = frame if in_place else frame.copy()
         
         # Draw the ball with a clean white circle
         if ball_bbox:
@@ -1,2 +1,14 @@
 from .frame_processor import FrameProcessor
-from .shot_detector import ShotDetector 
\ No newline at end of file
+from .shot_detector import ShotDetector, DEFAULT_SHOT_PARAMS
+from .track_scorer import score_track
+from .calibration import calibrate, evaluate, load_ground_truth, load_shot_params, parse_grid, save_shot_params
+from .video_analyzer import VideoAnalyzer
+from .results_writer import write_results
+from .frame_decoder import FrameDecoder, END_OF_VIDEO
+from .frame_pipeline import FramePipeline
+from .stage_profiler import StageProfiler, LatencyHistogram
+from .roi_scheduler import RoiScheduler
+from .frame_skipper import FrameSkipper
+from .resolution_controller import ResolutionController
+from .multi_station import MultiStationTracker
+from .batch_analyzer import analyze_videos, find_videos, VIDEO_EXTENSIONS
@@ -0,0 +1,142 @@
+import functools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+# Per-process VideoAnalyzer, created once by _init_worker so each worker loads the model once
+_worker_analyzer = None
+
+def find_videos(folder_path):
+    """Return the sorted paths of all video files in a folder"""
+    videos = [f for f in os.listdir(folder_path) if f.lower().endswith(VIDEO_EXTENSIONS)]
+    return [os.path.join(folder_path, f) for f in sorted(videos)]
+
+def _build_analyzer(detector_config, threads=None):
+    # Imported here so worker processes only pay for torch once, in their initializer
+    from models import YOLODetector, DetectionCache, KalmanBallTracker
+    from .frame_skipper import FrameSkipper
+    from .multi_station import MultiStationTracker
+    from .roi_scheduler import RoiScheduler
+    from .shot_detector import ShotDetector
+    from .video_analyzer import VideoAnalyzer
+
+    yolo_detector = YOLODetector(detector_config["model_path"], threads=threads, imgsz=detector_config.get("imgsz"))
+    yolo_detector.ball_conf_thresh = detector_config["ball_conf"]
+    yolo_detector.hoop_conf_thresh = detector_config["hoop_conf"]
+    detection_cache = DetectionCache(detector_config.get("cache_dir")) if detector_config.get("use_cache", True) else None
+    roi_interval = detector_config.get("roi_interval", 0)
+    roi_scheduler = RoiScheduler(roi_interval) if roi_interval > 0 else None
+    max_skip = detector_config.get("max_skip", 0)
+    frame_skipper = FrameSkipper(max_skip) if max_skip > 0 else None
+    kalman_tracker = KalmanBallTracker() if detector_config.get("kalman", True) else None
+    shot_detector_factory = functools.partial(ShotDetector, **detector_config.get("shot_params") or {})
+    stations = detector_config.get("stations", 0)
+    station_tracker = None
+    if stations > 0:
+        station_tracker = MultiStationTracker(shot_detector_factory=shot_detector_factory,
+                                              kalman_tracker_factory=KalmanBallTracker if kalman_tracker else None,
+                                              max_stations=stations)
+    return VideoAnalyzer(yolo_detector, shot_detector_factory=shot_detector_factory,
+                         batch_size=detector_config.get("batch_size", 8),
+                         detection_cache=detection_cache, roi_scheduler=roi_scheduler,
+                         frame_skipper=frame_skipper, kalman_tracker=kalman_tracker,
+                         station_tracker=station_tracker, decoder_backend=detector_config.get("decoder"),
+                         decoder_threads=detector_config.get("decoder_threads", 0))
+
+def _init_worker(detector_config, torch_threads, log_config=None):
+    global _worker_analyzer
+
+    if log_config:
+        from app_logging import setup_logging
+        setup_logging(**log_config)
+
+    _set_threads(detector_config, torch_threads)
+    _worker_analyzer = _build_analyzer(detector_config, threads=torch_threads)
+
+def _set_threads(detector_config, torch_threads):
+    import cv2
+    from models.exported_model import is_exported_model
+
+    # Workers already use every core between them; keep each one from oversubscribing.
+    # Exported models run without torch, which may not even be installed.
+    if not is_exported_model(detector_config["model_path"]):
+        import torch
+        torch.set_num_threads(torch_threads)
+    cv2.setNumThreads(1)
+
+def _analyze_one(analyzer, video_path):
+    try:
+        return analyzer.analyze(video_path)
+    except Exception as e:
+        return {"video": os.path.basename(video_path), "path": video_path, "error": str(e)}
+
+def _analyze_in_worker(video_path):
+    return _analyze_one(_worker_analyzer, video_path)
+
+def analyze_videos(video_paths, detector_config, workers=None, torch_threads=1, on_result=None):
+    """Analyze videos across a process pool and merge the results into one session report.
+
+    detector_config holds model_path, ball_conf, hoop_conf and optionally imgsz, batch_size,
+    cache_dir, use_cache, roi_interval, max_skip, kalman, stations, decoder, decoder_threads and
+    shot_params (ShotDetector keyword arguments, see load_shot_params). Each worker
+    process loads its own model instance and uses torch_threads intra-op threads, as
+    does a single worker analyzing in this process. on_result, if given, is called
+    with each per-video result as it completes.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(video_paths) or 1))
+    start_time = time.perf_counter()
+    results = []
+
+    if workers == 1:
+        # No point paying for process start-up and a second model load
+        _set_threads(detector_config, torch_threads)
+        analyzer = _build_analyzer(detector_config, threads=torch_threads)
+        for video_path in video_paths:
+            result = _analyze_one(analyzer, video_path)
+            results.append(result)
+            if on_result:
+                on_result(result)
+    else:
+        # spawn: forking a process that may already hold torch/OpenCV thread pools is unsafe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(detector_config, torch_threads, _log_config())) as executor:
+            futures = [executor.submit(_analyze_in_worker, path) for path in video_paths]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if on_result:
+                    on_result(result)
+
+    elapsed = time.perf_counter() - start_time
+    results.sort(key=lambda r: r["path"])
+    return results, summarize_session(results, elapsed, workers)
+
+def _log_config():
+    # Workers log the way the parent process was set up to, if it was
+    try:
+        from app_logging import logging_config
+    except ImportError:
+        return None
+    return logging_config()
+
+def summarize_session(results, elapsed, workers):
+    """Merge per-video results into session totals"""
+    analyzed = [r for r in results if "error" not in r]
+    made = sum(r["made"] for r in analyzed)
+    attempted = sum(r["attempted"] for r in analyzed)
+    frames = sum(r["frames"] for r in analyzed)
+    return {
+        "videos": len(analyzed),
+        "failed": len(results) - len(analyzed),
+        "frames": frames,
+        "made": made,
+        "attempted": attempted,
+        "percentage": round(made / attempted * 100, 2) if attempted > 0 else 0.0,
+        "workers": workers,
+        "elapsed_sec": round(elapsed, 3),
+        "processing_fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+    }
@@ -0,0 +1,185 @@
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .shot_detector import DEFAULT_SHOT_PARAMS
+from .track_scorer import score_track
+
+# Values searched by default; any other parameter stays at its DEFAULT_SHOT_PARAMS value
+DEFAULT_GRID = {
+    "upper_zone_factor": [0.8, 1.0, 1.2, 1.5],
+    "up_band": [1.5, 2.0, 2.5],
+    "down_band": [1.0, 1.5, 2.0],
+    "rim_tolerance": [0.5, 0.6, 0.7, 0.8],
+    "cooldown_frames": [10, 15, 25],
+}
+
+# Parameter sets scored per task sent to a worker
+_CHUNK_SIZE = 64
+
+# Per-process (name, ball_xyxy, hoop_xyxy, truth) of every clip, set by _init_worker
+_worker_clips = None
+
+def load_ground_truth(path):
+    """Labels per video file name from a ground-truth JSON file.
+
+    The file maps video names to either shot counts, {"made": 3, "attempted": 5},
+    or labelled shots, {"shots": [{"start_frame": 40, "end_frame": 95, "made": true}]}.
+    Videos labelled null are left out.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    videos = data.get("videos", data)
+    return {name: label for name, label in videos.items() if label is not None}
+
+def parse_grid(specs):
+    """Search grid from "name=v1,v2,..." strings, on top of DEFAULT_GRID"""
+    grid = dict(DEFAULT_GRID)
+    for spec in specs or []:
+        name, _, values = spec.partition("=")
+        if name not in DEFAULT_SHOT_PARAMS or not values:
+            raise ValueError(f"Expected one of {', '.join(DEFAULT_SHOT_PARAMS)} as name=v1,v2,...: {spec}")
+        cast = int if isinstance(DEFAULT_SHOT_PARAMS[name], int) else float
+        grid[name] = [cast(value) for value in values.split(",")]
+    return grid
+
+def load_shot_params(path):
+    """Shot detection parameters from a JSON file, as written by calibrate.
+
+    The file maps names from DEFAULT_SHOT_PARAMS to values, e.g. {"rim_tolerance": 0.6};
+    parameters left out keep their defaults.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected an object of shot detection parameters in {path}")
+    params = {}
+    for name, value in data.items():
+        if name not in DEFAULT_SHOT_PARAMS:
+            raise ValueError(f"Unknown shot detection parameter {name!r} in {path}; "
+                             f"expected one of {', '.join(DEFAULT_SHOT_PARAMS)}")
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Expected a number for {name} in {path}: {value!r}")
+        if isinstance(DEFAULT_SHOT_PARAMS[name], int):
+            if value != int(value):
+                raise ValueError(f"Expected a whole number for {name} in {path}: {value!r}")
+            value = int(value)
+        params[name] = value
+    return params
+
+def save_shot_params(params, path):
+    """Write shot detection parameters in the format load_shot_params reads"""
+    with open(path, "w") as f:
+        json.dump(params, f, indent=2)
+
+def evaluate(clips, params, match_tolerance=15):
+    """Score every clip with a parameter set and compare with its labels.
+
+    Returns per-clip precision/recall of attempts and made shots, plus an overall
+    score: the mean of the attempt and made F1 over all clips' shots together.
+    """
+    per_video = {}
+    totals = [0, 0, 0, 0, 0, 0]  # attempt tp, detected, labelled; made tp, detected, labelled
+    for name, ball_xyxy, hoop_xyxy, truth in clips:
+        result = score_track(ball_xyxy, hoop_xyxy, params)
+        counts = _match_shots(result, truth, match_tolerance)
+        totals = [total + count for total, count in zip(totals, counts)]
+        per_video[name] = _summary(counts, result)
+    overall = _summary(totals)
+    overall["score"] = round((_f1(*totals[:3]) + _f1(*totals[3:])) / 2, 4)
+    return overall, per_video
+
+def calibrate(clips, grid=None, workers=None, match_tolerance=15):
+    """Search the parameter grid for the set that best reproduces the labels.
+
+    clips is a list of (name, ball_xyxy, hoop_xyxy, label). Parameter sets are
+    scored across a process pool. Returns the best parameters with their
+    evaluation, the defaults' evaluation and the number of sets tried.
+    """
+    grid = grid or DEFAULT_GRID
+    names = list(grid)
+    candidates = [dict(DEFAULT_SHOT_PARAMS, **dict(zip(names, values)))
+                  for values in itertools.product(*(grid[name] for name in names))]
+    chunks = [candidates[i:i + _CHUNK_SIZE] for i in range(0, len(candidates), _CHUNK_SIZE)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+
+    if workers == 1:
+        scores = [score for chunk in chunks for score in _score_chunk(clips, chunk, match_tolerance)]
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(clips,)) as executor:
+            results = executor.map(_score_chunk_in_worker, chunks, itertools.repeat(match_tolerance))
+            scores = [score for chunk_scores in results for score in chunk_scores]
+
+    # Best score; on ties the set closest to the defaults, so the search doesn't drift for nothing
+    best = max(range(len(candidates)), key=lambda i: (scores[i], -_distance_from_defaults(candidates[i])))
+    overall, per_video = evaluate(clips, candidates[best], match_tolerance)
+    default_overall, default_per_video = evaluate(clips, DEFAULT_SHOT_PARAMS, match_tolerance)
+    return {
+        "params": candidates[best],
+        "overall": overall,
+        "videos": per_video,
+        "defaults": {"params": dict(DEFAULT_SHOT_PARAMS), "overall": default_overall, "videos": default_per_video},
+        "candidates": len(candidates),
+    }
+
+def _init_worker(clips):
+    global _worker_clips
+    _worker_clips = clips
+
+def _score_chunk_in_worker(chunk, match_tolerance):
+    return _score_chunk(_worker_clips, chunk, match_tolerance)
+
+def _score_chunk(clips, chunk, match_tolerance):
+    return [evaluate(clips, params, match_tolerance)[0]["score"] for params in chunk]
+
+def _match_shots(result, truth, match_tolerance):
+    """(attempt tp, detected, labelled, made tp, detected made, labelled made) of one clip"""
+    if "shots" not in truth:
+        # Counts only: every shot is assumed to line up with a labelled one, an upper bound
+        made, attempted = truth["made"], truth["attempted"]
+        return (min(result["attempted"], attempted), result["attempted"], attempted,
+                min(result["made"], made), result["made"], made)
+
+    labelled = sorted(truth["shots"], key=lambda shot: shot["start_frame"])
+    used = [False] * len(labelled)
+    matched = made_matched = 0
+    for start, end, made in zip(result["start_frames"], result["end_frames"], result["made_flags"]):
+        # Greedily pair each detected shot with the first unused labelled shot it overlaps
+        for i, shot in enumerate(labelled):
+            if not used[i] and start <= shot["end_frame"] + match_tolerance \
+                    and end >= shot["start_frame"] - match_tolerance:
+                used[i] = True
+                matched += 1
+                made_matched += int(made and shot["made"])
+                break
+    labelled_made = sum(1 for shot in labelled if shot["made"])
+    return matched, result["attempted"], len(labelled), made_matched, result["made"], labelled_made
+
+def _summary(counts, result=None):
+    attempt_tp, detected, labelled, made_tp, detected_made, labelled_made = counts
+    summary = {
+        "attempt_precision": _ratio(attempt_tp, detected),
+        "attempt_recall": _ratio(attempt_tp, labelled),
+        "made_precision": _ratio(made_tp, detected_made),
+        "made_recall": _ratio(made_tp, labelled_made),
+    }
+    if result is not None:
+        summary["made"] = result["made"]
+        summary["attempted"] = result["attempted"]
+    return summary
+
+def _ratio(numerator, denominator):
+    # Nothing to find and nothing found is perfect
+    return round(numerator / denominator, 4) if denominator else 1.0
+
+def _f1(true_positives, detected, labelled):
+    if detected + labelled == 0:
+        return 1.0
+    return 2 * true_positives / (detected + labelled)
+
+def _distance_from_defaults(params):
+    return sum(abs(params[name] - value) / (abs(value) or 1) for name, value in DEFAULT_SHOT_PARAMS.items())
@@ -0,0 +1,366 @@
+import logging
+import os
+import queue
+import threading
+import cv2
+import numpy as np
+
+from .presentation_clock import PresentationClock
+from .stage_profiler import StageProfiler
+from .video_index import MAX_DECODE_AHEAD
+
+try:
+    import av  # Optional: FFmpeg decoding with frame threads, usually faster than OpenCV's
+    # Renamed from AVError in PyAV 14
+    AV_ERROR = getattr(av, "FFmpegError", None) or av.AVError
+except ImportError:
+    av = None
+    AV_ERROR = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("opencv", "pyav")
+
+# Returned by FrameDecoder.read() once the video has no more frames
+END_OF_VIDEO = object()
+
+# How often a decoder waiting for a free buffer or a seek checks for stop requests (seconds)
+_POLL_INTERVAL = 0.05
+
+# Transfer characteristics of HDR video, SMPTE ST 2084 (PQ) and ARIB STD-B67 (HLG)
+_HDR_TRANSFERS = (16, 18)
+# FFmpeg scale filter options that convert HDR video to BT.709 SDR colors, as OpenCV's
+# FFmpeg does. PyAV's reformat() only applies the color matrix, which leaves such video
+# far darker than OpenCV's frames.
+_HDR_TO_SDR = "out_primaries=bt709:out_transfer=bt709"
+
+# Rotations that undo PyAV's counterclockwise display rotation, as OpenCV applies it
+_ROTATIONS = {90: cv2.ROTATE_90_COUNTERCLOCKWISE, -90: cv2.ROTATE_90_CLOCKWISE,
+              180: cv2.ROTATE_180, -180: cv2.ROTATE_180}
+
+class DecodedFrame:
+    """A frame handed out by a FrameDecoder.
+
+    image is one of the decoder's ring buffers, valid until the frame is released.
+    frame_num counts from 1 and timestamp is the media time in seconds.
+    """
+    __slots__ = ("frame_num", "timestamp", "image", "generation", "slot")
+
+    def __init__(self, frame_num, timestamp, image, generation, slot):
+        self.frame_num = frame_num
+        self.timestamp = timestamp
+        self.image = image
+        self.generation = generation
+        self.slot = slot
+
+class FrameDecoder:
+    """Decodes a video ahead of its consumer on a background thread.
+
+    Frames are decoded into a fixed ring of buffers, preallocated at the video's
+    frame size when it is opened, and handed out by reference: read() returns a
+    DecodedFrame whose image is one of the buffers, and the consumer calls
+    release() once it is done with it. With every buffer waiting to be read or
+    still held, decoding pauses, so a slow consumer bounds both memory and how far
+    ahead decoding runs. A buffer only gets replaced if a frame doesn't fit it, as
+    with a stream that changes size or is rotated for display.
+
+    OpenCV decodes straight into the buffers. PyAV can't write into a given
+    array: FFmpeg's color conversion returns a new frame every time, whose pixels
+    are then copied into the ring buffer once.
+
+    backend is "opencv" (cv2.VideoCapture) or "pyav", which decodes with FFmpeg
+    frame threads through PyAV and falls back to OpenCV when PyAV isn't installed
+    or can't open the file. It defaults to SHOTTRACKER_DECODER, else opencv.
+    threads is the number of decoding threads, 0 for the backend's default. PyAV
+    converts HDR video (PQ or HLG) to BT.709 through FFmpeg's scale filter, so its
+    colors match OpenCV's. Pixels can still differ by rounding between the two
+    backends' FFmpeg builds, so cache_tag() tells their detections apart.
+
+    seek() jumps to a frame; frames decoded after it carry the generation it
+    returns. With a video_index (see VideoIndex) seeks land on the exact frame.
+    """
+    def __init__(self, video_path, buffers=8, backend=None, threads=0, video_index=None, profiler=None):
+        self.video_path = video_path
+        self.backend = backend or os.environ.get("SHOTTRACKER_DECODER", "opencv")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown decoder backend: {self.backend}")
+        self.threads = threads
+        # Set once the index is built; until then seeks are by frame count or time
+        self.video_index = video_index
+        self.profiler = profiler or StageProfiler()
+        self.fps = None
+        self.frame_interval = None
+        self.total_frames = 0
+
+        self.ring = [None] * max(2, int(buffers))
+        self.ready_queue = queue.Queue()
+        self._free = queue.Queue()
+        for slot in range(len(self.ring)):
+            self._free.put(slot)
+        self.thread = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._seek_event = threading.Event()
+        # Bumped on every seek; frames carry the generation they were decoded in
+        self.generation = 0
+        self._pending_seek = None
+
+        self._cap = None
+        self._clock = None
+        self._container = None
+        self._stream = None
+        self._frames = None
+        self._sdr_graph = None  # ((width, height, format), filter graph) converting HDR frames
+
+    def open(self):
+        """Open the video; returns False if it can't be opened"""
+        if self.backend == "pyav":
+            if av is None:
+                logger.warning("PyAV is not installed, decoding %s with OpenCV", self.video_path)
+            else:
+                try:
+                    self._open_pyav()
+                    return True
+                except AV_ERROR as e:
+                    logger.warning("PyAV could not open %s, decoding with OpenCV: %s", self.video_path, e)
+            self.backend = "opencv"
+        return self._open_opencv()
+
+    def cache_tag(self):
+        """Identifies the backend in detection cache keys, or None for OpenCV"""
+        return None if self.backend == "opencv" else f"decoder:{self.backend}"
+
+    def start(self):
+        """Start decoding ahead on a background thread"""
+        self.thread = threading.Thread(target=self._decode_loop, name="decode", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop decoding and close the video. Frames already handed out stay valid."""
+        self._stop_event.set()
+        self._seek_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        if self._container is not None:
+            self._container.close()
+            self._container = None
+
+    def read(self, timeout=None):
+        """The next decoded frame, END_OF_VIDEO at the end, or None if none arrives within timeout"""
+        try:
+            return self.ready_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def release(self, frame):
+        """Give a frame's buffer back for decoding into; its image must no longer be used"""
+        slot, frame.slot = frame.slot, None
+        if slot is not None:
+            self._free.put(slot)
+
+    def seek(self, frame_index):
+        """Decode from frame_index (counting from 0) next; returns the new generation.
+
+        Decoded frames not read yet are dropped.
+        """
+        with self._lock:
+            self.generation += 1
+            self._pending_seek = frame_index
+            generation = self.generation
+            self._seek_event.set()
+        while True:
+            try:
+                item = self.ready_queue.get_nowait()
+            except queue.Empty:
+                return generation
+            if item is not END_OF_VIDEO:
+                self.release(item)
+
+    def __iter__(self):
+        """Frames in order until the end of the video, starting decoding if needed.
+        Release each one when done with it."""
+        if self.thread is None:
+            self.start()
+        while True:
+            item = self.read()
+            if item is END_OF_VIDEO:
+                return
+            yield item
+
+    def _decode_loop(self):
+        frame_num = 0
+        try:
+            while not self._stop_event.is_set():
+                slot = self._take_slot()
+                if slot is None:
+                    return
+                with self._lock:
+                    seek_position, self._pending_seek = self._pending_seek, None
+                    generation = self.generation
+                    self._seek_event.clear()
+                start = self.profiler.start()
+                if seek_position is not None:
+                    ret, image, frame_num, timestamp = self._seek_into(seek_position, frame_num, self.ring[slot])
+                else:
+                    frame_num += 1
+                    ret, image, timestamp = self._read_into(frame_num, self.ring[slot])
+                self.profiler.stop("decode" if seek_position is None else "seek", start)
+                if not ret:
+                    self._free.put(slot)
+                    with self._lock:
+                        # After a seek since this read, the end is stale
+                        ended = self._pending_seek is None
+                        if ended:
+                            self.ready_queue.put(END_OF_VIDEO)
+                    # Nothing more to decode unless the consumer seeks back
+                    while ended and not self._stop_event.is_set() and not self._seek_event.wait(_POLL_INTERVAL):
+                        pass
+                    continue
+
+                # A buffer that didn't fit the frame was replaced by the decoder; keep the new one
+                self.ring[slot] = image
+                if timestamp is None:
+                    timestamp = (frame_num - 1) * self.frame_interval
+                self.ready_queue.put(DecodedFrame(frame_num, timestamp, image, generation, slot))
+        except Exception:
+            logger.exception("Error decoding %s", self.video_path)
+            self.ready_queue.put(END_OF_VIDEO)
+
+    def _take_slot(self):
+        while not self._stop_event.is_set():
+            try:
+                return self._free.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        return None
+
+    def _open_opencv(self):
+        params = [cv2.CAP_PROP_N_THREADS, self.threads] if self.threads else []
+        self._cap = cv2.VideoCapture(self.video_path, cv2.CAP_ANY, params)
+        if not self._cap.isOpened():
+            self._cap.release()
+            self._cap = None
+            return False
+        self._clock = PresentationClock.from_capture(self._cap)
+        self.fps = self._clock.fps
+        self.frame_interval = self._clock.frame_interval
+        self.total_frames = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._allocate_ring(int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+        return True
+
+    def _open_pyav(self):
+        self._container = av.open(self.video_path)
+        try:
+            self._stream = self._container.streams.video[0]
+        except IndexError:
+            self._container.close()
+            raise AV_ERROR(0, "no video stream")
+        self._stream.thread_type = "AUTO"
+        self._stream.thread_count = self.threads
+        self._frames = self._container.decode(self._stream)
+        clock = PresentationClock(float(self._stream.average_rate or self._stream.guessed_rate or 0))
+        self.fps = clock.fps
+        self.frame_interval = clock.frame_interval
+        self.total_frames = self._stream.frames
+        if not self.total_frames and self._stream.duration:
+            self.total_frames = round(self._stream.duration * self._stream.time_base * self.fps)
+        self._allocate_ring(self._stream.codec_context.height, self._stream.codec_context.width)
+
+    def _allocate_ring(self, height, width):
+        if height > 0 and width > 0:
+            self.ring = [np.empty((height, width, 3), dtype=np.uint8) for _ in self.ring]
+
+    def _read_into(self, frame_num, buffer):
+        """Decode the next frame into buffer: (ret, image, timestamp)"""
+        if self._cap is not None:
+            ret, image = self._cap.read(buffer)
+            return ret, image, self._clock.frame_timestamp(self._cap, frame_num) if ret else None
+        frame = next(self._frames, None)
+        if frame is None:
+            return False, None, None
+        return True, self._to_bgr(frame, buffer), self._frame_time(frame)
+
+    def _seek_into(self, position, frame_num, buffer):
+        """Decode frame index position into buffer: (ret, image, frame_num, timestamp).
+
+        frame_num is the number of the last frame decoded before the seek.
+        """
+        if self._cap is not None:
+            if self.video_index is not None and position < len(self.video_index):
+                ret, image = self.video_index.read_frame(self._cap, position, position=frame_num, image=buffer)
+            else:
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+                ret, image = self._cap.read(buffer)
+            return ret, image, position + 1, self._clock.frame_timestamp(self._cap, position + 1) if ret else None
+
+        index = self.video_index if self.video_index is not None and position < len(self.video_index) else None
+        target = index.timestamps_ms[position] / 1000.0 if index is not None else position * self.frame_interval
+        if not 0 <= position - frame_num <= MAX_DECODE_AHEAD:
+            # Seek to the keyframe before the target; decoding runs forward from there
+            start_time = self._stream.start_time or 0
+            self._container.seek(int(target / self._stream.time_base) + start_time, stream=self._stream,
+                                 backward=True)
+            self._frames = self._container.decode(self._stream)
+        for frame in self._frames:
+            timestamp = self._frame_time(frame)
+            if timestamp is None or timestamp >= target - self.frame_interval / 2:
+                break
+        else:
+            return False, None, frame_num, None
+        if timestamp is None:
+            landed = position
+        elif index is not None:
+            landed = index.frame_at_time(timestamp * 1000)
+        else:
+            landed = round(timestamp * self.fps)
+        return True, self._to_bgr(frame, buffer), landed + 1, timestamp
+
+    def _frame_time(self, frame):
+        """Media time in seconds from the start of the stream, like OpenCV's CAP_PROP_POS_MSEC"""
+        if frame.pts is None:
+            return None
+        return float((frame.pts - (self._stream.start_time or 0)) * self._stream.time_base)
+
+    def _to_bgr(self, frame, buffer):
+        """A PyAV frame as BGR pixels in buffer (or a new array if it doesn't fit), upright"""
+        rotation = _ROTATIONS.get(frame.rotation)
+        if getattr(frame, "color_trc", None) in _HDR_TRANSFERS:
+            frame = self._hdr_to_sdr(frame)
+        else:
+            frame = frame.reformat(format="bgr24")
+        plane = frame.planes[0]
+        # The plane's rows can be padded beyond width * 3 bytes
+        rows = np.frombuffer(plane, dtype=np.uint8).reshape(frame.height, plane.line_size)
+        image = rows[:, :frame.width * 3].reshape(frame.height, frame.width, 3)
+        if rotation is not None:
+            shape = image.shape if rotation == cv2.ROTATE_180 else (frame.width, frame.height, 3)
+            if buffer is None or buffer.shape != shape:
+                return cv2.rotate(image, rotation)
+            return cv2.rotate(image, rotation, dst=buffer)
+        if buffer is None or buffer.shape != image.shape:
+            return image.copy()
+        np.copyto(buffer, image)
+        return buffer
+
+    def _hdr_to_sdr(self, frame):
+        """An HDR frame converted to BT.709 BGR by FFmpeg's scale filter"""
+        key = (frame.width, frame.height, frame.format.name)
+        if self._sdr_graph is None or self._sdr_graph[0] != key:
+            graph = av.filter.Graph()
+            source = graph.add_buffer(width=frame.width, height=frame.height, format=frame.format,
+                                      time_base=self._stream.time_base)
+            scale = graph.add("scale", _HDR_TO_SDR)
+            to_bgr = graph.add("format", "bgr24")
+            sink = graph.add("buffersink")
+            source.link_to(scale)
+            scale.link_to(to_bgr)
+            to_bgr.link_to(sink)
+            graph.configure()
+            self._sdr_graph = (key, graph)
+        graph = self._sdr_graph[1]
+        graph.push(frame)
+        return graph.pull()
@@ -0,0 +1,288 @@
+import logging
+import queue
+import threading
+import time
+
+from .frame_decoder import FrameDecoder, END_OF_VIDEO
+from .presentation_clock import PresentationClock
+from .video_index import VideoIndex
+
+logger = logging.getLogger(__name__)
+
+# How often blocked stages wake up to check for stop requests (seconds)
+_POLL_INTERVAL = 0.05
+
+class FramePipeline:
+    """Staged playback pipeline: decode thread -> inference worker -> render stage.
+
+    The stages run on background threads connected by bounded queues, so a slow
+    stage blocks the ones before it instead of letting frames pile up. Finished
+    frames are handed to on_frame(frame_num, annotated_frame, result) from the
+    render thread. The consumer must call frame_displayed() once it is done with
+    each frame, which bounds how many frames can wait on the display. That bound
+    must stay below the FrameProcessor's render buffer count, since rendered
+    frames live in reused buffers.
+
+    Decoding is done by a FrameDecoder (decoder_backend and decoder_threads are
+    passed to it), into a ring of frame buffers that each stay in use until the
+    render stage has drawn the frame.
+
+    Frames are paced by a PresentationClock using the video's own timestamps, so
+    playback runs at the source frame rate. When drop_late_frames is set, a frame
+    that is more than max_lag seconds behind the clock is skipped if a newer frame
+    is already waiting, at the inference stage and again before display, so
+    playback keeps real time when processing can't.
+
+    Decode, inference and render times, queue depths and dropped frames go to the
+    FrameProcessor's StageProfiler, which is disabled unless asked for.
+
+    Seeks go through a keyframe index of the video, built on a background thread
+    when the video is opened (and cached on disk), so they land on the exact
+    frame. Tracking state is restored from the FrameProcessor's snapshots rather
+    than reset.
+    """
+    def __init__(self, frame_processor, on_frame, on_finished=None, queue_size=4,
+                 max_pending_display=2, drop_late_frames=True, max_lag=0.1, decoder_backend=None,
+                 decoder_threads=0):
+        self.frame_processor = frame_processor
+        self.on_frame = on_frame
+        self.on_finished = on_finished
+        self.drop_late_frames = drop_late_frames
+        self.max_lag = max_lag
+        self.decoder_backend = decoder_backend
+        self.decoder_threads = decoder_threads
+        # Frames decoded ahead, waiting for inference, waiting for render and in each stage
+        self.decode_buffers = 2 * queue_size + 4
+
+        self.render_queue = queue.Queue(maxsize=queue_size)
+        self.display_slots = threading.Semaphore(max_pending_display)
+        self.profiler = frame_processor.profiler
+        self.profiler.watch_queue("render", self.render_queue)
+
+        self.decoder = None
+        self.clock = PresentationClock()
+        self.total_frames = 0
+        self.decoded_frames = 0
+        self.dropped_frames = 0
+        self.threads = []
+        # Frame index of the video; None until built, when seeks are by frame count
+        self.video_index = None
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        # Frames allowed through while paused (one after each seek, so the new position shows)
+        self._step_frames = 0
+
+    def start(self, video_path):
+        """Open a video and start the pipeline threads. Returns False if it can't be opened."""
+        decoder = FrameDecoder(video_path, buffers=self.decode_buffers, backend=self.decoder_backend,
+                               threads=self.decoder_threads, profiler=self.profiler)
+        if not decoder.open():
+            return False
+
+        self.decoder = decoder
+        self.total_frames = decoder.total_frames
+        self.clock = PresentationClock(decoder.fps)
+        self.profiler.watch_queue("decode", decoder.ready_queue)
+        self.frame_processor.set_video(video_path, self.clock.fps, decoder.cache_tag())
+        threading.Thread(target=self._build_index, args=(video_path, decoder), name="index", daemon=True).start()
+        decoder.start()
+        # Stages hold on to the decoder, which stop() drops
+        self.threads = [
+            threading.Thread(target=self._inference_loop, args=(decoder,), name="inference", daemon=True),
+            threading.Thread(target=self._render_loop, args=(decoder,), name="render", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return True
+
+    def stop(self):
+        """Stop all stages and release the video"""
+        self._stop_event.set()
+        self._resume_event.set()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=1.0)
+        self.threads = []
+        decoder, self.decoder = self.decoder, None
+        if decoder:
+            decoder.stop()
+            # Keep whatever detections were gathered before playback stopped
+            self.frame_processor.finish_video()
+            if self.profiler.trace:
+                trace_path = self.profiler.write_trace()
+                if trace_path:
+                    logger.info("Playback timeline written to %s", trace_path)
+
+    def is_running(self):
+        return bool(self.threads) and not self._stop_event.is_set()
+
+    def pause(self):
+        """Hold frames at the render stage; upstream stages stop once the queues fill"""
+        self._resume_event.clear()
+
+    def resume(self):
+        self.clock.reset()
+        self._resume_event.set()
+
+    def seek(self, frame_position):
+        """Jump to a frame; frames already in flight are discarded"""
+        decoder = self.decoder
+        if decoder is None:
+            return
+        with self._lock:
+            decoder.seek(frame_position)
+            self._step_frames = 1
+        self.clock.reset()
+        while True:
+            try:
+                item = self.render_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is END_OF_VIDEO:
+                # Inference has already stopped; let playback end rather than stall
+                self.render_queue.put_nowait(item)
+                break
+            decoder.release(item[0])
+
+    def frame_displayed(self):
+        """Called by the consumer once it no longer needs a frame passed to on_frame"""
+        self.display_slots.release()
+
+    def _build_index(self, video_path, decoder):
+        try:
+            self.video_index = decoder.video_index = VideoIndex.load_or_build(video_path)
+        except Exception as e:
+            logger.warning("Could not index %s, seeking may be inaccurate: %s", video_path, e)
+
+    def _inference_loop(self, decoder):
+        """Inference stage: detection and shot tracking"""
+        active_generation = 0
+        while not self._stop_event.is_set():
+            frame = decoder.read(timeout=_POLL_INTERVAL)
+            if frame is None:
+                continue
+            if frame is END_OF_VIDEO:
+                self.frame_processor.finish_video(self.decoded_frames)
+                self._put(self.render_queue, frame)
+                return
+
+            self.decoded_frames = frame.frame_num
+            if frame.generation != decoder.generation:
+                decoder.release(frame)
+                continue
+            if frame.generation != active_generation:
+                # First frame after a seek: bring tracking state to the frame before it
+                video_index = self.video_index
+                self.frame_processor.restore_tracking(
+                    frame.frame_num - 1, video_index.timestamps_ms if video_index is not None else None)
+                active_generation = frame.generation
+
+            # Skip stale frames, but only in favour of a newer one that is already decoded
+            if self._is_late(frame.timestamp) and not decoder.ready_queue.empty():
+                decoder.release(frame)
+                self.dropped_frames += 1
+                self.profiler.count("dropped_inference")
+                continue
+
+            try:
+                lateness = self.clock.lateness(frame.timestamp) if self._resume_event.is_set() else None
+                result = self.frame_processor.analyze_frame(frame.image, frame.frame_num, frame.timestamp, lateness)
+            except Exception as e:
+                logger.exception("Error processing frame %d", frame.frame_num)
+                result = {"frame_num": frame.frame_num, "error": str(e)}
+            self._put(self.render_queue, (frame, result))
+
+    def _render_loop(self, decoder):
+        """Render stage: draw annotations, pace to the playback clock and hand frames out"""
+        while not self._stop_event.is_set():
+            item = self._get(self.render_queue)
+            if item is None:
+                continue
+            if item is END_OF_VIDEO:
+                if self.on_finished:
+                    self.on_finished()
+                return
+
+            frame, result = item
+            generation, frame_num, timestamp = frame.generation, frame.frame_num, frame.timestamp
+            if generation != decoder.generation:
+                decoder.release(frame)
+                continue
+
+            start = self.profiler.start()
+            try:
+                annotated_frame = self.frame_processor.render_frame(frame.image, result)
+            except Exception:
+                logger.exception("Error rendering frame %d", frame_num)
+                annotated_frame = frame.image
+            if annotated_frame is frame.image:
+                # Unannotated frames are shown as decoded; the decoder reuses its buffer
+                annotated_frame = frame.image.copy()
+            decoder.release(frame)
+            self.profiler.stop("render", start)
+
+            # Annotations (trail, flash) are drawn for every analyzed frame; only display is skipped
+            if self._is_late(timestamp) and not self.render_queue.empty():
+                self.dropped_frames += 1
+                self.profiler.count("dropped_display")
+                continue
+            if not self._wait_until_due(decoder, generation, timestamp):
+                continue
+            if not self._acquire_display_slot():
+                return
+            if generation != decoder.generation:
+                self.display_slots.release()
+                continue
+            self.profiler.frame_shown()
+            self.on_frame(frame_num, annotated_frame, result)
+
+    def _wait_until_due(self, decoder, generation, timestamp):
+        """Block while paused and until the frame's presentation time.
+
+        Returns False if the frame should not be shown (stopped or seeked away).
+        """
+        while not self._resume_event.is_set():
+            with self._lock:
+                if self._step_frames > 0 and generation == decoder.generation:
+                    self._step_frames -= 1
+                    return True
+            if self._stop_event.is_set() or generation != decoder.generation:
+                return False
+            self._resume_event.wait(_POLL_INTERVAL)
+
+        due_time = self.clock.due_time(timestamp)
+        delay = due_time - time.perf_counter()
+        if delay > 0:
+            self._stop_event.wait(delay)
+        return not self._stop_event.is_set() and generation == decoder.generation
+
+    def _is_late(self, timestamp):
+        """True if a frame is too far behind the playback clock to be worth processing"""
+        if not self.drop_late_frames or not self._resume_event.is_set():
+            return False
+        return self.clock.lateness(timestamp) > self.max_lag
+
+    def _acquire_display_slot(self):
+        while not self._stop_event.is_set():
+            if self.display_slots.acquire(timeout=_POLL_INTERVAL):
+                return True
+        return False
+
+    def _put(self, q, item):
+        """Put with backpressure; gives up only when the pipeline is stopped"""
+        while not self._stop_event.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q):
+        try:
+            return q.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            return None
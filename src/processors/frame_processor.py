@@ -1,8 +1,50 @@
+import bisect
+import logging
+import os
+import threading
+import time
 import cv2
 import numpy as np
 
+from models.detection_cache import DetectionTrack
+
+from .stage_profiler import StageProfiler
+
+logger = logging.getLogger(__name__)
+
+# Flash overlay colors (BGR)
+MADE_FLASH_COLOR = (0, 255, 0)
+MISSED_FLASH_COLOR = (0, 0, 255)
+# Frames a made/missed flash fades out over
+FLASH_FRAMES = 15
+
+class RenderBufferPool:
+    """Reusable output frames for rendering, a small ring of them per resolution.
+    
+    A buffer is handed out again `size` frames later, so size must be larger than
+    the number of rendered frames that can be in use at once (being drawn plus
+    waiting on the display).
+    """
+    def __init__(self, size=4):
+        self.size = size
+        self.buffers = []
+        self.shape = None
+        self.dtype = None
+        self.index = 0
+        
+    def next_buffer(self, shape, dtype):
+        if shape != self.shape or dtype != self.dtype:
+            # New resolution: drop the old ring rather than keeping one per size seen
+            self.buffers = [np.empty(shape, dtype) for _ in range(self.size)]
+            self.shape = shape
+            self.dtype = dtype
+        buffer = self.buffers[self.index]
+        self.index = (self.index + 1) % self.size
+        return buffer
+
 class FrameProcessor:
-    def __init__(self, parent):
+    def __init__(self, parent, detection_cache=None, render_buffers=4, snapshot_interval=15, roi_scheduler=None,
+                 frame_skipper=None, kalman_tracker=None, profiler=None, resolution_controller=None):
         self.parent = parent
         # References to components
         self.video_player = None
@@ -11,6 +53,47 @@ class FrameProcessor:
         self.ball_tracker = None
         self.stats_display = None
         
+        # Cached per-frame detections so replays and seeks skip inference
+        self.detection_cache = detection_cache
+        self.video_path = None
+        self.decoder_tag = None
+        self.detection_track = None
+        self.detection_cache_key = None
+        
+        # Optional RoiScheduler; limits detection to the shot zone once the hoop is stable
+        self.roi_scheduler = roi_scheduler
+        # Optional FrameSkipper; detects only some frames and predicts the ball on the rest
+        self.frame_skipper = frame_skipper
+        # Optional KalmanBallTracker; picks the ball among the candidate boxes and coasts through dropouts
+        self.kalman_tracker = kalman_tracker
+        # Optional ResolutionController; lowers the inference size when playback falls behind
+        self.resolution_controller = resolution_controller
+        # (imgsz, resolution_controller) from set_inference_size, applied between frames
+        self.pending_inference_size = None
+        self._pending_lock = threading.Lock()
+        
+        # Shot detector state every snapshot_interval frames and after frames dropped
+        # during playback, so seeks can restore it
+        self.snapshot_interval = snapshot_interval
+        self.snapshots = {}
+        self.snapshot_frames = []  # Sorted keys of snapshots
+        # False once the detector state is no longer what playing from the start would
+        # give, frames dropped as late aside
+        self.tracking_exact = True
+        self.last_frame_num = 0  # Last frame fed to the shot detector
+        
+        # Per-stage timing; a disabled StageProfiler costs next to nothing
+        self.profiler = profiler or StageProfiler()
+        
+        # Annotated frames are drawn into reused buffers instead of fresh copies
+        self.render_pool = RenderBufferPool(render_buffers)
+        # Solid flash color planes, cached per (shape, color)
+        self.tint_planes = {}
+        # Shot flash in progress, as ("MADE"/"MISSED", frames left). Only render_frame
+        # touches it; other threads ask for it to be cleared through clear_flash()
+        self.flash = (None, 0)
+        self._flash_cleared = threading.Event()
+        
     def set_components(self, video_player, shot_detector, yolo_detector, ball_tracker, stats_display):
         """Set references to all components needed for processing"""
         self.video_player = video_player
@@ -25,117 +108,380 @@ class FrameProcessor:
     def reset_state(self):
         """Reset the processor state"""
         # Clear any cached state in the frame processor
+        self.clear_flash()
         if self.stats_display:
-            # Make sure no flashes are active
-            self.stats_display.shot_made_flash = 0
-            self.stats_display.shot_miss_flash = 0
             self.stats_display.previous_shot_outcome = None
             
-        print("Frame processor state reset")
+        logger.debug("Frame processor state reset")
         
-    def process_next_frame(self):
-        """Process the next frame from the video"""
-        if not self.video_player or not self.shot_detector or not self.yolo_detector or not self.ball_tracker:
-            return
-            
-        # Get the next frame
-        frame, success = self.video_player.get_frame()
-        if not success or frame is None:
+    def set_video(self, video_path, fps=None, decoder_tag=None):
+        """Start a new video; its cached detections are looked up on first use.
+        
+        fps is the video's frame rate, used for timing frames that come without a timestamp.
+        decoder_tag is the FrameDecoder's cache_tag(), as frames can differ between decoders.
+        """
+        self.video_path = video_path
+        self.decoder_tag = decoder_tag
+        if fps and self.shot_detector:
+            self.shot_detector.nominal_fps = fps
+        self.detection_track = None
+        self.detection_cache_key = None
+        self.snapshots = {}
+        self.snapshot_frames = []
+        self.tracking_exact = True
+        self.last_frame_num = 0
+        if self.resolution_controller:
+            self.resolution_controller.reset()
+        
+    def set_inference_size(self, imgsz, resolution_controller=None):
+        """Run detection at imgsz (None for the model's own size), or adaptively with a
+        ResolutionController. Takes effect at the next analyzed frame, so it can be
+        called while a video is playing."""
+        with self._pending_lock:
+            self.pending_inference_size = (imgsz, resolution_controller)
+        
+    def finish_video(self, num_frames=None):
+        """Persist the detections gathered for the current video.
+        
+        num_frames is the real frame count when the end of the video was reached.
+        """
+        track = self.detection_track
+        if track is None:
             return
-            
-        # Process the frame
-        self.process_frame(frame)
+        if num_frames:
+            track.set_length(num_frames)
+        if track.modified:
+            self.detection_cache.save(self.detection_cache_key, track,
+                                      video=os.path.basename(self.video_path),
+                                      model=self.yolo_detector.model_path)
         
-    def process_frame(self, frame):
-        """Process a single frame"""
-        if frame is None:
+    def reset_tracking(self):
+        """Forget tracking state after a jump in the video (seek or replay)"""
+        if self.shot_detector:
+            self.shot_detector.full_reset()
+        if self.ball_tracker:
+            self.ball_tracker.clear_trail()
+        if self.roi_scheduler:
+            self.roi_scheduler.reset()
+        if self.frame_skipper:
+            self.frame_skipper.reset()
+        if self.kalman_tracker:
+            self.kalman_tracker.reset()
+        self.tracking_exact = True
+        self.last_frame_num = 0
+        
+    def restore_tracking(self, position, timestamps_ms=None):
+        """Bring tracking state to where it would be after playing frames 1..position.
+        
+        Starts from the latest snapshot at or before position and replays cached
+        detections from there, so made/attempted counts and any shot in progress
+        survive a seek. Frames dropped during playback were never detected; replay
+        carries on from the snapshot taken after them, as playback did. If a frame in
+        between was never detected and no later snapshot covers it, the state stops
+        short of position and is marked inexact. timestamps_ms, if given, holds the
+        media time of every frame (see VideoIndex) for the replayed frames.
+        """
+        self.clear_flash()
+        if self.ball_tracker:
+            self.ball_tracker.clear_trail()
+        if self.roi_scheduler:
+            self.roi_scheduler.reset()
+        if self.frame_skipper:
+            self.frame_skipper.reset()
+        if self.kalman_tracker:
+            self.kalman_tracker.reset()
+        if not self.shot_detector:
             return
             
-        try:
-            # Run YOLO detection
-            ball_bbox, hoop_bbox = self.yolo_detector.detect(frame)
+        i = bisect.bisect_right(self.snapshot_frames, position)
+        if i == 0:
+            self.reset_tracking()
+            frame_num = 0
+        else:
+            frame_num = self._restore_snapshot(self.snapshot_frames[i - 1])
             
-            # Get current frame number
-            current_frame_num = self.video_player.current_frame_num
+        track = self._load_track() if frame_num < position else None
+        while frame_num < position:
+            if track is None or not track.has(frame_num):
+                # Frames dropped as late: playback skipped them too and went on to the next snapshot
+                i = bisect.bisect_right(self.snapshot_frames, frame_num)
+                if i < len(self.snapshot_frames) and self.snapshot_frames[i] <= position:
+                    frame_num = self._restore_snapshot(self.snapshot_frames[i])
+                    continue
+                logger.info("Tracking state after seek is approximate: frame %d has no cached detections", frame_num + 1)
+                self.tracking_exact = False
+                return
+            ball_bbox, hoop_bbox = track.get(frame_num)
+            timestamp = timestamps_ms[frame_num] / 1000.0 if timestamps_ms is not None and frame_num < len(timestamps_ms) else None
+            frame_num += 1
+            self._update_shot_detector(ball_bbox, hoop_bbox, frame_num, timestamp)
             
-            # Process detection with shot detector
-            shot_status, stats, arc_angle, inst_speed, avg_speed, hoop_dist, shot_outcome = (
-                self.shot_detector.update(
-                    ball_bbox[:4] if ball_bbox else None, 
-                    hoop_bbox[:4] if hoop_bbox else None, 
-                    current_frame_num
-                )
-            )
+    def _restore_snapshot(self, frame_num):
+        """Put the shot detector back to its snapshot at frame_num and return frame_num"""
+        self.shot_detector.restore(self.snapshots[frame_num])
+        self.tracking_exact = True
+        self.last_frame_num = frame_num
+        return frame_num
+        
+    def _update_shot_detector(self, ball_bbox, hoop_bbox, frame_num, timestamp=None):
+        """Feed one frame's detections to the shot detector, snapshotting its state periodically.
+        
+        The first frame after dropped ones is snapshotted too: the dropped frames have no
+        cached detections, so seeks past them restore from there (see restore_tracking).
+        """
+        update = self.shot_detector.update(
+            ball_bbox[:4] if ball_bbox else None, 
+            hoop_bbox[:4] if hoop_bbox else None, 
+            frame_num,
+            timestamp
+        )
+        after_drop = frame_num > self.last_frame_num + 1
+        self.last_frame_num = frame_num
+        if self.tracking_exact and (after_drop or frame_num % self.snapshot_interval == 0):
+            if frame_num not in self.snapshots:
+                bisect.insort(self.snapshot_frames, frame_num)
+            self.snapshots[frame_num] = self.shot_detector.snapshot()
+        return update
+        
+    def analyze_frame(self, frame, frame_num, timestamp=None, lateness=None):
+        """Run detection and shot tracking on a frame.
+        
+        timestamp is the frame's media time in seconds, if known, and lateness how
+        far the frame is behind the playback clock, when playing in real time.
+        Touches no widgets, so it can run on a worker thread.
+        """
+        if timestamp is None:
+            timestamp = (frame_num - 1) / self.shot_detector.nominal_fps
             
-            # Update statistics display
-            self.stats_display.update_stats(
-                stats=stats,
-                arc_angle=arc_angle,
-                inst_speed=inst_speed,
-                avg_speed=avg_speed,
-                hoop_dist=hoop_dist
-            )
+        # A model loaded in the background takes over here, between frames
+        if self.yolo_detector.staged is not None:
+            self._switch_model()
+        if self.pending_inference_size is not None:
+            self._switch_inference_size()
             
-            if shot_status == "PROCESSING":
-                self.stats_display.set_status("Processing...")
+        # Run YOLO detection, or reuse the cached boxes of this frame
+        start = self.profiler.start()
+        ball_bbox, hoop_bbox = self._detect(frame, frame_num, timestamp, lateness)
+        self.profiler.stop("detect", start)
+        
+        # Process detection with shot detector
+        start = self.profiler.start()
+        shot_status, stats, arc_angle, inst_speed, avg_speed, hoop_dist, shot_outcome = (
+            self._update_shot_detector(ball_bbox, hoop_bbox, frame_num, timestamp)
+        )
+        self.profiler.stop("shot", start)
+        
+        return {
+            "frame_num": frame_num,
+            "ball_bbox": ball_bbox,
+            "hoop_bbox": hoop_bbox,
+            "shot_status": shot_status,
+            "stats": stats,
+            "arc_angle": arc_angle,
+            "inst_speed": inst_speed,
+            "avg_speed": avg_speed,
+            "hoop_dist": hoop_dist,
+            "shot_outcome": shot_outcome,
+        }
+        
+    def _detect(self, frame, frame_num, timestamp, lateness=None):
+        """Detect ball and hoop, going through the detection cache when one is set"""
+        track = self._load_track()
+        index = frame_num - 1
+        if track is not None and track.has(index):
+            ball_bbox, hoop_bbox = track.get(index)
+            if self.frame_skipper:
+                self.frame_skipper.observe(timestamp, ball_bbox, hoop_bbox)
+            return ball_bbox, hoop_bbox
             
-            # Check for shot results and update UI
-            if shot_status == "MADE" or shot_outcome == "MADE":
-                self.stats_display.set_result("SHOT MADE!", is_made=True)
-                # Force set flash to ensure visual feedback
-                self.stats_display.shot_made_flash = self.stats_display.shot_made_flash_duration
-                self.stats_display.shot_miss_flash = 0  # Ensure only one flash shows
-                print("Shot MADE detected!")  # Debug output
-            elif shot_status == "MISSED" or shot_outcome == "MISSED":
-                self.stats_display.set_result("SHOT MISSED", is_made=False)
-                # Force set flash to ensure visual feedback
-                self.stats_display.shot_miss_flash = self.stats_display.shot_miss_flash_duration
-                self.stats_display.shot_made_flash = 0  # Ensure only one flash shows
-                print("Shot MISSED detected!")  # Debug output
-                
-            # Draw ball and hoop on the frame
-            annotated_frame = self.yolo_detector.draw_detections(frame, ball_bbox, hoop_bbox)
+        if self.frame_skipper and not self.frame_skipper.should_detect(self.shot_detector, timestamp):
+            ball_bbox, hoop_bbox = self.frame_skipper.predict(timestamp)
+        else:
+            roi = self.roi_scheduler.next_roi(self.shot_detector, frame.shape) if self.roi_scheduler else None
+            controller = self.resolution_controller
+            imgsz = controller.next_imgsz(self.shot_detector) if controller else None
+            start = time.perf_counter()
+            if self.kalman_tracker:
+                ball_boxes, hoop_boxes = self.yolo_detector.detect_all(frame, roi, imgsz)
+                ball_bbox = self.kalman_tracker.update(timestamp, ball_boxes)
+                hoop_bbox = hoop_boxes[0] if hoop_boxes else None
+            else:
+                ball_bbox, hoop_bbox = self.yolo_detector.detect(frame, roi, imgsz)
+            if controller:
+                controller.report(imgsz, time.perf_counter() - start, 1.0 / self.shot_detector.nominal_fps, lateness)
+            if self.roi_scheduler:
+                self.roi_scheduler.report(roi, hoop_bbox)
+            if self.frame_skipper:
+                self.frame_skipper.observe(timestamp, ball_bbox, hoop_bbox)
+        if track is not None:
+            track.set(index, ball_bbox, hoop_bbox)
+        return ball_bbox, hoop_bbox
+        
+    def _switch_model(self):
+        """Start using the detector's staged model; later detections are cached under it"""
+        # Detections so far belong to the old model
+        self.finish_video()
+        if self.yolo_detector.apply_staged_model():
+            self.detection_track = None
+            self.detection_cache_key = None
+            logger.info("Switched to model %s", self.yolo_detector.model_path)
+        
+    def _switch_inference_size(self):
+        """Apply set_inference_size; later detections are cached under the new settings"""
+        self.finish_video()
+        with self._pending_lock:
+            (imgsz, self.resolution_controller), self.pending_inference_size = self.pending_inference_size, None
+        self.yolo_detector.imgsz = imgsz
+        if self.resolution_controller:
+            self.resolution_controller.reset()
+        self.detection_track = None
+        self.detection_cache_key = None
+        logger.info("Inference size set to %s%s", imgsz or "the model's own",
+                    ", adaptive" if self.resolution_controller else "")
+        
+    def _load_track(self):
+        """The current video's detection track, or None without a detection cache"""
+        if self.detection_cache is None or self.video_path is None:
+            return None
+        if self.detection_track is None:
+            # Hashing happens here, on the worker thread, rather than when the video is opened
+            helpers = (self.roi_scheduler, self.frame_skipper, self.kalman_tracker, self.resolution_controller)
+            tags = [helper.cache_tag() for helper in helpers if helper]
+            if self.decoder_tag:
+                tags.append(self.decoder_tag)
+            self.detection_cache_key = self.detection_cache.key_for(self.video_path, self.yolo_detector, *tags)
+            self.detection_track = self.detection_cache.load(self.detection_cache_key) or DetectionTrack.empty()
+        return self.detection_track
+        
+    def apply_result(self, result):
+        """Show a frame's analysis result in the statistics panel (GUI thread only)"""
+        if "error" in result:
+            self.stats_display.set_status(f"Processing error: {result['error'][:50]}")
+            return
             
-            # Add ball trail
-            if ball_bbox:
-                ball_x1, ball_y1, ball_x2, ball_y2 = ball_bbox[:4]
-                ball_center = ((ball_x1 + ball_x2) // 2, (ball_y1 + ball_y2) // 2)
-                self.ball_tracker.add_position(ball_center)
+        # Update statistics display
+        start = self.profiler.start()
+        self.stats_display.update_stats(
+            stats=result["stats"],
+            arc_angle=result["arc_angle"],
+            inst_speed=result["inst_speed"],
+            avg_speed=result["avg_speed"],
+            hoop_dist=result["hoop_dist"]
+        )
+        
+        if result["shot_status"] == "PROCESSING":
+            self.stats_display.set_status("Processing...")
+        
+        # Check for shot results and update UI. The flash itself is started by
+        # render_frame so it lines up with the rendered frames.
+        outcome = self._shot_outcome(result)
+        if outcome == "MADE":
+            self.stats_display.set_result("SHOT MADE!", is_made=True)
+            logger.info("Shot made", extra={"event": "shot", "frame": result["frame_num"], "made": True})
+        elif outcome == "MISSED":
+            self.stats_display.set_result("SHOT MISSED", is_made=False)
+            logger.info("Shot missed", extra={"event": "shot", "frame": result["frame_num"], "made": False})
+        self.profiler.stop("stats", start)
             
-            # Draw ball trail
-            annotated_frame = self.ball_tracker.draw_trail(annotated_frame)
+    def render_frame(self, frame, result):
+        """Draw detections, ball trail and shot flash for a frame.
+        
+        Touches no widgets, so it can run on a worker thread.
+        """
+        if "error" in result:
+            return frame
             
-            # Apply flash effect for shot outcomes
-            flash_type, intensity = self.stats_display.get_flash_status()
-            if flash_type == "MADE":
-                # Green flash for made shots
-                overlay = np.zeros_like(annotated_frame)
-                overlay[:] = (0, 255, 0)  # Pure green overlay
-                alpha = 0.3 * (intensity / self.stats_display.shot_made_flash_duration)  # Fade out effect
-                annotated_frame = cv2.addWeighted(overlay, alpha, annotated_frame, 1-alpha, 0)
-                
-                # Also add "MADE" text
-                cv2.putText(annotated_frame, "MADE!", 
-                           (annotated_frame.shape[1]//2 - 100, 100), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 5)
-                
-            elif flash_type == "MISSED":
-                # Red flash for missed shots
-                overlay = np.zeros_like(annotated_frame)
-                overlay[:] = (0, 0, 255)  # Pure red overlay
-                alpha = 0.3 * (intensity / self.stats_display.shot_miss_flash_duration)  # Fade out effect
-                annotated_frame = cv2.addWeighted(overlay, alpha, annotated_frame, 1-alpha, 0)
-                
-                # Also add "MISSED" text
-                cv2.putText(annotated_frame, "MISSED", 
-                           (annotated_frame.shape[1]//2 - 100, 100), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 5)
+        ball_bbox = result["ball_bbox"]
+        
+        # Flash state is this thread's; resets from elsewhere arrive as a request
+        if self._flash_cleared.is_set():
+            self._flash_cleared.clear()
+            self.flash = (None, 0)
+        # A new shot outcome starts its flash, replacing any still fading
+        outcome = self._shot_outcome(result)
+        if outcome:
+            self.flash = (outcome, FLASH_FRAMES)
             
-            # Display the frame
-            self.video_player.display_frame(annotated_frame)
+        # Draw everything into one reused output buffer; the input frame stays untouched
+        start = self.profiler.start()
+        annotated_frame = self.render_pool.next_buffer(frame.shape, frame.dtype)
+        np.copyto(annotated_frame, frame)
+        
+        # Draw ball and hoop on the frame
+        self.yolo_detector.draw_detections(annotated_frame, ball_bbox, result["hoop_bbox"], in_place=True)
+        self.profiler.stop("draw", start)
+        
+        # Add ball trail
+        start = self.profiler.start()
+        if ball_bbox:
+            ball_x1, ball_y1, ball_x2, ball_y2 = ball_bbox[:4]
+            ball_center = ((ball_x1 + ball_x2) // 2, (ball_y1 + ball_y2) // 2)
+            self.ball_tracker.add_position(ball_center)
+        
+        # Draw ball trail
+        self.ball_tracker.draw_trail(annotated_frame)
+        self.profiler.stop("trail", start)
+        
+        # Apply flash effect for shot outcomes
+        start = self.profiler.start()
+        flash_type, intensity = self._next_flash()
+        if flash_type == "MADE":
+            # Green flash for made shots
+            alpha = 0.3 * (intensity / FLASH_FRAMES)  # Fade out effect
+            self._blend_flash(annotated_frame, MADE_FLASH_COLOR, alpha)
+            
+            # Also add "MADE" text
+            cv2.putText(annotated_frame, "MADE!", 
+                       (annotated_frame.shape[1]//2 - 100, 100), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 5)
+            
+        elif flash_type == "MISSED":
+            # Red flash for missed shots
+            alpha = 0.3 * (intensity / FLASH_FRAMES)  # Fade out effect
+            self._blend_flash(annotated_frame, MISSED_FLASH_COLOR, alpha)
             
-        except Exception as e:
-            print(f"Error processing frame: {e}")
-            # Still display the original frame to prevent black screen
-            self.video_player.display_frame(frame)
-            self.stats_display.set_status(f"Processing error: {str(e)[:50]}") 
\ No newline at end of file
+            # Also add "MISSED" text
+            cv2.putText(annotated_frame, "MISSED", 
+                       (annotated_frame.shape[1]//2 - 100, 100), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 5)
+        self.profiler.stop("flash", start)
+        
+        self.profiler.draw_overlay(annotated_frame)
+        return annotated_frame
+        
+    def clear_flash(self):
+        """Stop any shot flash from the next rendered frame on; safe from any thread"""
+        self._flash_cleared.set()
+        
+    def _next_flash(self):
+        """Count the flash down one frame: (flash type, frames left) or (None, 0)"""
+        flash_type, frames_left = self.flash
+        if frames_left <= 0:
+            return None, 0
+        frames_left -= 1
+        self.flash = (flash_type, frames_left)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s flash active: %d", flash_type.capitalize(), frames_left,
+                         extra={"event": "flash", "outcome": flash_type, "remaining": frames_left})
+        return flash_type, frames_left
+        
+    def _blend_flash(self, frame, color, alpha):
+        """Blend a solid color over the frame in place"""
+        key = (frame.shape, color)
+        tint = self.tint_planes.get(key)
+        if tint is None:
+            # Only one resolution is in use at a time, so keep just the current one's planes
+            self.tint_planes = {k: v for k, v in self.tint_planes.items() if k[0] == frame.shape}
+            tint = np.empty_like(frame)
+            tint[:] = color
+            self.tint_planes[key] = tint
+        cv2.addWeighted(tint, alpha, frame, 1-alpha, 0, frame)
+        
+    @staticmethod
+    def _shot_outcome(result):
+        """Return "MADE"/"MISSED" if the result reports a shot outcome, else None"""
+        if result["shot_status"] == "MADE" or result["shot_outcome"] == "MADE":
+            return "MADE"
+        if result["shot_status"] == "MISSED" or result["shot_outcome"] == "MISSED":
+            return "MISSED"
+        return None
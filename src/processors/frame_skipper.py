@@ -0,0 +1,60 @@
+import math
+
+from models.motion_model import BallMotionModel
+
+class FrameSkipper:
+    """Runs detection on only some frames and fills in the rest from a motion model.
+
+    Every frame is detected while a shot is in progress, while the ball is near
+    the hoop and while the hoop hasn't been found. Otherwise up to max_skip frames
+    in a row are skipped. On skipped frames the ball box comes from a
+    BallMotionModel fitted to the latest detections and the hoop keeps its last
+    detected box, so the shot detector and ball trail still get a position every
+    frame.
+    """
+    def __init__(self, max_skip=2, near_hoop_widths=4.0, max_age=0.5):
+        self.max_skip = max(0, int(max_skip))
+        # Ball-to-hoop distance, in hoop widths, below which every frame is detected
+        self.near_hoop_widths = near_hoop_widths
+        self.motion_model = BallMotionModel(max_age=max_age)
+        self.hoop_bbox = None
+        self.skipped_in_row = 0
+
+    def cache_tag(self):
+        """Identifies these settings in detection cache keys; skipped frames hold predictions"""
+        return f"skip:{self.max_skip}:{self.near_hoop_widths}:{self.motion_model.max_age}"
+
+    def reset(self):
+        """Forget the ball's motion, e.g. after a seek"""
+        self.motion_model.reset()
+        self.hoop_bbox = None
+        self.skipped_in_row = 0
+
+    def should_detect(self, shot_detector, timestamp):
+        """Whether the next frame needs the detector; counts it as skipped if not"""
+        if (self.skipped_in_row >= self.max_skip or shot_detector.shot_in_progress
+                or self.hoop_bbox is None or self._ball_near_hoop(timestamp)):
+            self.skipped_in_row = 0
+            return True
+        self.skipped_in_row += 1
+        return False
+
+    def observe(self, timestamp, ball_bbox, hoop_bbox):
+        """Feed a detected frame's boxes to the motion model"""
+        self.motion_model.update(timestamp, ball_bbox)
+        if hoop_bbox is not None:
+            self.hoop_bbox = hoop_bbox
+
+    def predict(self, timestamp):
+        """(ball_bbox, hoop_bbox) standing in for detection on a skipped frame"""
+        return self.motion_model.predict(timestamp), self.hoop_bbox
+
+    def _ball_near_hoop(self, timestamp):
+        ball_bbox = self.motion_model.predict(timestamp)
+        if ball_bbox is None:
+            return False
+        ball_x1, ball_y1, ball_x2, ball_y2 = ball_bbox[:4]
+        hoop_x1, hoop_y1, hoop_x2, hoop_y2 = self.hoop_bbox[:4]
+        distance = math.hypot((ball_x1 + ball_x2 - hoop_x1 - hoop_x2) / 2,
+                              (ball_y1 + ball_y2 - hoop_y1 - hoop_y2) / 2)
+        return distance < self.near_hoop_widths * (hoop_x2 - hoop_x1)
@@ -0,0 +1,151 @@
+import logging
+import math
+
+from .shot_detector import ShotDetector
+
+logger = logging.getLogger(__name__)
+
+# Most hoops tracked at once that aren't stations yet; the least recently seen go first
+MAX_HOOP_CANDIDATES = 16
+
+class Station:
+    """One hoop in view, with its own shot detector and, optionally, ball tracker"""
+    def __init__(self, station_id, hoop_bbox, shot_detector, kalman_tracker=None):
+        self.station_id = station_id
+        self.hoop_bbox = hoop_bbox
+        self.shot_detector = shot_detector
+        self.kalman_tracker = kalman_tracker
+
+    def hoop_center(self):
+        x1, y1, x2, y2 = self.hoop_bbox[:4]
+        return (x1 + x2) / 2, (y1 + y2) / 2
+
+    def hoop_width(self):
+        return max(self.hoop_bbox[2] - self.hoop_bbox[0], 1)
+
+class MultiStationTracker:
+    """Shot tracking for several shooting stations seen by one camera.
+
+    Every hoop that is detected steadily (in min_hoop_hits frames, none more than
+    max_hoop_gap frames apart) becomes a station with its own ShotDetector.
+    Scattered false-positive hoop boxes are forgotten before they add up. Each
+    frame, every detected hoop box is matched to the station it belongs to, and
+    every ball box goes to the station whose hoop is nearest, relative to hoop
+    size, if within ball_range hoop widths. So one detection pass per frame
+    drives the shot state of every station.
+    """
+    def __init__(self, shot_detector_factory=ShotDetector, kalman_tracker_factory=None, max_stations=8,
+                 min_hoop_hits=5, max_hoop_gap=3, ball_range=6.0, nominal_fps=30):
+        self.shot_detector_factory = shot_detector_factory
+        # Optional per-station KalmanBallTracker factory; picks each station's ball among its candidates
+        self.kalman_tracker_factory = kalman_tracker_factory
+        self.max_stations = max_stations
+        self.min_hoop_hits = min_hoop_hits
+        self.max_hoop_gap = max_hoop_gap
+        self.ball_range = ball_range
+        self.nominal_fps = nominal_fps
+        self.stations = []
+        # Hoops seen but not yet steady enough to be stations, as [hoop_bbox, hits, last frame seen]
+        self.hoop_candidates = []
+        # Frames passed to assign() so far
+        self.frame_count = 0
+
+    def reset(self):
+        self.stations = []
+        self.hoop_candidates = []
+        self.frame_count = 0
+
+    def assign(self, ball_boxes, hoop_boxes, timestamp=None):
+        """Split one frame's detections between the stations.
+
+        ball_boxes and hoop_boxes are every box detected in the frame, most confident
+        first (see YOLODetector.detect_all). Returns (station, ball_bbox, hoop_bbox)
+        for every station, ready for its shot detector.
+        """
+        self.frame_count += 1
+        station_hoops = self._match_hoops(hoop_boxes)
+        station_balls = {station.station_id: [] for station in self.stations}
+        for ball_bbox in ball_boxes:
+            station = self._nearest_station(ball_bbox)
+            if station is not None:
+                station_balls[station.station_id].append(ball_bbox)
+
+        assignments = []
+        for station in self.stations:
+            balls = station_balls[station.station_id]
+            if station.kalman_tracker is not None:
+                ball_bbox = station.kalman_tracker.update(timestamp, balls)
+            else:
+                ball_bbox = balls[0] if balls else None
+            assignments.append((station, ball_bbox, station_hoops.get(station.station_id)))
+        return assignments
+
+    def get_stats(self):
+        """(made, attempted) summed over all stations"""
+        made = sum(station.shot_detector.shots_made for station in self.stations)
+        attempted = sum(station.shot_detector.shots_attempted for station in self.stations)
+        return made, attempted
+
+    def _match_hoops(self, hoop_boxes):
+        """Match hoop boxes to stations by center distance, promoting steady new hoops to stations"""
+        station_hoops = {}
+        # Candidates not seen for a while were false positives or have left the view
+        self.hoop_candidates = [c for c in self.hoop_candidates if self.frame_count - c[2] <= self.max_hoop_gap]
+        for hoop_bbox in hoop_boxes:
+            station = self._station_for_hoop(hoop_bbox)
+            if station is not None:
+                if station.station_id not in station_hoops:
+                    station.hoop_bbox = hoop_bbox
+                    station_hoops[station.station_id] = hoop_bbox
+                continue
+
+            candidate = next((c for c in self.hoop_candidates if _same_hoop(c[0], hoop_bbox)), None)
+            if candidate is None:
+                if len(self.hoop_candidates) >= MAX_HOOP_CANDIDATES:
+                    self.hoop_candidates.remove(min(self.hoop_candidates, key=lambda c: c[2]))
+                self.hoop_candidates.append([hoop_bbox, 1, self.frame_count])
+                continue
+            if candidate[2] == self.frame_count:
+                # Another box on the same hoop this frame
+                continue
+            candidate[0] = hoop_bbox
+            candidate[1] += 1
+            candidate[2] = self.frame_count
+            if candidate[1] >= self.min_hoop_hits and len(self.stations) < self.max_stations:
+                self.hoop_candidates.remove(candidate)
+                station = self._add_station(hoop_bbox)
+                station_hoops[station.station_id] = hoop_bbox
+        return station_hoops
+
+    def _station_for_hoop(self, hoop_bbox):
+        for station in self.stations:
+            if _same_hoop(station.hoop_bbox, hoop_bbox):
+                return station
+        return None
+
+    def _add_station(self, hoop_bbox):
+        shot_detector = self.shot_detector_factory()
+        shot_detector.nominal_fps = self.nominal_fps
+        kalman_tracker = self.kalman_tracker_factory() if self.kalman_tracker_factory else None
+        station = Station(len(self.stations) + 1, hoop_bbox, shot_detector, kalman_tracker)
+        self.stations.append(station)
+        logger.info("Station %d added at hoop %s", station.station_id, list(hoop_bbox[:4]),
+                    extra={"event": "station_added", "station": station.station_id})
+        return station
+
+    def _nearest_station(self, ball_bbox):
+        ball_x = (ball_bbox[0] + ball_bbox[2]) / 2
+        ball_y = (ball_bbox[1] + ball_bbox[3]) / 2
+        nearest, nearest_distance = None, self.ball_range
+        for station in self.stations:
+            hoop_x, hoop_y = station.hoop_center()
+            distance = math.hypot(ball_x - hoop_x, ball_y - hoop_y) / station.hoop_width()
+            if distance < nearest_distance:
+                nearest, nearest_distance = station, distance
+        return nearest
+
+def _same_hoop(hoop_a, hoop_b):
+    """True if two hoop boxes' centers are within one hoop width of each other"""
+    center_ax, center_ay = (hoop_a[0] + hoop_a[2]) / 2, (hoop_a[1] + hoop_a[3]) / 2
+    center_bx, center_by = (hoop_b[0] + hoop_b[2]) / 2, (hoop_b[1] + hoop_b[3]) / 2
+    return math.hypot(center_ax - center_bx, center_ay - center_by) < max(hoop_a[2] - hoop_a[0], 1)
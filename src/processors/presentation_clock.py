@@ -0,0 +1,56 @@
+import threading
+import time
+import cv2
+
+DEFAULT_FPS = 30.0
+
+class PresentationClock:
+    """Playback clock that maps media timestamps to wall-clock presentation times.
+
+    Frame timestamps come from the video itself (CAP_PROP_POS_MSEC), so playback
+    runs at the source's real speed whatever its frame rate, including variable
+    frame rate clips. The clock anchors itself to the first frame presented after
+    a reset, so pausing and seeking just reset it.
+    """
+    def __init__(self, fps=None):
+        # CAP_PROP_FPS is 0 or nonsense for some containers
+        self.fps = fps if fps and 0 < fps < 1000 else DEFAULT_FPS
+        self.frame_interval = 1.0 / self.fps
+        self._lock = threading.Lock()
+        # (wall time, media time) that the clock is aligned to
+        self._anchor = None
+
+    @classmethod
+    def from_capture(cls, cap):
+        return cls(cap.get(cv2.CAP_PROP_FPS))
+
+    def frame_timestamp(self, cap, frame_num):
+        """Media time in seconds of the frame cap just read, frame_num counting from 1"""
+        timestamp_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if timestamp_ms > 0 or frame_num <= 1:
+            return timestamp_ms / 1000.0
+        # Some backends don't report positions; assume a constant frame rate
+        return (frame_num - 1) * self.frame_interval
+
+    def reset(self):
+        """Re-anchor on the next frame, e.g. after a pause or a seek"""
+        with self._lock:
+            self._anchor = None
+
+    def is_anchored(self):
+        with self._lock:
+            return self._anchor is not None
+
+    def due_time(self, media_time):
+        """Wall-clock (perf_counter) time a frame should be shown, anchoring the clock on first use"""
+        with self._lock:
+            if self._anchor is None:
+                self._anchor = (time.perf_counter(), media_time)
+            anchor_time, anchor_media_time = self._anchor
+        return anchor_time + (media_time - anchor_media_time)
+
+    def lateness(self, media_time):
+        """Seconds a frame is behind its presentation time (negative if early, 0 before anchoring)"""
+        if not self.is_anchored():
+            return 0.0
+        return time.perf_counter() - self.due_time(media_time)
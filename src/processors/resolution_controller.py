@@ -0,0 +1,93 @@
+class ResolutionController:
+    """Adaptive inference size for real-time playback.
+
+    Detection runs at the largest of sizes while it keeps up. When the playback
+    pipeline falls behind real time, or detection alone takes more than budget of
+    the frame interval, the size steps down one at a time. It steps back up once
+    the next size up is expected to fit the budget, estimated from the current
+    size's detection time scaled by pixel count. While a shot is in progress the
+    largest size is always used, since that is when small-ball precision near
+    the rim matters most.
+
+    With max_imgsz, sizes above it are dropped and max_imgsz becomes the largest.
+    """
+    def __init__(self, sizes=(320, 416, 512, 640), max_imgsz=None, budget=0.8, max_lag=0.1, down_after=3, up_after=30,
+                 settle_frames=10, smoothing=0.2):
+        if max_imgsz:
+            sizes = [size for size in sizes if size < max_imgsz] + [max_imgsz]
+        self.sizes = sorted(sizes)
+        # Fraction of the frame interval detection may take
+        self.budget = budget
+        # Seconds behind the playback clock that count as falling behind
+        self.max_lag = max_lag
+        # Frames in a row over or under budget before stepping down or up
+        self.down_after = down_after
+        self.up_after = up_after
+        # Frames after a change before the next one, so frames queued before it can drain
+        self.settle_frames = settle_frames
+        self.smoothing = smoothing
+        self.reset()
+
+    def cache_tag(self):
+        """Identifies these settings in detection cache keys; detections vary with the size used"""
+        return "res:" + ",".join(str(size) for size in self.sizes)
+
+    def reset(self):
+        """Start again from the largest size, e.g. for a new video"""
+        self.level = len(self.sizes) - 1
+        self.detect_time = None  # Smoothed detection seconds at the current level
+        self.frames_behind = 0
+        self.frames_ahead = 0
+        self.frames_to_settle = 0
+
+    def next_imgsz(self, shot_detector):
+        """Inference size for the next frame"""
+        if shot_detector is not None and shot_detector.shot_in_progress:
+            return self.sizes[-1]
+        return self.sizes[self.level]
+
+    def report(self, imgsz, detect_seconds, frame_interval, lateness=None):
+        """Record a frame's detection time at imgsz.
+
+        frame_interval is the time between frames at the playback rate, and lateness
+        how far the frame was behind the playback clock when it was detected, if known.
+        """
+        current = self.sizes[self.level]
+        if imgsz != current:
+            # Shot frames always run at the largest size and say nothing about this one
+            return
+        if self.detect_time is None:
+            self.detect_time = detect_seconds
+        else:
+            self.detect_time += self.smoothing * (detect_seconds - self.detect_time)
+        if self.frames_to_settle > 0:
+            self.frames_to_settle -= 1
+            return
+
+        budget = self.budget * frame_interval
+        if self.detect_time > budget or (lateness is not None and lateness > self.max_lag):
+            self.frames_ahead = 0
+            self.frames_behind += 1
+            if self.frames_behind >= self.down_after and self.level > 0:
+                self._step(-1)
+            return
+
+        self.frames_behind = 0
+        if self.level == len(self.sizes) - 1:
+            return
+        larger = self.sizes[self.level + 1]
+        if self.detect_time * (larger / current) ** 2 <= budget:
+            self.frames_ahead += 1
+            if self.frames_ahead >= self.up_after:
+                self._step(1)
+        else:
+            self.frames_ahead = 0
+
+    def _step(self, direction):
+        current = self.sizes[self.level]
+        self.level += direction
+        # Carry the estimate over, so the new size doesn't start from nothing
+        self.detect_time *= (self.sizes[self.level] / current) ** 2
+        self.frames_behind = 0
+        self.frames_ahead = 0
+        self.frames_to_settle = self.settle_frames
@@ -0,0 +1,39 @@
+import csv
+import json
+import os
+
+SHOT_CSV_FIELDS = ["video", "station", "shot", "outcome", "start_frame", "end_frame", "time_sec",
+                   "arc_angle", "avg_speed", "made_total", "attempted_total"]
+
+def write_results(results, output_path, output_format=None, session=None):
+    """Write analysis results as JSON or CSV, picking the format from the extension if not given.
+    
+    session is an optional summary of the whole run, included in JSON output.
+    """
+    if output_format is None:
+        output_format = "csv" if output_path.lower().endswith(".csv") else "json"
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    if output_format == "csv":
+        write_csv(results, output_path)
+    else:
+        write_json(results, output_path, session)
+
+def write_json(results, output_path, session=None):
+    """Write the full per-video results, including per-shot details, as JSON"""
+    report = {"session": session} if session else {}
+    report["videos"] = results
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+def write_csv(results, output_path):
+    """Write one CSV row per detected shot"""
+    with open(output_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SHOT_CSV_FIELDS)
+        writer.writeheader()
+        for result in results:
+            for shot in result.get("shots", []):
+                writer.writerow({"video": result["video"], **shot})
@@ -0,0 +1,47 @@
+class RoiScheduler:
+    """Adaptive region-of-interest detection around the hoop.
+
+    Once the ShotDetector has a stable hoop position, detection only needs to
+    cover the hoop and the zone shots pass through, which is a small part of the
+    frame on wide-angle footage. The full frame is still searched every
+    full_frame_interval frames, and right after a crop misses the hoop, so a
+    moved camera or hoop is picked up again.
+    """
+    def __init__(self, full_frame_interval=30, max_area_fraction=0.6, margin=1.5):
+        self.full_frame_interval = max(1, int(full_frame_interval))
+        # Crops covering more of the frame than this save too little to bother
+        self.max_area_fraction = max_area_fraction
+        # Padding around the shot zone, in hoop widths
+        self.margin = margin
+        self.frames_until_full = 0
+
+    def cache_tag(self):
+        """Identifies these settings in detection cache keys; ROI detections differ from full-frame ones"""
+        return f"roi:{self.full_frame_interval}:{self.max_area_fraction}:{self.margin}"
+
+    def reset(self):
+        """Search the full frame next, e.g. after a seek"""
+        self.frames_until_full = 0
+
+    def next_roi(self, shot_detector, frame_shape):
+        """Region (x1, y1, x2, y2) to run detection on for the next frame, or None for the full frame"""
+        if self.frames_until_full <= 0:
+            self.frames_until_full = self.full_frame_interval - 1
+            return None
+        self.frames_until_full -= 1
+
+        zone = shot_detector.get_shot_zone(self.margin)
+        if zone is None:
+            return None
+
+        height, width = frame_shape[:2]
+        x1, y1 = max(0, int(zone[0])), max(0, int(zone[1]))
+        x2, y2 = min(width, int(zone[2]) + 1), min(height, int(zone[3]) + 1)
+        if x2 <= x1 or y2 <= y1 or (x2 - x1) * (y2 - y1) > self.max_area_fraction * width * height:
+            return None
+        return (x1, y1, x2, y2)
+
+    def report(self, roi, hoop_bbox):
+        """Record a detection result; a crop that lost the hoop means a full-frame search next"""
+        if roi is not None and hoop_bbox is None:
+            self.frames_until_full = 0
@@ -1,11 +1,35 @@
 from collections import deque
+import copy
+import logging
 import numpy as np
 import math
 
+from .trajectory_buffer import TrajectoryBuffer
+
+logger = logging.getLogger(__name__)
+
+# Geometry and timing of shot detection, in hoop sizes and frames. ShotDetector and
+# score_track take any of these as keyword arguments.
+DEFAULT_SHOT_PARAMS = {
+    "upper_zone_factor": 1.2,  # Ball is up once this many hoop heights above the hoop
+    "up_band": 2.0,            # ...and within this many hoop widths either side of it
+    "down_band": 1.5,          # Ball is down below the hoop within this many hoop widths either side
+    "rim_height_factor": 0.5,  # Rim line, as a fraction of the hoop height from its top
+    "rim_tolerance": 0.7,      # Made if the ball crosses the rim line this many hoop widths from center
+    "cooldown_frames": 15,     # Frames after a shot before the next one can be scored
+    "hoop_history": 10,        # Detected hoop boxes averaged while the hoop is missing
+}
+
 class ShotDetector:
-    def __init__(self, hoop_y_threshold_factor=0.6, trajectory_frames=30, min_ball_confidence=0.4, min_hoop_confidence=0.25, nominal_fps=30):
-        self.ball_positions_all_time = deque(maxlen=trajectory_frames) # For trajectory analysis, increased to 30
-        self.current_shot_trajectory = [] # Store (center_x, center_y, frame_count) for current shot
+    def __init__(self, hoop_y_threshold_factor=0.6, trajectory_frames=30, min_ball_confidence=0.4, min_hoop_confidence=0.25, nominal_fps=30, **shot_params):
+        unknown = set(shot_params) - set(DEFAULT_SHOT_PARAMS)
+        if unknown:
+            raise TypeError(f"Unknown shot detection parameters: {', '.join(sorted(unknown))}")
+        for name, value in DEFAULT_SHOT_PARAMS.items():
+            setattr(self, name, shot_params.get(name, value))
+
+        self.ball_positions_all_time = TrajectoryBuffer(trajectory_frames) # For trajectory analysis, increased to 30
+        self.current_shot_trajectory = TrajectoryBuffer(64, ring=False) # Ball centers, frames and times of the current shot
         self.hoop_bbox = None
         self.hoop_center = None
         
@@ -22,6 +46,7 @@ class ShotDetector:
         self.min_hoop_confidence = min_hoop_confidence  # Lower confidence threshold for hoop
 
         self.frame_counter = 0
+        self.current_time = 0.0  # Media time of the current frame, in seconds
         self.last_arc_angle = None
         self.current_ball_speed_inst = None
         self.last_shot_avg_speed = None
@@ -32,14 +57,15 @@ class ShotDetector:
         self.ball_up = False
         self.ball_down = False
         self.ball_up_frame = 0
+        self.ball_up_time = 0.0
         self.ball_down_frame = 0
         self.previous_shot_outcome = None
         
         # Additional variables for more robust detection
-        self.hoop_position_buffer = deque(maxlen=10)  # Store recent hoop positions
+        self.hoop_position_buffer = deque(maxlen=self.hoop_history)  # Store recent hoop positions
         self.detection_cooldown = 0  # Prevent rapid re-detection
         
-        print("Shot detector initialized")
+        logger.debug("Shot detector initialized")
 
     def _get_bbox_center(self, bbox):
         if bbox is None:
@@ -63,8 +89,14 @@ class ShotDetector:
         
         return avg_bbox, avg_center
 
-    def update(self, ball_bbox, hoop_bbox, current_frame_count):
+    def update(self, ball_bbox, hoop_bbox, current_frame_count, timestamp=None):
+        """Process one frame's detections.
+        
+        timestamp is the frame's media time in seconds; without it, frames are
+        assumed to be nominal_fps apart.
+        """
         self.frame_counter = current_frame_count
+        self.current_time = timestamp if timestamp is not None else (current_frame_count - 1) / self.nominal_fps
         ball_center = self._get_bbox_center(ball_bbox)
         
         if self.detection_cooldown > 0:
@@ -94,22 +126,15 @@ class ShotDetector:
 
         if ball_center and self.hoop_center:
             # Always add to the general trajectory deque for instantaneous speed and arc fitting
-            self.ball_positions_all_time.append((ball_center[0], ball_center[1], self.frame_counter))
+            self.ball_positions_all_time.append(ball_center[0], ball_center[1], self.frame_counter, self.current_time)
             
             # If a shot is in progress, add to its specific trajectory
             if self.shot_in_progress:
-                self.current_shot_trajectory.append((ball_center[0], ball_center[1], self.frame_counter))
+                self.current_shot_trajectory.append(ball_center[0], ball_center[1], self.frame_counter, self.current_time)
             
             self.current_hoop_distance = np.sqrt((ball_center[0] - self.hoop_center[0])**2 + (ball_center[1] - self.hoop_center[1])**2)
 
-            if len(self.ball_positions_all_time) >= 2:
-                prev_pos = self.ball_positions_all_time[-2]
-                curr_pos = self.ball_positions_all_time[-1]
-                pixel_distance = np.sqrt((curr_pos[0] - prev_pos[0])**2 + (curr_pos[1] - prev_pos[1])**2)
-                time_interval = 1.0 / self.nominal_fps 
-                self.current_ball_speed_inst = pixel_distance / time_interval
-            else:
-                self.current_ball_speed_inst = None
+            self.current_ball_speed_inst = self._calculate_instantaneous_speed()
 
             ball_cx, ball_cy = ball_center
             hoop_cx, hoop_cy = self.hoop_center
@@ -118,29 +143,36 @@ class ShotDetector:
             hoop_height = hoop_y2 - hoop_y1
 
             # Define rim height and upper area for shot detection
-            rim_height = hoop_y1 + hoop_height * 0.5
+            rim_height = hoop_y1 + hoop_height * self.rim_height_factor
             
             # More generous upper zone
-            upper_zone_y = hoop_y1 - hoop_height * 1.2  # Even more space above hoop
+            upper_zone_y = hoop_y1 - hoop_height * self.upper_zone_factor  # Even more space above hoop
 
             # Detect ball in upper zone (above hoop) with more generous boundaries
             if not self.ball_up and ball_cy < upper_zone_y:
                 # Ball must be within reasonable x-range of hoop (expanded range)
-                if hoop_x1 - hoop_width * 2.0 < ball_cx < hoop_x2 + hoop_width * 2.0:
+                if hoop_x1 - hoop_width * self.up_band < ball_cx < hoop_x2 + hoop_width * self.up_band:
                     self.ball_up = True
                     self.ball_up_frame = self.frame_counter
+                    self.ball_up_time = self.current_time
                     self.shot_in_progress = True
                     self.ball_was_above_hoop = True
-                    self.current_shot_trajectory = [(ball_cx, ball_cy, self.frame_counter)]
-                    print(f"Ball detected above hoop at y={ball_cy}, upper_zone={upper_zone_y}")
+                    self.current_shot_trajectory.reset_to(ball_cx, ball_cy, self.frame_counter, self.current_time)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Ball detected above hoop at y=%s, upper_zone=%s", ball_cy, upper_zone_y,
+                                     extra={"event": "ball_up", "frame": self.frame_counter, "ball_x": ball_cx,
+                                            "ball_y": ball_cy, "upper_zone_y": upper_zone_y})
 
             # Detect ball in lower zone (below hoop) with more generous boundaries
             if self.ball_up and not self.ball_down and ball_cy > hoop_y2:
                 # Ball must be within reasonable x-range of hoop (expanded range)
-                if hoop_x1 - hoop_width * 1.5 < ball_cx < hoop_x2 + hoop_width * 1.5:
+                if hoop_x1 - hoop_width * self.down_band < ball_cx < hoop_x2 + hoop_width * self.down_band:
                     self.ball_down = True
                     self.ball_down_frame = self.frame_counter
-                    print(f"Ball detected below hoop at y={ball_cy}, hoop_y2={hoop_y2}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Ball detected below hoop at y=%s, hoop_y2=%s", ball_cy, hoop_y2,
+                                     extra={"event": "ball_down", "frame": self.frame_counter, "ball_x": ball_cx,
+                                            "ball_y": ball_cy, "hoop_y2": hoop_y2})
 
             # Shot attempt detection and scoring
             if self.ball_up and self.ball_down and self.ball_up_frame < self.ball_down_frame and self.detection_cooldown == 0:
@@ -157,14 +189,14 @@ class ShotDetector:
                     self.previous_shot_outcome = "MISSED"
                 
                 # Calculate stats
-                self.last_arc_angle = self._calculate_arc_angle(list(self.ball_positions_all_time))
+                self.last_arc_angle = self._calculate_arc_angle(self.ball_positions_all_time)
                 self.last_shot_avg_speed = self._calculate_average_speed(self.current_shot_trajectory)
                 
                 # Reset shot detection
                 self._reset_shot_state()
                 
                 # Set cooldown to prevent immediate re-detection
-                self.detection_cooldown = 15
+                self.detection_cooldown = self.cooldown_frames
                 
                 return self.previous_shot_outcome, (self.shots_made, self.shots_attempted), self.last_arc_angle, self.current_ball_speed_inst, self.last_shot_avg_speed, self.current_hoop_distance, self.previous_shot_outcome
 
@@ -182,12 +214,12 @@ class ShotDetector:
                     if self.ball_up and not self.ball_down:  # Ball went up but never came down
                         self.shots_attempted += 1
                         self.previous_shot_outcome = "MISSED"
-                        self.last_arc_angle = self._calculate_arc_angle(list(self.ball_positions_all_time))
+                        self.last_arc_angle = self._calculate_arc_angle(self.ball_positions_all_time)
                         self.last_shot_avg_speed = self._calculate_average_speed(self.current_shot_trajectory)
                         self._reset_shot_state()
                         
                         # Set cooldown to prevent immediate re-detection
-                        self.detection_cooldown = 15
+                        self.detection_cooldown = self.cooldown_frames
                         
                         return "MISSED", (self.shots_made, self.shots_attempted), self.last_arc_angle, self.current_ball_speed_inst, self.last_shot_avg_speed, self.current_hoop_distance, self.previous_shot_outcome
             
@@ -197,17 +229,10 @@ class ShotDetector:
             self.current_hoop_distance = None
             
             # Always add to the trajectory for tracking, even without hoop
-            self.ball_positions_all_time.append((ball_center[0], ball_center[1], self.frame_counter))
+            self.ball_positions_all_time.append(ball_center[0], ball_center[1], self.frame_counter, self.current_time)
             
             # Still track ball position even if hoop is lost
-            if len(self.ball_positions_all_time) >= 2:
-                prev_pos = self.ball_positions_all_time[-2]
-                curr_pos = self.ball_positions_all_time[-1]
-                pixel_distance = np.sqrt((curr_pos[0] - prev_pos[0])**2 + (curr_pos[1] - prev_pos[1])**2)
-                time_interval = 1.0 / self.nominal_fps
-                self.current_ball_speed_inst = pixel_distance / time_interval
-            else:
-                self.current_ball_speed_inst = None
+            self.current_ball_speed_inst = self._calculate_instantaneous_speed()
             
             return "NO_ACTION", (self.shots_made, self.shots_attempted), self.last_arc_angle, self.current_ball_speed_inst, self.last_shot_avg_speed, self.current_hoop_distance, self.previous_shot_outcome
         
@@ -226,49 +251,44 @@ class ShotDetector:
         hoop_width = hoop_x2 - hoop_x1
         
         # Calculate the rim height (middle of the hoop)
-        rim_height = hoop_y1 + (hoop_y2 - hoop_y1) * 0.5
+        rim_height = hoop_y1 + (hoop_y2 - hoop_y1) * self.rim_height_factor
         
-        # Find points above and below rim for trajectory analysis
-        points_above_rim = []
-        points_below_rim = []
-        
-        # Collect points above and below rim
-        for x, y, frame in self.current_shot_trajectory:
-            if y < rim_height:
-                points_above_rim.append((x, y))
-            else:
-                points_below_rim.append((x, y))
+        # Split the trajectory into points above and below rim
+        xs = self.current_shot_trajectory.x
+        ys = self.current_shot_trajectory.y
+        above_rim = np.flatnonzero(ys < rim_height)
+        below_rim = np.flatnonzero(ys >= rim_height)
         
         # Need points both above and below rim for analysis
-        if not points_above_rim or not points_below_rim:
+        if not len(above_rim) or not len(below_rim):
             return False
             
-        # Get the closest point above rim and below rim
-        above_point = max(points_above_rim, key=lambda p: p[1])  # closest to rim from above
-        below_point = min(points_below_rim, key=lambda p: p[1])  # closest to rim from below
-        
-        # Only consider shots where there's a clear trajectory through the rim area
-        if above_point and below_point:
-            # Create a line between these two points to predict path through rim
-            x1, y1 = above_point
-            x2, y2 = below_point
+        # Get the closest point above rim and below rim (the first one on ties)
+        above_index = above_rim[np.argmax(ys[above_rim])]  # closest to rim from above
+        below_index = below_rim[np.argmin(ys[below_rim])]  # closest to rim from below
+        
+        # Create a line between these two points to predict path through rim
+        x1, y1 = float(xs[above_index]), float(ys[above_index])
+        x2, y2 = float(xs[below_index]), float(ys[below_index])
+        
+        # Calculate where the ball would pass through the rim height
+        # Avoid division by zero if points are directly above/below each other
+        if y2 - y1 != 0:
+            t = (rim_height - y1) / (y2 - y1)
+            intersection_x = x1 + t * (x2 - x1)
             
-            # Calculate where the ball would pass through the rim height
-            # Avoid division by zero if points are directly above/below each other
-            if y2 - y1 != 0:
-                t = (rim_height - y1) / (y2 - y1)
-                intersection_x = x1 + t * (x2 - x1)
-                
-                # Check if this intersection point is within the hoop bounds
-                # More forgiving intersection test (0.7 instead of 0.5)
-                rim_x1 = self.hoop_center[0] - 0.7 * hoop_width
-                rim_x2 = self.hoop_center[0] + 0.7 * hoop_width
-                
-                if rim_x1 < intersection_x < rim_x2:
-                    print(f"SHOT MADE! Intersection at x={intersection_x}, rim bounds: {rim_x1}-{rim_x2}")
-                    return True
-                else:
-                    print(f"SHOT MISSED! Intersection at x={intersection_x}, rim bounds: {rim_x1}-{rim_x2}")
+            # Check if this intersection point is within the hoop bounds
+            # More forgiving intersection test (0.7 instead of 0.5 by default)
+            rim_x1 = self.hoop_center[0] - self.rim_tolerance * hoop_width
+            rim_x2 = self.hoop_center[0] + self.rim_tolerance * hoop_width
+            
+            made = rim_x1 < intersection_x < rim_x2
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Shot %s: intersection at x=%.1f, rim bounds %.1f-%.1f", "made" if made else "missed",
+                             intersection_x, rim_x1, rim_x2,
+                             extra={"event": "rim_crossing", "frame": self.frame_counter, "made": made,
+                                    "intersection_x": intersection_x, "rim_x1": rim_x1, "rim_x2": rim_x2})
+            return made
         
         return False
 
@@ -276,7 +296,7 @@ class ShotDetector:
         self.shot_in_progress = False
         self.ball_was_above_hoop = False
         self.ball_positions_all_time.clear()
-        self.current_shot_trajectory = []
+        self.current_shot_trajectory.clear()
         self.frames_since_last_detection = 0
         
         # Reset ball position detection vars
@@ -287,31 +307,36 @@ class ShotDetector:
             self.last_arc_angle = None
             self.last_shot_avg_speed = None
 
+    def _calculate_instantaneous_speed(self):
+        """Pixels per second between the last two trajectory points"""
+        if len(self.ball_positions_all_time) < 2:
+            return None
+        dx, dy, time_interval = self.ball_positions_all_time.last_step()
+        # One nominal frame if the timestamps don't say
+        if time_interval <= 0:
+            time_interval = 1.0 / self.nominal_fps
+        return math.sqrt(dx * dx + dy * dy) / time_interval
+
     def _calculate_average_speed(self, trajectory):
-        if not trajectory or len(trajectory) < 2:
+        if len(trajectory) < 2:
             return None
         
-        total_pixel_distance = 0
-        for i in range(len(trajectory) - 1):
-            p1 = trajectory[i]
-            p2 = trajectory[i+1]
-            total_pixel_distance += np.sqrt((p2[0] - p1[0])**2 + (p2[1] - p1[1])**2)
-            
-        total_time_seconds = (len(trajectory) -1) * (1.0 / self.nominal_fps)
+        total_pixel_distance = np.sqrt(np.diff(trajectory.x)**2 + np.diff(trajectory.y)**2).sum()
+        times = trajectory.times
+        total_time_seconds = times[-1] - times[0]
         
-        if total_time_seconds == 0:
+        if total_time_seconds <= 0:
             return None
             
         average_speed = total_pixel_distance / total_time_seconds
-        return average_speed
+        return float(average_speed)
 
     def _calculate_arc_angle(self, trajectory):
-        if not trajectory or len(trajectory) < 3:
+        if len(trajectory) < 3:
             return None
 
-        # Extract x and y coordinates
-        x_coords = np.array([pos[0] for pos in trajectory])
-        y_coords = np.array([pos[1] for pos in trajectory])
+        x_coords = trajectory.x
+        y_coords = trajectory.y
 
         # Check for degenerate cases
         if len(np.unique(x_coords)) < 2:
@@ -336,6 +361,36 @@ class ShotDetector:
     def get_stats(self):
         return self.shots_made, self.shots_attempted 
 
+    def get_params(self):
+        """Current shot detection parameters, as in DEFAULT_SHOT_PARAMS"""
+        return {name: getattr(self, name) for name in DEFAULT_SHOT_PARAMS}
+
+    def get_shot_zone(self, margin=1.5):
+        """Frame region (x1, y1, x2, y2) that shot detection depends on, or None.
+        
+        Spans the up_band hoop widths either side of the stable hoop position,
+        from the upper zone that marks the ball going up to the bottom of the hoop
+        where it comes down, padded by margin hoop widths. None until the hoop
+        position buffer is full, i.e. the hoop has been seen steadily.
+        """
+        if len(self.hoop_position_buffer) < self.hoop_position_buffer.maxlen:
+            return None
+        (hoop_x1, hoop_y1, hoop_x2, hoop_y2), _ = self._get_stable_hoop_position()
+        hoop_width = hoop_x2 - hoop_x1
+        hoop_height = hoop_y2 - hoop_y1
+        padding = hoop_width * margin
+        upper_zone_y = hoop_y1 - hoop_height * self.upper_zone_factor
+        return (hoop_x1 - hoop_width * self.up_band - padding, upper_zone_y - padding,
+                hoop_x2 + hoop_width * self.up_band + padding, hoop_y2 + padding)
+
+    def snapshot(self):
+        """Capture the complete detector state, to be restored after a seek"""
+        return copy.deepcopy(self.__dict__)
+
+    def restore(self, state):
+        """Return to a state captured by snapshot(); the snapshot itself stays reusable"""
+        self.__dict__.update(copy.deepcopy(state))
+
     def full_reset(self):
         """Completely reset the shot detector state"""
         self.ball_positions_all_time.clear()
@@ -351,6 +406,7 @@ class ShotDetector:
         self.shots_attempted = 0
         
         self.frame_counter = 0
+        self.current_time = 0.0
         self.last_arc_angle = None
         self.current_ball_speed_inst = None
         self.last_shot_avg_speed = None
@@ -359,10 +415,11 @@ class ShotDetector:
         self.ball_up = False
         self.ball_down = False
         self.ball_up_frame = 0
+        self.ball_up_time = 0.0
         self.ball_down_frame = 0
         self.previous_shot_outcome = None
         
         self.hoop_position_buffer.clear()
         self.detection_cooldown = 0
         
-        print("Shot detector fully reset") 
\ No newline at end of file
+        logger.debug("Shot detector fully reset") 
\ No newline at end of file
@@ -0,0 +1,200 @@
+from collections import deque
+import json
+import math
+import os
+import threading
+import time
+
+import cv2
+
+_OVERLAY_REFRESH_NS = 500_000_000
+
+class LatencyHistogram:
+    """Fixed-size log-scale histogram of durations in nanoseconds.
+
+    bins_per_octave bins per doubling, so percentiles are accurate to about
+    2 ** (1 / bins_per_octave), 9% with the default 8. Covers 1 ns to 2 ** octaves ns.
+    """
+    def __init__(self, bins_per_octave=8, octaves=36):
+        self.bins_per_octave = bins_per_octave
+        self.counts = [0] * (bins_per_octave * octaves)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, duration_ns):
+        index = int(math.log2(duration_ns) * self.bins_per_octave) if duration_ns > 1 else 0
+        self.counts[min(index, len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def percentile(self, p):
+        """Upper edge of the bin holding the p-th percentile, in nanoseconds"""
+        if not self.count:
+            return None
+        target = p / 100 * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target and count:
+                return min(2 ** ((index + 1) / self.bins_per_octave), self.max_ns)
+        return self.max_ns
+
+    def mean(self):
+        return self.total_ns / self.count if self.count else None
+
+class StageProfiler:
+    """Opt-in timing of the playback stages.
+
+    Stages are timed with perf_counter_ns into LatencyHistograms:
+
+        start = profiler.start()
+        ...
+        profiler.stop("detect", start)
+
+    Also tracks a rolling display frame rate, counters (e.g. dropped frames) and the
+    depth of registered queues, all available from stats() and, with overlay set,
+    drawn onto displayed frames. With trace set, every timed stage is also kept as
+    a timeline event (the latest trace_capacity of them) for write_trace(), which
+    writes Chrome trace JSON (chrome://tracing, Perfetto).
+
+    When disabled, start() and stop() return straight away. Each stage is recorded
+    by one thread at a time, so no locking is needed on the hot path.
+    """
+    def __init__(self, enabled=False, overlay=False, trace=False, trace_path=None, fps_window=2.0,
+                 trace_capacity=200000):
+        self.enabled = enabled
+        self.overlay = overlay
+        self.trace = trace
+        # Where write_trace() writes by default
+        self.trace_path = trace_path
+        self.fps_window_ns = int(fps_window * 1e9)
+        self.histograms = {}
+        self.counters = {}
+        self.queues = {}
+        self.frame_times = deque()
+        self.events = deque(maxlen=trace_capacity)
+        # Overlay text, recomputed every _OVERLAY_REFRESH_NS rather than every frame
+        self._overlay_lines = []
+        self._overlay_time_ns = 0
+        self._origin_ns = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls):
+        """Profiler set up from SHOTTRACKER_PROFILE (1 to time stages and show the
+        overlay) and SHOTTRACKER_TRACE (also record a timeline, written there when
+        playback stops)"""
+        trace_path = os.environ.get("SHOTTRACKER_TRACE")
+        enabled = os.environ.get("SHOTTRACKER_PROFILE", "0") not in ("", "0") or bool(trace_path)
+        return cls(enabled=enabled, overlay=enabled, trace=bool(trace_path), trace_path=trace_path)
+
+    def start(self):
+        """Start time of a stage, for stop(); 0 when disabled"""
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def stop(self, stage, start_ns):
+        """Record a stage that began at start_ns"""
+        if not self.enabled:
+            return
+        end_ns = time.perf_counter_ns()
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram())
+        histogram.record(end_ns - start_ns)
+        if self.trace:
+            self.events.append((stage, threading.current_thread().name, start_ns, end_ns - start_ns))
+
+    def count(self, counter, amount=1):
+        """Add to a named counter, e.g. frames dropped at a stage"""
+        if self.enabled:
+            with self._lock:
+                self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def frame_shown(self):
+        """Count a displayed frame towards the rolling frame rate"""
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        with self._lock:
+            self.frame_times.append(now)
+            while now - self.frame_times[0] > self.fps_window_ns:
+                self.frame_times.popleft()
+
+    def watch_queue(self, name, q):
+        """Report the depth of a queue.Queue in stats()"""
+        self.queues[name] = q
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+            self.frame_times.clear()
+            self.events.clear()
+
+    def fps(self):
+        """Displayed frames per second over the last fps_window seconds"""
+        with self._lock:
+            if len(self.frame_times) < 2:
+                return 0.0
+            return (len(self.frame_times) - 1) / ((self.frame_times[-1] - self.frame_times[0]) / 1e9)
+
+    def stats(self):
+        """Stage latencies in ms (count, mean, p50, p95, p99, max), fps, counters and queue depths"""
+        stages = {}
+        for stage, histogram in list(self.histograms.items()):
+            if not histogram.count:
+                continue
+            stages[stage] = {"count": histogram.count, "mean": round(histogram.mean() / 1e6, 3)}
+            for p in (50, 95, 99):
+                stages[stage][f"p{p}"] = round(histogram.percentile(p) / 1e6, 3)
+            stages[stage]["max"] = round(histogram.max_ns / 1e6, 3)
+        return {
+            "fps": round(self.fps(), 2),
+            "stages": stages,
+            "counters": dict(self.counters),
+            "queues": {name: q.qsize() for name, q in self.queues.items()},
+        }
+
+    def draw_overlay(self, frame):
+        """Draw fps, stage p50/p95 and queue depths in the frame's top-left corner, in place"""
+        if not (self.enabled and self.overlay):
+            return frame
+        now = time.perf_counter_ns()
+        if now - self._overlay_time_ns > _OVERLAY_REFRESH_NS:
+            stats = self.stats()
+            lines = [f"{stats['fps']:.1f} fps"]
+            for stage, values in stats["stages"].items():
+                lines.append(f"{stage}: {values['p50']:.1f} / {values['p95']:.1f} ms")
+            if stats["queues"]:
+                lines.append("queues " + " ".join(f"{name}:{depth}" for name, depth in stats["queues"].items()))
+            if stats["counters"]:
+                lines.append(" ".join(f"{name}:{value}" for name, value in stats["counters"].items()))
+            self._overlay_lines = lines
+            self._overlay_time_ns = now
+        for i, line in enumerate(self._overlay_lines):
+            position = (10, 24 + 22 * i)
+            cv2.putText(frame, line, position, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 3, cv2.LINE_AA)
+            cv2.putText(frame, line, position, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+        return frame
+
+    def write_trace(self, path=None):
+        """Write the recorded timeline as Chrome trace JSON; returns the path or None"""
+        path = path or self.trace_path
+        if not path or not self.events:
+            return None
+        thread_ids = {}
+        trace_events = []
+        for stage, thread_name, start_ns, duration_ns in list(self.events):
+            thread_id = thread_ids.setdefault(thread_name, len(thread_ids) + 1)
+            trace_events.append({"name": stage, "ph": "X", "pid": 1, "tid": thread_id,
+                                 "ts": (start_ns - self._origin_ns) / 1000, "dur": duration_ns / 1000})
+        for thread_name, thread_id in thread_ids.items():
+            trace_events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": thread_id,
+                                 "args": {"name": thread_name}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace_events, "otherData": self.stats()}, f)
+        return path
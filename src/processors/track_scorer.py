@@ -0,0 +1,141 @@
+import bisect
+
+import numpy as np
+
+from .shot_detector import DEFAULT_SHOT_PARAMS
+
+def score_track(ball_xyxy, hoop_xyxy, params=None, first_frame=1):
+    """Score a whole clip from its per-frame boxes, giving the same shots as ShotDetector.update.
+
+    ball_xyxy and hoop_xyxy are (N, 4) arrays with a row per frame and NaN rows
+    where nothing was detected, e.g. DetectionTrack.ball_xyxy/hoop_xyxy. Boxes are
+    truncated to whole pixels, as DetectionTrack.get does for the live detector.
+    params overrides any of DEFAULT_SHOT_PARAMS. Frame numbers start at first_frame.
+
+    The per-frame geometry (stable hoop, ball in the upper zone, ball below the hoop)
+    is computed for all frames at once; only the shot segmentation steps from one
+    event to the next. Returns a dict with made and attempted counts and, per shot,
+    start_frames (ball went up), end_frames (shot scored) and made flags. Arc angle
+    and speed are not computed.
+    """
+    params = dict(DEFAULT_SHOT_PARAMS, **(params or {}))
+    ball = np.trunc(np.asarray(ball_xyxy, dtype=np.float64))
+    hoop, hoop_center_x = _stable_hoop(np.trunc(np.asarray(hoop_xyxy, dtype=np.float64)), params["hoop_history"])
+
+    ball_x = np.trunc((ball[:, 0] + ball[:, 2]) / 2)
+    ball_y = np.trunc((ball[:, 1] + ball[:, 3]) / 2)
+    hoop_x1, hoop_y1, hoop_x2, hoop_y2 = hoop.T
+    hoop_width = hoop_x2 - hoop_x1
+    hoop_height = hoop_y2 - hoop_y1
+
+    # Frames where update() looks at shots at all: ball seen and a hoop known
+    valid = ~np.isnan(ball_x) & ~np.isnan(hoop_x1)
+    with np.errstate(invalid="ignore"):
+        up = valid & (ball_y < hoop_y1 - hoop_height * params["upper_zone_factor"]) \
+            & (hoop_x1 - hoop_width * params["up_band"] < ball_x) & (ball_x < hoop_x2 + hoop_width * params["up_band"])
+        down = valid & (ball_y > hoop_y2) \
+            & (hoop_x1 - hoop_width * params["down_band"] < ball_x) & (ball_x < hoop_x2 + hoop_width * params["down_band"])
+    valid_frames = np.flatnonzero(valid)
+
+    # Ball goes up, then comes down, then the shot is scored on the first frame with the
+    # ball and hoop in view once the cooldown after the previous shot is over. Only this
+    # walk from event to event is sequential.
+    valid_list = valid_frames.tolist()
+    up_list = np.flatnonzero(up).tolist()
+    down_list = np.flatnonzero(down).tolist()
+    start_frames, end_frames = [], []
+    position = 0
+    cooldown_end = 0
+    while True:
+        up_frame = _first_at_or_after(up_list, position)
+        if up_frame is None:
+            break
+        down_frame = _first_at_or_after(down_list, up_frame + 1)
+        if down_frame is None:
+            break
+        shot_frame = _first_at_or_after(valid_list, max(down_frame, cooldown_end))
+        if shot_frame is None:
+            break
+        start_frames.append(up_frame)
+        end_frames.append(shot_frame)
+        cooldown_end = shot_frame + params["cooldown_frames"]
+        position = shot_frame + 1
+
+    start_frames = np.array(start_frames, dtype=np.int64)
+    end_frames = np.array(end_frames, dtype=np.int64)
+    made = _crossed_rim(ball_x, ball_y, hoop, hoop_center_x, valid_frames, start_frames, end_frames, params)
+    return {
+        "made": int(made.sum()),
+        "attempted": len(made),
+        "start_frames": start_frames + first_frame,
+        "end_frames": end_frames + first_frame,
+        "made_flags": made,
+    }
+
+def _stable_hoop(hoop, history):
+    """Hoop box and center x update() works with on each frame.
+
+    The detected box where there is one, otherwise the truncated mean of the last
+    `history` detected boxes; NaN until the hoop is first detected.
+    """
+    detected = ~np.isnan(hoop[:, 0])
+    detected_boxes = hoop[detected]
+    # Number of detections up to and including each frame
+    seen = np.cumsum(detected)
+    sums = np.concatenate([np.zeros((1, 4)), np.cumsum(detected_boxes, axis=0)])
+    window = np.minimum(seen, history)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        averaged = np.trunc((sums[seen] - sums[seen - window]) / window[:, None])
+    stable = np.where(detected[:, None], hoop, averaged)
+    stable[seen == 0] = np.nan
+    return stable, np.trunc((stable[:, 0] + stable[:, 2]) / 2)
+
+def _first_at_or_after(frames, frame):
+    index = bisect.bisect_left(frames, frame)
+    return frames[index] if index < len(frames) else None
+
+def _crossed_rim(ball_x, ball_y, hoop, hoop_center_x, valid_frames, start_frames, end_frames, params):
+    """ShotDetector._score_shot for every shot at once.
+
+    A shot's trajectory is the ball in every valid frame from its start to its end.
+    It is made if the line from its lowest point above the rim line to its highest
+    point below it (the first on ties) crosses the rim line within rim_tolerance
+    hoop widths of the hoop center, as of the shot's end frame.
+    """
+    made = np.zeros(len(start_frames), dtype=bool)
+    if not len(start_frames):
+        return made
+
+    # Trajectory points of all shots back to back, labelled with their shot
+    first = np.searchsorted(valid_frames, start_frames)
+    lengths = np.searchsorted(valid_frames, end_frames) + 1 - first
+    offsets = np.cumsum(lengths) - lengths
+    shot = np.repeat(np.arange(len(lengths)), lengths)
+    frames = valid_frames[np.arange(lengths.sum()) - np.repeat(offsets - first, lengths)]
+    xs, ys = ball_x[frames], ball_y[frames]
+
+    hoop_x1, hoop_y1, hoop_x2, hoop_y2 = hoop[end_frames].T
+    rim_height = hoop_y1 + (hoop_y2 - hoop_y1) * params["rim_height_factor"]
+    above = ys < rim_height[shot]
+    above_point = _first_per_shot(np.flatnonzero(above), -ys, shot, len(lengths))
+    below_point = _first_per_shot(np.flatnonzero(~above), ys, shot, len(lengths))
+
+    scored = (lengths >= 3) & (above_point >= 0) & (below_point >= 0)
+    x1, y1 = xs[above_point], ys[above_point]
+    x2, y2 = xs[below_point], ys[below_point]
+    scored &= y2 - y1 != 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        intersection_x = x1 + (rim_height - y1) / (y2 - y1) * (x2 - x1)
+    tolerance = params["rim_tolerance"] * (hoop_x2 - hoop_x1)
+    made[scored] = ((hoop_center_x[end_frames] - tolerance < intersection_x)
+                    & (intersection_x < hoop_center_x[end_frames] + tolerance))[scored]
+    return made
+
+def _first_per_shot(points, sort_key, shot, num_shots):
+    """Per shot, the point among `points` with the smallest sort_key, earliest on ties; -1 if none"""
+    result = np.full(num_shots, -1, dtype=np.int64)
+    order = points[np.lexsort((points, sort_key[points], shot[points]))]
+    is_first = np.ones(len(order), dtype=bool)
+    is_first[1:] = shot[order[1:]] != shot[order[:-1]]
+    result[shot[order[is_first]]] = order[is_first]
+    return result
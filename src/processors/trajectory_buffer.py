@@ -0,0 +1,84 @@
+import numpy as np
+
+class TrajectoryBuffer:
+    """Ball trajectory as preallocated NumPy arrays of x, y, frame number and time.
+
+    Points are written one after the other and x/y/frames/times are views of the
+    filled part, never copies. With ring=True only the latest `capacity` points are
+    kept: the arrays hold twice that, and when they fill up the latest points are
+    moved back to the start, once every `capacity` appends. With ring=False every
+    point is kept and the arrays double when they fill up.
+    """
+    def __init__(self, capacity=30, ring=True):
+        self.capacity = max(2, int(capacity))
+        self.ring = ring
+        size = 2 * self.capacity if ring else self.capacity
+        self._x = np.empty(size)
+        self._y = np.empty(size)
+        self._frames = np.empty(size, dtype=np.int64)
+        self._times = np.empty(size)
+        self.head = 0  # Next slot written; the points are the `count` slots before it
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def append(self, x, y, frame, timestamp):
+        if self.head == len(self._x):
+            if self.ring:
+                self._compact()
+            else:
+                self._grow()
+        head = self.head
+        self._x[head] = x
+        self._y[head] = y
+        self._frames[head] = frame
+        self._times[head] = timestamp
+        self.head = head + 1
+        if not self.ring or self.count < self.capacity:
+            self.count += 1
+
+    def reset_to(self, x, y, frame, timestamp):
+        """Clear, then append one point"""
+        self.clear()
+        self.append(x, y, frame, timestamp)
+
+    def last_step(self):
+        """(dx, dy, dt) from the second-to-last point to the last one; needs two points"""
+        last = self.head - 1
+        return (float(self._x[last] - self._x[last - 1]), float(self._y[last] - self._y[last - 1]),
+                float(self._times[last] - self._times[last - 1]))
+
+    @property
+    def x(self):
+        return self._x[self.head - self.count:self.head]
+
+    @property
+    def y(self):
+        return self._y[self.head - self.count:self.head]
+
+    @property
+    def frames(self):
+        return self._frames[self.head - self.count:self.head]
+
+    @property
+    def times(self):
+        return self._times[self.head - self.count:self.head]
+
+    def _compact(self):
+        # Keep the latest capacity - 1 points; the append that called this adds the last one
+        keep = self.capacity - 1
+        for values in (self._x, self._y, self._frames, self._times):
+            values[:keep] = values[self.head - keep:self.head]
+        self.head = keep
+        self.count = min(self.count, keep)
+
+    def _grow(self):
+        self._x = np.concatenate([self._x, np.empty_like(self._x)])
+        self._y = np.concatenate([self._y, np.empty_like(self._y)])
+        self._frames = np.concatenate([self._frames, np.empty_like(self._frames)])
+        self._times = np.concatenate([self._times, np.empty_like(self._times)])
@@ -0,0 +1,293 @@
+import logging
+import os
+import time
+
+from models.detection_cache import DetectionTrack
+
+from .frame_decoder import FrameDecoder
+from .presentation_clock import PresentationClock
+from .shot_detector import ShotDetector
+from .video_index import VideoIndex
+
+logger = logging.getLogger(__name__)
+
+class VideoAnalyzer:
+    """Headless analysis of a whole video: detection + shot tracking, no drawing or display"""
+    def __init__(self, yolo_detector, shot_detector_factory=ShotDetector, batch_size=8, detection_cache=None,
+                 roi_scheduler=None, frame_skipper=None, kalman_tracker=None, station_tracker=None,
+                 decoder_backend=None, decoder_threads=0):
+        self.yolo_detector = yolo_detector
+        self.shot_detector_factory = shot_detector_factory
+        # Number of frames sent to the model per inference call
+        self.batch_size = max(1, int(batch_size))
+        # Optional DetectionCache; fully cached videos are re-scored without decoding or inference
+        self.detection_cache = detection_cache
+        # Optional RoiScheduler; limits detection to the shot zone once the hoop is stable
+        self.roi_scheduler = roi_scheduler
+        # Optional FrameSkipper; detects only some frames and predicts the ball on the rest
+        self.frame_skipper = frame_skipper
+        # Optional KalmanBallTracker; picks the ball among the candidate boxes and coasts through dropouts
+        self.kalman_tracker = kalman_tracker
+        # Optional MultiStationTracker; scores every hoop in view instead of just the best one.
+        # Needs every box per frame, so it bypasses the detection cache and the helpers above
+        self.station_tracker = station_tracker
+        # FrameDecoder backend and decoding threads; frames are decoded ahead of inference
+        self.decoder_backend = decoder_backend
+        self.decoder_threads = decoder_threads
+
+    def analyze(self, video_path):
+        """Analyze every frame of a video and return per-shot results and throughput"""
+        decoder = self._open_decoder(video_path)
+        clock = PresentationClock(decoder.fps)
+        if self.station_tracker:
+            return self._analyze_stations(decoder, clock, video_path)
+        shot_detector = self.shot_detector_factory()
+        # Frames without a usable timestamp are spaced at the source frame rate
+        shot_detector.nominal_fps = clock.fps
+        shots = []
+        if self.roi_scheduler:
+            self.roi_scheduler.reset()
+        if self.frame_skipper:
+            self.frame_skipper.reset()
+        if self.kalman_tracker:
+            self.kalman_tracker.reset()
+
+        cache_key, track = None, None
+        if self.detection_cache:
+            cache_key = self._cache_key(video_path, decoder.cache_tag())
+            track = self.detection_cache.load(cache_key)
+        cached = track is not None and track.is_complete()
+
+        start_time = time.perf_counter()
+        try:
+            if cached:
+                timestamps = self._frame_timestamps(video_path, len(track), clock)
+                frame_num = self._analyze_cached(track, timestamps, shot_detector, shots)
+            else:
+                if track is None:
+                    track = DetectionTrack.empty(decoder.total_frames)
+                frame_num = self._analyze_video(decoder, track, shot_detector, shots)
+                track.set_length(frame_num)
+        finally:
+            decoder.stop()
+        elapsed = time.perf_counter() - start_time
+
+        if self.detection_cache and track.modified:
+            self.detection_cache.save(cache_key, track, video=os.path.basename(video_path),
+                                      model=self.yolo_detector.model_path)
+
+        made, attempted = shot_detector.get_stats()
+        return {
+            "video": os.path.basename(video_path),
+            "path": video_path,
+            "frames": frame_num,
+            "source_fps": round(clock.fps, 3),
+            "made": made,
+            "attempted": attempted,
+            "cached_detections": cached,
+            "elapsed_sec": round(elapsed, 3),
+            "processing_fps": round(frame_num / elapsed, 2) if elapsed > 0 else 0.0,
+            "shots": shots,
+        }
+
+    def detection_track(self, video_path):
+        """The complete DetectionTrack of a video, analyzing it first if it isn't cached yet"""
+        if not self.detection_cache:
+            raise ValueError("Detection tracks need a detection cache")
+        # Only opened to find out which backend would decode the video
+        decoder = self._open_decoder(video_path)
+        decoder.stop()
+        cache_key = self._cache_key(video_path, decoder.cache_tag())
+        track = self.detection_cache.load(cache_key)
+        if track is None or not track.is_complete():
+            self.analyze(video_path)
+            track = self.detection_cache.load(cache_key)
+        return track
+
+    def _open_decoder(self, video_path):
+        # Room for a batch waiting on inference while the next one is decoded
+        decoder = FrameDecoder(video_path, buffers=2 * self.batch_size + 2, backend=self.decoder_backend,
+                               threads=self.decoder_threads)
+        if not decoder.open():
+            raise IOError(f"Could not open video: {video_path}")
+        return decoder
+
+    def _cache_key(self, video_path, decoder_tag=None):
+        tags = [helper.cache_tag() for helper in (self.roi_scheduler, self.frame_skipper, self.kalman_tracker)
+                if helper]
+        if decoder_tag:
+            tags.append(decoder_tag)
+        return self.detection_cache.key_for(video_path, self.yolo_detector, *tags)
+
+    def _analyze_stations(self, decoder, clock, video_path):
+        """Decode and detect every frame once, scoring shots at every station in view"""
+        self.station_tracker.reset()
+        self.station_tracker.nominal_fps = clock.fps
+        shots = []
+        frame_num = 0
+        start_time = time.perf_counter()
+        try:
+            pending = []
+            for frame in decoder:
+                frame_num = frame.frame_num
+                pending.append(frame)
+                if len(pending) >= self.batch_size:
+                    self._flush_stations(decoder, pending, shots)
+                    pending = []
+            if pending:
+                self._flush_stations(decoder, pending, shots)
+        finally:
+            decoder.stop()
+        elapsed = time.perf_counter() - start_time
+
+        made, attempted = self.station_tracker.get_stats()
+        stations = []
+        for station in self.station_tracker.stations:
+            station_made, station_attempted = station.shot_detector.get_stats()
+            stations.append({
+                "station": station.station_id,
+                "hoop_bbox": [int(v) for v in station.hoop_bbox[:4]],
+                "made": station_made,
+                "attempted": station_attempted,
+            })
+        return {
+            "video": os.path.basename(video_path),
+            "path": video_path,
+            "frames": frame_num,
+            "source_fps": round(clock.fps, 3),
+            "made": made,
+            "attempted": attempted,
+            "cached_detections": False,
+            "elapsed_sec": round(elapsed, 3),
+            "processing_fps": round(frame_num / elapsed, 2) if elapsed > 0 else 0.0,
+            "stations": stations,
+            "shots": shots,
+        }
+
+    def _flush_stations(self, decoder, pending, shots):
+        results = self.yolo_detector.detect_batch_all([frame.image for frame in pending])
+        for frame, (ball_boxes, hoop_boxes) in zip(pending, results):
+            decoder.release(frame)
+            for station, ball_bbox, hoop_bbox in self.station_tracker.assign(ball_boxes, hoop_boxes, frame.timestamp):
+                self._update_shot_detector(station.shot_detector, ball_bbox, hoop_bbox, frame.frame_num,
+                                           frame.timestamp, shots, station=station.station_id)
+
+    def _frame_timestamps(self, video_path, num_frames, clock):
+        """Media time in seconds of every frame, from the video index so nothing is decoded"""
+        try:
+            index = VideoIndex.load_or_build(video_path)
+            if len(index) == num_frames:
+                return index.timestamps_ms / 1000.0
+        except Exception as e:
+            logger.warning("Could not index %s, assuming a constant frame rate: %s", video_path, e)
+        return [i * clock.frame_interval for i in range(num_frames)]
+
+    def _analyze_cached(self, track, timestamps, shot_detector, shots):
+        """Re-score a video from cached detections only, without decoding it"""
+        for index in range(len(track)):
+            ball_bbox, hoop_bbox = track.get(index)
+            self._update_shot_detector(shot_detector, ball_bbox, hoop_bbox, index + 1, float(timestamps[index]), shots)
+        return len(track)
+
+    def _analyze_video(self, decoder, track, shot_detector, shots):
+        """Decode the video and run batched inference on frames missing from the track"""
+        frame_num = 0
+        # Decoded frames waiting for the shot detector, in order, as (frame_num, timestamp, frame, roi).
+        # Frame is None when its detections are already in the track, or when the
+        # frame skipper leaves it to be predicted; its buffer goes straight back to
+        # the decoder. Skipping and the region of interest are decided when the frame
+        # is decoded, so within a batch they lag the shot detector by up to batch_size
+        # frames; the hoop barely moves in that time.
+        pending = []
+        uncached_count = 0
+        for frame in decoder:
+            # Frame numbers start at 1, the same as VideoPlayer.current_frame_num
+            frame_num, timestamp = frame.frame_num, frame.timestamp
+            if track.has(frame_num - 1) or (
+                    self.frame_skipper and not self.frame_skipper.should_detect(shot_detector, timestamp)):
+                decoder.release(frame)
+                pending.append((frame_num, timestamp, None, None))
+            else:
+                roi = self.roi_scheduler.next_roi(shot_detector, frame.image.shape) if self.roi_scheduler else None
+                pending.append((frame_num, timestamp, frame, roi))
+                uncached_count += 1
+
+            # Run inference once the batch is full
+            if uncached_count >= self.batch_size:
+                self._flush_pending(decoder, pending, track, shot_detector, shots)
+                pending = []
+                uncached_count = 0
+
+        # And on whatever is left at the end
+        if pending:
+            self._flush_pending(decoder, pending, track, shot_detector, shots)
+        return frame_num
+
+    def _flush_pending(self, decoder, pending, track, shot_detector, shots):
+        # One model call per distinct region; usually all full frames or all one crop
+        batches = {}
+        for num, _, frame, roi in pending:
+            if frame is not None:
+                batches.setdefault(roi, []).append((num, frame.image))
+        detections = {}
+        for roi, batch in batches.items():
+            frames = [frame for _, frame in batch]
+            if self.kalman_tracker:
+                results = self.yolo_detector.detect_batch_all(frames, roi)
+            else:
+                results = self.yolo_detector.detect_batch(frames, roi)
+            for (num, _), result in zip(batch, results):
+                detections[num] = result
+        for _, _, frame, _ in pending:
+            if frame is not None:
+                decoder.release(frame)
+
+        # Everything stateful sees the frames in order
+        for num, timestamp, frame, roi in pending:
+            if num in detections:
+                if self.kalman_tracker:
+                    ball_boxes, hoop_boxes = detections[num]
+                    ball_bbox = self.kalman_tracker.update(timestamp, ball_boxes)
+                    hoop_bbox = hoop_boxes[0] if hoop_boxes else None
+                else:
+                    ball_bbox, hoop_bbox = detections[num]
+                track.set(num - 1, ball_bbox, hoop_bbox)
+                if self.roi_scheduler:
+                    self.roi_scheduler.report(roi, hoop_bbox)
+            if self.frame_skipper:
+                if frame is None and not track.has(num - 1):
+                    # Skipped: predict from the detections before it, which are in by now
+                    track.set(num - 1, *self.frame_skipper.predict(timestamp))
+                else:
+                    self.frame_skipper.observe(timestamp, *track.get(num - 1))
+            ball_bbox, hoop_bbox = track.get(num - 1)
+            self._update_shot_detector(shot_detector, ball_bbox, hoop_bbox, num, timestamp, shots)
+
+    def _update_shot_detector(self, shot_detector, ball_bbox, hoop_bbox, frame_num, timestamp, shots, station=None):
+        """Feed one frame's detections to the shot detector and record any completed shot"""
+        shot_status, stats, arc_angle, _, avg_speed, _, _ = shot_detector.update(
+            ball_bbox[:4] if ball_bbox else None,
+            hoop_bbox[:4] if hoop_bbox else None,
+            frame_num,
+            timestamp
+        )
+
+        if shot_status in ("MADE", "MISSED"):
+            shot = {
+                "shot": len(shots) + 1,
+                "outcome": shot_status,
+                "start_frame": shot_detector.ball_up_frame,
+                "end_frame": frame_num,
+                "time_sec": round(timestamp, 3),
+                "arc_angle": _round_or_none(arc_angle, 2),
+                "avg_speed": _round_or_none(avg_speed, 1),
+                "made_total": stats[0],
+                "attempted_total": stats[1],
+            }
+            if station is not None:
+                # Totals above are the station's own
+                shot["station"] = station
+            shots.append(shot)
+
+def _round_or_none(value, digits):
+    return round(float(value), digits) if value is not None else None
@@ -0,0 +1,147 @@
+import logging
+import os
+import cv2
+import numpy as np
+
+from models.detection_cache import file_hash
+
+try:
+    import av  # Optional: lets the index be built by demuxing only, without decoding
+    # Renamed from AVError in PyAV 14
+    AV_ERROR = getattr(av, "FFmpegError", None) or av.AVError
+except ImportError:
+    av = None
+    AV_ERROR = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "shottracker", "index")
+
+# Forward jumps of up to this many frames decode ahead instead of seeking. Shared
+# with FrameDecoder's PyAV seeks so both backends make the same trade-off.
+MAX_DECODE_AHEAD = 30
+
+class VideoIndex:
+    """Frame index of a video: the timestamp of every frame and which frames are keyframes.
+
+    Timestamps are in milliseconds from the start of the stream, the same values
+    OpenCV reports as CAP_PROP_POS_MSEC. Frames are indexed from 0 in presentation
+    order. keyframes is empty when they aren't known.
+    """
+    def __init__(self, timestamps_ms, keyframes):
+        self.timestamps_ms = np.asarray(timestamps_ms, dtype=np.float64)
+        self.keyframes = np.asarray(keyframes, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.timestamps_ms)
+
+    @classmethod
+    def load_or_build(cls, video_path, index_dir=None):
+        """Load the cached index of a video, building and caching it on first use"""
+        index_dir = index_dir or os.environ.get("SHOTTRACKER_INDEX_DIR", DEFAULT_INDEX_DIR)
+        index_path = os.path.join(index_dir, file_hash(video_path) + ".npz")
+        if os.path.exists(index_path):
+            try:
+                with np.load(index_path) as data:
+                    return cls(data["timestamps_ms"], data["keyframes"])
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Rebuilding unreadable video index %s: %s", index_path, e)
+
+        index = cls.build(video_path)
+        os.makedirs(index_dir, exist_ok=True)
+        tmp_path = index_path + ".tmp.npz"
+        np.savez(tmp_path, timestamps_ms=index.timestamps_ms, keyframes=index.keyframes)
+        os.replace(tmp_path, index_path)
+        return index
+
+    @classmethod
+    def build(cls, video_path):
+        if av is not None:
+            try:
+                return cls._build_with_pyav(video_path)
+            except AV_ERROR as e:
+                logger.warning("PyAV could not index %s, falling back to OpenCV: %s", video_path, e)
+        return cls._build_with_opencv(video_path)
+
+    @classmethod
+    def _build_with_pyav(cls, video_path):
+        """Read packet timestamps and keyframe flags by demuxing, without decoding"""
+        with av.open(video_path) as container:
+            stream = container.streams.video[0]
+            start_time = stream.start_time or 0
+            time_base = float(stream.time_base)
+            packets = sorted((packet.pts, packet.is_keyframe)
+                             for packet in container.demux(stream) if packet.pts is not None)
+
+        timestamps_ms = [(pts - start_time) * time_base * 1000 for pts, _ in packets]
+        keyframes = [i for i, (_, is_keyframe) in enumerate(packets) if is_keyframe]
+        return cls(timestamps_ms, keyframes)
+
+    @classmethod
+    def _build_with_opencv(cls, video_path):
+        """Timestamps from a grab() pass; OpenCV doesn't expose keyframe flags"""
+        cap = cv2.VideoCapture(video_path)
+        timestamps_ms = []
+        try:
+            while cap.grab():
+                timestamps_ms.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+        finally:
+            cap.release()
+        return cls(timestamps_ms, [])
+
+    def keyframe_at_or_before(self, frame_index):
+        """The keyframe decoding a frame starts from; the frame itself if keyframes aren't known"""
+        if not len(self.keyframes):
+            return frame_index
+        i = np.searchsorted(self.keyframes, frame_index, side="right") - 1
+        return int(self.keyframes[max(i, 0)])
+
+    def frame_at_time(self, timestamp_ms):
+        """Index of the frame closest to a timestamp"""
+        i = int(np.searchsorted(self.timestamps_ms, timestamp_ms))
+        if i > 0 and (i == len(self.timestamps_ms) or
+                      timestamp_ms - self.timestamps_ms[i - 1] < self.timestamps_ms[i] - timestamp_ms):
+            i -= 1
+        return i
+
+    def read_frame(self, cap, frame_index, position=None, image=None):
+        """Position cap on a frame and return it, as cap.read() would.
+
+        position is the index of the frame cap would read next, if known. Forward
+        jumps that stay within a keyframe interval, or are short, just decode ahead
+        from there. Otherwise cap seeks to the target; OpenCV decodes from the
+        keyframe before it. The landing frame is identified by its timestamp and
+        any remaining distance is decoded forward. If cap overshoots, the seek is
+        retried from the previous keyframe (or further back each time, when
+        keyframes aren't known). The frame is decoded into image if given and
+        the right size, as with cap.read(image).
+        """
+        if not 0 <= frame_index < len(self):
+            return False, None
+
+        if position is not None and position <= frame_index and (
+                self.keyframe_at_or_before(frame_index) <= position or
+                frame_index - position <= MAX_DECODE_AHEAD):
+            landed = position - 1
+        else:
+            start = frame_index
+            back_off = 1
+            while True:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+                if not cap.grab():
+                    return False, None
+                landed = self.frame_at_time(cap.get(cv2.CAP_PROP_POS_MSEC))
+                if landed <= frame_index:
+                    break
+                if start == 0:
+                    return False, None
+                # Overshot the target: restart further back
+                keyframe = self.keyframe_at_or_before(start - 1)
+                start = keyframe if keyframe < start - 1 else max(0, start - back_off)
+                back_off *= 2
+
+        while landed < frame_index:
+            if not cap.grab():
+                return False, None
+            landed += 1
+        return cap.retrieve(image)
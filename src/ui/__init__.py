@@ -1,4 +1,5 @@
 from .video_player import VideoPlayer
 from .stats_display import StatsDisplay
 from .video_browser import VideoBrowser
-from .config_dialog import ConfigDialog 
\ No newline at end of file
+from .config_dialog import ConfigDialog
+from .model_loader import ModelLoader
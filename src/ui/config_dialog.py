@@ -1,8 +1,12 @@
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QFileDialog, QSpacerItem, QSizePolicy
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QFileDialog, QSpacerItem,
+                             QSizePolicy, QComboBox, QCheckBox)
 from PyQt5.QtCore import Qt
 
+# Inference sizes offered in the dialog, besides the model's own
+INFERENCE_SIZES = (320, 416, 512, 640, 960, 1280)
+
 class ConfigDialog(QDialog):
-    def __init__(self, current_video_path, current_model_path, parent=None):
+    def __init__(self, current_video_path, current_model_path, parent=None, current_imgsz=None, adaptive=False):
         super().__init__(parent)
         self.setWindowTitle("Configuration")
         self.setModal(True)
@@ -35,6 +39,22 @@ class ConfigDialog(QDialog):
         model_path_layout.addWidget(self.model_path_button)
         layout.addLayout(model_path_layout)
 
+        # Inference size; smaller is faster, larger finds small balls more reliably
+        imgsz_layout = QHBoxLayout()
+        imgsz_label = QLabel("Inference Size:")
+        self.imgsz_combo = QComboBox()
+        self.imgsz_combo.addItem("Model default", None)
+        for size in sorted(set(INFERENCE_SIZES) | ({current_imgsz} if current_imgsz else set())):
+            self.imgsz_combo.addItem(str(size), size)
+        self.imgsz_combo.setCurrentIndex(max(0, self.imgsz_combo.findData(current_imgsz)))
+        self.adaptive_checkbox = QCheckBox("Lower it when playback falls behind")
+        self.adaptive_checkbox.setChecked(adaptive)
+        imgsz_layout.addWidget(imgsz_label)
+        imgsz_layout.addWidget(self.imgsz_combo)
+        imgsz_layout.addWidget(self.adaptive_checkbox)
+        imgsz_layout.addStretch()
+        layout.addLayout(imgsz_layout)
+
         layout.addSpacerItem(QSpacerItem(20, 40, QSizePolicy.Minimum, QSizePolicy.Expanding))
 
         # Buttons
@@ -59,4 +79,8 @@ class ConfigDialog(QDialog):
             self.model_path_edit.setText(path)
 
     def get_paths(self):
-        return self.video_path_edit.text(), self.model_path_edit.text() 
\ No newline at end of file
+        return self.video_path_edit.text(), self.model_path_edit.text()
+
+    def get_inference_settings(self):
+        """(imgsz, adaptive); imgsz is None for the model's own size"""
+        return self.imgsz_combo.currentData(), self.adaptive_checkbox.isChecked()
@@ -0,0 +1,54 @@
+import threading
+
+from PyQt5.QtCore import Qt, QObject, pyqtSignal, pyqtSlot
+
+class ModelLoader(QObject):
+    """Loads a YOLODetector's model on a background thread, so the window stays responsive.
+
+    loaded(success, message) is emitted on the GUI thread once loading finishes.
+    With stage=True the detector keeps using its current model until the new one is
+    applied between frames (see YOLODetector.apply_staged_model), so playback can
+    carry on while it loads; if loading fails the current model stays.
+    """
+    loaded = pyqtSignal(bool, str)
+    _finished = pyqtSignal(int, bool, str)
+
+    def __init__(self, yolo_detector):
+        super().__init__()
+        self.yolo_detector = yolo_detector
+        self.thread = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._finished.connect(self._deliver, Qt.QueuedConnection)
+
+    def start(self, model_path, stage=False):
+        """Start loading model_path; if loads overlap, the one started last wins"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        self.thread = threading.Thread(target=self._load, args=(generation, model_path, stage),
+                                       name="model-loader", daemon=True)
+        self.thread.start()
+
+    def is_loading(self):
+        """True from start() until loaded is emitted"""
+        return self.thread is not None
+
+    def _load(self, generation, model_path, stage):
+        try:
+            model = self.yolo_detector.prepare_model(model_path)
+        except Exception as e:
+            self._finished.emit(generation, False, f"Error loading model {model_path}: {str(e)}")
+            return
+        with self._lock:
+            # A load started since then supersedes this one, even if it finishes first
+            if generation == self._generation:
+                self.yolo_detector.use_model(model, model_path, stage)
+        self._finished.emit(generation, True, "Model loaded successfully")
+
+    @pyqtSlot(int, bool, str)
+    def _deliver(self, generation, success, message):
+        if generation != self._generation:
+            return
+        self.thread = None
+        self.loaded.emit(success, message)
@@ -1,16 +1,15 @@
+import logging
+
 from PyQt5.QtWidgets import QLabel, QGridLayout, QGroupBox, QVBoxLayout
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFontDatabase, QFont
 
+logger = logging.getLogger(__name__)
+
 class StatsDisplay:
     def __init__(self, parent=None):
         self.parent = parent
         
-        # Shot result flash settings
-        self.shot_made_flash_duration = 15
-        self.shot_miss_flash_duration = 15
-        self.shot_made_flash = 0
-        self.shot_miss_flash = 0
         self.previous_shot_outcome = None
         
         # Create statistics group layout
@@ -116,21 +115,15 @@ class StatsDisplay:
         self.fields['status'].setText(status_text)
         
     def set_result(self, result_text, is_made=None):
-        """Set the shot result text and styling"""
+        """Set the shot result text and styling. The flash over the video is drawn by FrameProcessor."""
         self.result_label.setText(result_text)
         
         if is_made is True:
             self.result_label.setStyleSheet("color: #4CAF50; font-weight: bold; font-size: 20px;")
-            self.shot_made_flash = self.shot_made_flash_duration
-            self.shot_miss_flash = 0
             self.previous_shot_outcome = "MADE"
-            print(f"Shot made flash set to {self.shot_made_flash}")
         elif is_made is False:
             self.result_label.setStyleSheet("color: #F44336; font-weight: bold; font-size: 20px;")
-            self.shot_miss_flash = self.shot_miss_flash_duration
-            self.shot_made_flash = 0
             self.previous_shot_outcome = "MISSED"
-            print(f"Shot miss flash set to {self.shot_miss_flash}")
         else:
             self.result_label.setStyleSheet("color: #FFFFFF; font-weight: bold; font-size: 18px;")
             
@@ -145,22 +138,6 @@ class StatsDisplay:
         self.fields['status'].setText("Ready")
         self.set_result("AWAITING SHOT")
         
-        # Reset flash counters and previous outcome
-        self.shot_made_flash = 0
-        self.shot_miss_flash = 0
         self.previous_shot_outcome = None
         
-        print("Statistics display reset")
-        
-    def get_flash_status(self):
-        """Get current flash status for visualization"""
-        if self.shot_made_flash > 0:
-            self.shot_made_flash -= 1
-            print(f"Made flash active: {self.shot_made_flash}")
-            return "MADE", self.shot_made_flash
-        elif self.shot_miss_flash > 0:
-            self.shot_miss_flash -= 1
-            print(f"Miss flash active: {self.shot_miss_flash}")
-            return "MISSED", self.shot_miss_flash
-        else:
-            return None, 0 
\ No newline at end of file
+        logger.debug("Statistics display reset")
@@ -1,7 +1,10 @@
+import logging
 import os
 from PyQt5.QtWidgets import (QPushButton, QVBoxLayout, QHBoxLayout, QLabel, 
                              QListWidget, QListWidgetItem, QGroupBox, QStyle, QFileDialog)
 
+logger = logging.getLogger(__name__)
+
 class VideoBrowser:
     def __init__(self, parent):
         self.parent = parent
@@ -59,6 +62,9 @@ class VideoBrowser:
             
     def populate_video_list(self):
         """Populate the list of available videos"""
+        # Imported here so building the window doesn't load the processors
+        from processors import VIDEO_EXTENSIONS
+
         self.video_files_list_widget.clear()
         self.current_video_files = []
         
@@ -68,7 +74,7 @@ class VideoBrowser:
             return
 
         try:
-            videos = [f for f in os.listdir(self.video_folder_path) if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv'))]
+            videos = [f for f in os.listdir(self.video_folder_path) if f.lower().endswith(VIDEO_EXTENSIONS)]
             if videos:
                 for video_file_name in sorted(videos):
                     self.video_files_list_widget.addItem(QListWidgetItem(video_file_name))
@@ -78,7 +84,7 @@ class VideoBrowser:
                 self.video_files_list_widget.addItem("No video files found in folder.")
                 self.video_files_list_widget.setEnabled(False)
         except Exception as e:
-            print(f"Error populating video list: {e}")
+            logger.error("Error populating video list: %s", e)
             self.video_files_list_widget.addItem("Error reading folder contents.")
             self.video_files_list_widget.setEnabled(False)
     
@@ -94,7 +100,7 @@ class VideoBrowser:
         if os.path.exists(full_video_path):
             self.parent.load_video(full_video_path)
         else:
-            print(f"Error: Selected video file not found: {full_video_path}")
+            logger.error("Selected video file not found: %s", full_video_path)
             if hasattr(self.parent, 'video_player'):
                 self.parent.video_player.video_label.setText(f"Error: File not found\n{selected_video_name}")
                 self.parent.video_player.video_label.setStyleSheet("border: 1px solid #333333; border-radius: 4px; padding: 5px; color: #FF5555;")
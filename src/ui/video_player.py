@@ -1,16 +1,43 @@
-import cv2
 import os
-from PyQt5.QtCore import Qt, QTimer, QPoint
-from PyQt5.QtWidgets import QLabel, QSlider, QPushButton, QVBoxLayout, QHBoxLayout, QStyle
+from PyQt5.QtCore import Qt, QObject, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QLabel, QSlider, QPushButton, QVBoxLayout, QHBoxLayout, QStyle, QSizePolicy
 from PyQt5.QtGui import QImage, QPixmap
 
+# Qt >= 5.14 can wrap OpenCV's BGR frames directly, without a color conversion
+HAS_BGR888 = hasattr(QImage, "Format_BGR888")
+
+# OpenCV, numpy and the processors are imported where they are first used, so the
+# main window can be shown before they load
+
+class PipelineBridge(QObject):
+    """Delivers frames from the pipeline threads to the GUI thread via queued signals"""
+    frame_ready = pyqtSignal(object, int, object, object)
+    finished = pyqtSignal(object)
+
+    def __init__(self, on_frame, on_finished):
+        super().__init__()
+        self._on_frame = on_frame
+        self._on_finished = on_finished
+        self.frame_ready.connect(self._deliver_frame, Qt.QueuedConnection)
+        self.finished.connect(self._deliver_finished, Qt.QueuedConnection)
+
+    @pyqtSlot(object, int, object, object)
+    def _deliver_frame(self, pipeline, frame_num, frame, result):
+        self._on_frame(pipeline, frame_num, frame, result)
+
+    @pyqtSlot(object)
+    def _deliver_finished(self, pipeline):
+        self._on_finished(pipeline)
+
 class VideoPlayer:
     def __init__(self, parent):
         self.parent = parent
         self.video_path = None
-        self.cap = None
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.process_frame)
+        self.pipeline = None
+        self.bridge = PipelineBridge(self.on_pipeline_frame, self.on_pipeline_finished)
+        # Reused buffers for the display-size (and, on old Qt, RGB) copy of each frame
+        self.scaled_buffer = None
+        self.rgb_buffer = None
         self.is_paused = False
         self.current_frame_num = 0
         self.total_frames = 0
@@ -22,6 +49,8 @@ class VideoPlayer:
         self.video_label = QLabel("Please select a video folder to start\nor configure settings.")
         self.video_label.setAlignment(Qt.AlignCenter)
         self.video_label.setMinimumSize(720, 480)
+        # Frames are scaled to the label, so don't let the pixmap size drive the layout
+        self.video_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
         self.video_label.setStyleSheet("border: 1px solid #333333; border-radius: 4px; padding: 5px;")
         self.video_layout.addWidget(self.video_label)
 
@@ -55,7 +84,7 @@ class VideoPlayer:
         
     def toggle_trail(self):
         """Toggle the display of the ball trail"""
-        if hasattr(self.parent, 'ball_tracker'):
+        if getattr(self.parent, 'ball_tracker', None) is not None:
             is_showing = self.parent.ball_tracker.toggle_trail()
             self.btn_toggle_trail.setText("Hide Ball Trail" if is_showing else "Show Ball Trail")
         
@@ -75,16 +104,25 @@ class VideoPlayer:
             self.progress_slider.setEnabled(False)
             return False
             
-        self.cap = cv2.VideoCapture(self.video_path)
-        if not self.cap.isOpened():
+        from processors import FramePipeline
+
+        # Decode, inference and rendering run off the GUI thread; finished
+        # frames come back through the bridge signals
+        pipeline = FramePipeline(
+            self.parent.frame_processor,
+            on_frame=lambda *frame_args: self.bridge.frame_ready.emit(pipeline, *frame_args),
+            on_finished=lambda: self.bridge.finished.emit(pipeline)
+        )
+        if not pipeline.start(self.video_path):
             self.video_label.setText(f"Error loading video: {self.video_path}")
             self.video_label.setStyleSheet("border: 1px solid #333333; border-radius: 4px; padding: 5px; color: #FF5555;")
             self.btn_play_pause.setEnabled(False)
             self.progress_slider.setEnabled(False)
             return False
+        self.pipeline = pipeline
             
         # Video loaded successfully
-        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.total_frames = pipeline.total_frames
         self.progress_slider.setRange(0, self.total_frames if self.total_frames > 0 else 100)
         self.progress_slider.setValue(0)
         self.progress_slider.setEnabled(self.total_frames > 0)
@@ -95,52 +133,80 @@ class VideoPlayer:
         self.btn_play_pause.setIcon(self.parent.style().standardIcon(QStyle.SP_MediaPause))
         self.btn_play_pause.setEnabled(True)
         self.video_label.setStyleSheet("background-color: black; border: 1px solid #333333;")
-        
-        # Start playing
-        self.timer.start(30)  # ~30fps
         return True
         
-    def process_frame(self):
-        """Process and display the next video frame"""
-        if self.parent.frame_processor:
-            self.parent.frame_processor.process_next_frame()
+    def on_pipeline_frame(self, pipeline, frame_num, frame, result):
+        """Show a finished frame from the pipeline (GUI thread)"""
+        try:
+            # Frames can still be queued from a pipeline that has since been replaced
+            if pipeline is not self.pipeline:
+                return
+                
+            self.current_frame_num = frame_num
+            profiler = self.parent.frame_processor.profiler
+            self.parent.frame_processor.apply_result(result)
+            start = profiler.start()
+            self.display_frame(frame)
+            profiler.stop("display", start)
+            
+            # Update progress slider if not currently being pressed by user
+            if not self.progress_slider.isSliderDown():
+                self.progress_slider.setValue(frame_num)
+        finally:
+            pipeline.frame_displayed()
+            
+    def on_pipeline_finished(self, pipeline):
+        if pipeline is self.pipeline:
+            self.handle_video_end()
         
     def display_frame(self, frame):
-        """Display a processed frame"""
+        """Display a processed frame, scaled down to fit the video label"""
         if frame is None:
             return
+        import cv2
+        import numpy as np
             
-        # Simple dark border around the frame
-        border_size = 2
-        bordered_frame = cv2.copyMakeBorder(
-            frame, 
-            border_size, border_size, border_size, border_size, 
-            cv2.BORDER_CONSTANT, 
-            value=(30, 30, 30)  # Dark gray border
-        )
-        
-        rgb_image = cv2.cvtColor(bordered_frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        self.video_label.setPixmap(QPixmap.fromImage(qt_image))
+        # Downscale once, before Qt sees the frame, so every later copy is display-sized.
+        # The border around the video comes from the label's style sheet.
+        pixel_ratio = self.video_label.devicePixelRatioF()
+        target = self.video_label.contentsRect().size() * pixel_ratio
+        h, w = frame.shape[:2]
+        scale = min(target.width() / w, target.height() / h)
+        if 0 < scale < 1:
+            size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            if self.scaled_buffer is None or self.scaled_buffer.shape[1::-1] != size:
+                self.scaled_buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            # Bilinear only touches the source pixels it samples; INTER_AREA would read them all
+            cv2.resize(frame, size, dst=self.scaled_buffer, interpolation=cv2.INTER_LINEAR)
+            frame = self.scaled_buffer
+        elif not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame)
+            
+        h, w, ch = frame.shape
+        if HAS_BGR888:
+            qt_image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_BGR888)
+        else:
+            if self.rgb_buffer is None or self.rgb_buffer.shape != frame.shape:
+                self.rgb_buffer = np.empty_like(frame)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.rgb_buffer)
+            qt_image = QImage(self.rgb_buffer.data, w, h, self.rgb_buffer.strides[0], QImage.Format_RGB888)
+            
+        # fromImage copies the pixels, so the buffers can be reused for the next frame
+        pixmap = QPixmap.fromImage(qt_image)
+        pixmap.setDevicePixelRatio(pixel_ratio)
+        self.video_label.setPixmap(pixmap)
         
     def toggle_play_pause(self):
         """Toggle between playing and pausing the video"""
-        if not self.cap or not self.cap.isOpened():
+        if not self.pipeline:
             return
 
         if self.is_paused:
-            # Check if video ended and user wants to replay
-            current_pos_frames = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
-            if current_pos_frames >= self.total_frames and self.total_frames > 0:
-                self.reset_video()
-            
-            self.timer.start(30)
+            self.pipeline.resume()
             self.btn_play_pause.setText("Pause")
             self.btn_play_pause.setIcon(self.parent.style().standardIcon(QStyle.SP_MediaPause))
         else:
-            self.timer.stop()
+            self.pipeline.pause()
             self.btn_play_pause.setText("Play")
             self.btn_play_pause.setIcon(self.parent.style().standardIcon(QStyle.SP_MediaPlay))
             
@@ -148,11 +214,9 @@ class VideoPlayer:
         
     def stop_video(self):
         """Stop video playback and release resources"""
-        if self.timer.isActive():
-            self.timer.stop()
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
         self.is_paused = True
         self.btn_play_pause.setText("Play")
         self.btn_play_pause.setIcon(self.parent.style().standardIcon(QStyle.SP_MediaPlay))
@@ -160,45 +224,11 @@ class VideoPlayer:
         self.progress_slider.setValue(0)
         self.progress_slider.setEnabled(False)
         
-    def reset_video(self):
-        """Reset video to beginning"""
-        if self.cap:
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            self.current_frame_num = 0
-            self.progress_slider.setValue(0)
-            
-            # Reset other components
-            if hasattr(self.parent, 'shot_detector'):
-                self.parent.shot_detector = self.parent.create_shot_detector()
-            if hasattr(self.parent, 'ball_tracker'):
-                self.parent.ball_tracker.clear_trail()
-            if hasattr(self.parent, 'stats_display'):
-                self.parent.stats_display.reset_stats()
-                
-    def get_frame(self):
-        """Get the next frame from the video"""
-        if not self.cap or not self.cap.isOpened():
-            return None, False
-            
-        ret, frame = self.cap.read()
-        if not ret:
-            self.handle_video_end()
-            return None, False
-            
-        self.current_frame_num += 1
-        # Update progress slider if not currently being pressed by user
-        if not self.progress_slider.isSliderDown():
-            current_pos_frames = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
-            self.progress_slider.setValue(current_pos_frames)
-            
-        return frame, True
-        
     def handle_video_end(self):
         """Handle actions when video playback ends"""
-        self.timer.stop()
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
             
         self.btn_play_pause.setText("Play")
         self.btn_play_pause.setIcon(self.parent.style().standardIcon(QStyle.SP_MediaPlay))
@@ -213,15 +243,7 @@ class VideoPlayer:
             
     def seek_position(self, position):
         """Seek to a specific position in the video"""
-        if self.cap and self.cap.isOpened():
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, position)
-            # Reset tracking state when seeking
-            if hasattr(self.parent, 'shot_detector'):
-                self.parent.shot_detector = self.parent.create_shot_detector()
-            if hasattr(self.parent, 'ball_tracker'):
-                self.parent.ball_tracker.clear_trail()
-            
-            # Read the frame at the new position
-            success, frame = self.cap.read()
-            if success and hasattr(self.parent, 'frame_processor'):
-                self.parent.frame_processor.process_frame(frame) 
\ No newline at end of file
+        if self.pipeline:
+            # The pipeline restores tracking state for the new position and shows its frame, even while paused
+            self.pipeline.seek(position)
+            self.current_frame_num = position
@@ -0,0 +1,141 @@
+import io
+import json
+import logging
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import app_logging
+from app_logging import JsonFormatter, RateLimitFilter, TextFormatter
+
+class Clock:
+    """Stands in for time.monotonic"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(app_logging, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+@pytest.fixture
+def limited(caplog):
+    """A logger limited to 2 messages a second after a burst of 3, recorded by caplog"""
+    logger = logging.getLogger("test.rate_limited")
+    rate_filter = RateLimitFilter(rate=2.0, burst=3)
+    logger.addFilter(rate_filter)
+    caplog.set_level(logging.DEBUG, logger=logger.name)
+    yield logger
+    logger.removeFilter(rate_filter)
+
+def test_repeats_are_suppressed_within_the_window(clock, limited, caplog):
+    for frame in range(10):
+        limited.warning("Frame %d failed", frame)
+    assert [r.getMessage() for r in caplog.records] == ["Frame 0 failed", "Frame 1 failed", "Frame 2 failed"]
+
+    # One token back after half a second; the record let through counts what was dropped
+    clock.now += 0.4
+    limited.warning("Frame %d failed", 10)
+    assert len(caplog.records) == 3
+    clock.now += 0.1
+    limited.warning("Frame %d failed", 11)
+    assert caplog.records[-1].getMessage() == "Frame 11 failed"
+    assert caplog.records[-1].suppressed == 8
+    limited.warning("Frame %d failed", 12)
+    assert len(caplog.records) == 4
+
+    # After a long pause the whole burst is available again, and no more
+    clock.now += 60
+    for frame in range(13, 20):
+        limited.warning("Frame %d failed", frame)
+    assert len(caplog.records) == 7
+    assert caplog.records[4].suppressed == 1
+    assert caplog.records[5].suppressed == 0
+
+def test_messages_are_limited_separately(clock, caplog):
+    # On the handler, as setup_logging does, so records of every logger go through it
+    caplog.handler.addFilter(RateLimitFilter(rate=2.0, burst=3))
+    caplog.set_level(logging.INFO)
+    detector = logging.getLogger("test.detector")
+    decoder = logging.getLogger("test.decoder")
+    for _ in range(5):
+        detector.warning("Hoop lost")
+        detector.info("Hoop lost")
+        detector.warning("Ball lost")
+        decoder.warning("Hoop lost")
+    counts = {}
+    for record in caplog.records:
+        key = (record.name, record.levelname, record.msg)
+        counts[key] = counts.get(key, 0) + 1
+    assert counts == {
+        ("test.detector", "WARNING", "Hoop lost"): 3,
+        ("test.detector", "INFO", "Hoop lost"): 3,
+        ("test.detector", "WARNING", "Ball lost"): 3,
+        ("test.decoder", "WARNING", "Hoop lost"): 3,
+    }
+
+def test_old_keys_are_forgotten(clock):
+    rate_filter = RateLimitFilter(rate=1.0, burst=1, max_keys=3)
+    records = [logging.makeLogRecord({"name": "test", "levelno": logging.INFO, "msg": f"m{i}"})
+               for i in range(4)]
+    assert all(rate_filter.filter(record) for record in records)
+    assert len(rate_filter._buckets) == 1
+    # m0 was forgotten, so it gets a full burst again
+    assert rate_filter.filter(records[0])
+    assert not rate_filter.filter(records[3])
+
+def make_record(**extra):
+    record = logging.LogRecord("shottracker.test", logging.WARNING, __file__, 1,
+                               "Dropped %d frames", (3,), None)
+    record.__dict__.update(extra)
+    return record
+
+def test_json_formatter_fields():
+    entry = json.loads(JsonFormatter().format(make_record(video="clip.mp4", frame=12, suppressed=4)))
+    assert entry["level"] == "WARNING"
+    assert entry["logger"] == "shottracker.test"
+    assert entry["message"] == "Dropped 3 frames"
+    assert entry["video"] == "clip.mp4"
+    assert entry["frame"] == 12
+    assert entry["suppressed"] == 4
+    assert "exception" not in entry
+    assert "args" not in entry and "msg" not in entry
+
+def test_json_formatter_exception():
+    try:
+        raise RuntimeError("decoder failed")
+    except RuntimeError:
+        record = logging.LogRecord("test", logging.ERROR, __file__, 1, "Failed", None, sys.exc_info())
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Failed"
+    assert "RuntimeError: decoder failed" in entry["exception"]
+
+def test_text_formatter_counts_suppressed():
+    assert TextFormatter().format(make_record(suppressed=4)).endswith(
+        "shottracker.test: Dropped 3 frames (4 similar messages suppressed)")
+
+def test_setup_logging_json_end_to_end(monkeypatch):
+    monkeypatch.setattr(app_logging, "_config", None)
+    stream = io.StringIO()
+    root = logging.getLogger()
+    level = root.level
+    try:
+        app_logging.setup_logging("debug", "json", rate=1.0, burst=2, stream=stream)
+        assert app_logging.logging_config() == {"level": logging.DEBUG, "log_format": "json", "rate": 1.0, "burst": 2}
+        logger = logging.getLogger("test.setup")
+        for frame in range(5):
+            logger.info("Frame %d", frame, extra={"video": "clip.mp4"})
+    finally:
+        # Writes out the queued records
+        app_logging.stop_logging()
+        for handler in [h for h in root.handlers if isinstance(h, app_logging._QueueHandler)]:
+            root.removeHandler(handler)
+        root.setLevel(level)
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [entry["message"] for entry in entries] == ["Frame 0", "Frame 1"]
+    assert all(entry["video"] == "clip.mp4" for entry in entries)
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from processors import ShotDetector
+from processors.calibration import load_shot_params, save_shot_params
+
+def test_saved_params_load_into_shot_detector(tmp_path):
+    path = tmp_path / "shot_params.json"
+    save_shot_params({"rim_tolerance": 0.6, "cooldown_frames": 20}, path)
+    params = load_shot_params(path)
+    assert params == {"rim_tolerance": 0.6, "cooldown_frames": 20}
+    detector = ShotDetector(**params)
+    assert detector.rim_tolerance == 0.6
+    assert detector.cooldown_frames == 20
+
+def test_whole_number_floats_load_as_ints(tmp_path):
+    path = tmp_path / "shot_params.json"
+    path.write_text(json.dumps({"cooldown_frames": 20.0}))
+    assert load_shot_params(path) == {"cooldown_frames": 20}
+    assert isinstance(load_shot_params(path)["cooldown_frames"], int)
+
+@pytest.mark.parametrize("data", [
+    {"rim_tolerence": 0.6},
+    {"rim_tolerance": "0.6"},
+    {"cooldown_frames": 12.5},
+    [0.6],
+])
+def test_invalid_params_are_rejected(tmp_path, data):
+    path = tmp_path / "shot_params.json"
+    path.write_text(json.dumps(data))
+    with pytest.raises(ValueError):
+        load_shot_params(path)
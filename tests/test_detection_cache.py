@@ -0,0 +1,106 @@
+import json
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from models.detection_cache import DetectionCache, DetectionTrack
+
+BALL = (10, 20, 30, 40, 0.75)
+HOOP = (100, 50, 160, 90, 0.5)
+
+@pytest.fixture
+def files(tmp_path):
+    """A video and two model files with different contents"""
+    paths = {}
+    for name, content in [("clip.mp4", b"video"), ("other.mp4", b"other video"),
+                          ("best.pt", b"weights"), ("tuned.pt", b"other weights")]:
+        paths[name] = tmp_path / name
+        paths[name].write_bytes(content)
+    return paths
+
+def detector(model_path, ball_conf=0.5, hoop_conf=0.3, imgsz=None):
+    """Stands in for YOLODetector; the cache only reads these attributes"""
+    return SimpleNamespace(model_path=str(model_path), ball_conf_thresh=ball_conf,
+                           hoop_conf_thresh=hoop_conf, imgsz=imgsz)
+
+def make_track():
+    track = DetectionTrack.empty()
+    track.set(0, BALL, HOOP)
+    track.set(2, None, HOOP)
+    track.set_length(4)
+    return track
+
+def test_save_and_load_memory_mapped(tmp_path):
+    cache = DetectionCache(str(tmp_path / "cache"))
+    track = make_track()
+    cache.save("key", track, video="clip.mp4")
+    assert not track.modified
+
+    loaded = cache.load("key")
+    assert isinstance(loaded.data, np.memmap)
+    assert not loaded.data.flags.writeable
+    assert loaded.length_known
+    assert len(loaded) == 4
+    assert [loaded.has(i) for i in range(4)] == [True, False, True, False]
+    assert loaded.get(0) == (BALL, HOOP)
+    assert loaded.get(2) == (None, HOOP)
+    np.testing.assert_array_equal(loaded.data, track.data)
+    with open(os.path.join(cache.cache_dir, "key.json")) as f:
+        assert json.load(f) == {"video": "clip.mp4", "frames": 4, "length_known": True}
+
+    # Writing to a loaded track copies it instead of touching the file
+    loaded.set(1, BALL, None)
+    assert loaded.has(1)
+    assert not cache.load("key").has(1)
+
+def test_missing_entry(tmp_path):
+    assert DetectionCache(str(tmp_path)).load("missing") is None
+
+def test_every_key_component_changes_the_key(tmp_path, files):
+    cache = DetectionCache(str(tmp_path))
+    base = cache.key_for(files["clip.mp4"], detector(files["best.pt"]), "decoder:opencv")
+    cache.save(base, make_track())
+    variants = [
+        cache.key_for(files["other.mp4"], detector(files["best.pt"]), "decoder:opencv"),
+        cache.key_for(files["clip.mp4"], detector(files["tuned.pt"]), "decoder:opencv"),
+        cache.key_for(files["clip.mp4"], detector(files["best.pt"], ball_conf=0.4), "decoder:opencv"),
+        cache.key_for(files["clip.mp4"], detector(files["best.pt"], hoop_conf=0.35), "decoder:opencv"),
+        cache.key_for(files["clip.mp4"], detector(files["best.pt"]), "decoder:pyav"),
+        cache.key_for(files["clip.mp4"], detector(files["best.pt"])),
+        cache.key_for(files["clip.mp4"], detector(files["best.pt"], imgsz=960), "decoder:opencv"),
+    ]
+    assert len(set(variants)) == len(variants)
+    assert base not in variants
+    assert all(cache.load(key) is None for key in variants)
+
+    # The same inputs give the same key, so the entry is found again
+    assert cache.key_for(files["clip.mp4"], detector(files["best.pt"]), "decoder:opencv") == base
+    assert cache.load(base) is not None
+
+def test_save_replaces_entry_atomically(tmp_path, monkeypatch):
+    cache = DetectionCache(str(tmp_path))
+    cache.save("key", make_track())
+    assert sorted(os.listdir(tmp_path)) == ["key.json", "key.npy"]
+
+    # Saving over an entry that is memory-mapped replaces it
+    track = cache.load("key")
+    track.set(1, BALL, None)
+    cache.save("key", track)
+    assert cache.load("key").has(1)
+    assert sorted(os.listdir(tmp_path)) == ["key.json", "key.npy"]
+
+    # A write that dies halfway only leaves the .tmp.npy file behind, never a broken entry
+    def failing_save(path, data):
+        with open(path, "wb") as f:
+            f.write(b"\x93NUMPY")
+        raise OSError("disk full")
+    monkeypatch.setattr(np, "save", failing_save)
+    with pytest.raises(OSError):
+        cache.save("key", DetectionTrack.empty(10))
+    assert os.path.exists(tmp_path / "key.npy.tmp.npy")
+    monkeypatch.undo()
+    loaded = cache.load("key")
+    assert len(loaded) == 4
+    assert loaded.has(1)
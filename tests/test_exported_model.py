@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from models.exported_model import PAD_VALUE, ExportedModel, letterbox, non_max_suppression
+
+def prediction(*boxes, classes=2):
+    """Raw model output for (cx, cy, w, h, conf, cls) boxes, one anchor per box"""
+    output = np.zeros((4 + classes, len(boxes)), dtype=np.float32)
+    for anchor, (cx, cy, w, h, conf, cls) in enumerate(boxes):
+        output[:4, anchor] = cx, cy, w, h
+        output[4 + cls, anchor] = conf
+    return output
+
+class FakeModel(ExportedModel):
+    """A fixed 640x640, batch 1 model whose output is given in letterboxed coordinates"""
+    def __init__(self, output):
+        super().__init__("fake.onnx", {"names": "{0: 'ball', 1: 'hoop'}"}, [1, 3, 640, 640])
+        self.output = output
+        self.blobs = []
+
+    def _run(self, blob):
+        self.blobs.append(blob)
+        return self.output[None]
+
+def test_exported_model_is_abstract():
+    with pytest.raises(TypeError):
+        ExportedModel("model.onnx", {}, [1, 3, 640, 640])
+
+@pytest.mark.parametrize("shape, new_shape, auto, gain, pad, padded", [
+    # Landscape 4:3 keeps its width and is padded 80 above and below
+    ((480, 640), (640, 640), False, (1.0, 1.0), (0, 80), (640, 640)),
+    # Scaled up by 1.28 to 640x384, 128 rows of padding on each side
+    ((300, 500), (640, 640), False, (1.28, 1.28), (0, 128), (640, 640)),
+    # Dynamic models only pad up to the stride, which 384 already is
+    ((300, 500), (640, 640), True, (1.28, 1.28), (0, 0), (384, 640)),
+    # 101 * 3.2 rounds to 323 rows; the odd 317 rows of padding go 158 above, 159 below
+    ((101, 200), (640, 640), False, (640 / 200, 323 / 101), (0, 158), (640, 640)),
+    # Portrait is padded left and right
+    ((640, 320), (640, 640), False, (1.0, 1.0), (160, 0), (640, 640)),
+])
+def test_letterbox_padding(shape, new_shape, auto, gain, pad, padded):
+    image = np.full(shape + (3,), 7, dtype=np.uint8)
+    boxed, boxed_gain, boxed_pad = letterbox(image, new_shape, auto)
+    assert boxed.shape == padded + (3,)
+    assert boxed_gain == pytest.approx(gain)
+    assert boxed_pad == pad
+    left, top = pad
+    new_h, new_w = round(shape[0] * gain[1]), round(shape[1] * gain[0])
+    assert (boxed[top:top + new_h, left:left + new_w] == 7).all()
+    assert (boxed == PAD_VALUE).all(axis=2).sum() == padded[0] * padded[1] - new_h * new_w
+
+def test_nms_suppresses_overlaps_within_a_class_only():
+    output = prediction(
+        (100, 100, 40, 40, 0.9, 0),
+        (102, 100, 40, 40, 0.8, 0),  # IoU 1520 / 1680 with the first: suppressed
+        (102, 100, 40, 40, 0.6, 1),  # Same box but the other class: kept
+        (130, 100, 40, 40, 0.5, 0),  # IoU 400 / 2800 with the first: kept
+        (300, 300, 40, 40, 0.2, 0),  # Below the confidence threshold
+    )
+    boxes = non_max_suppression(output)
+    np.testing.assert_allclose(boxes, [
+        [80, 80, 120, 120, 0.9, 0],
+        [82, 80, 122, 120, 0.6, 1],
+        [110, 80, 150, 120, 0.5, 0],
+    ], rtol=1e-6)
+
+def test_nms_without_candidates():
+    assert non_max_suppression(prediction((100, 100, 40, 40, 0.1, 0))).shape == (0, 6)
+
+def test_predict_scales_boxes_back_to_the_image():
+    # A 300x500 image is letterboxed at a gain of 1.28 with 128 rows of padding on top
+    model = FakeModel(prediction(
+        (150, 248, 100, 80, 0.9, 1),
+        (620, 500, 60, 60, 0.8, 0),  # Reaches past the image's right and bottom edges
+    ))
+    boxes, = model.predict([np.zeros((300, 500, 3), dtype=np.uint8)])
+    np.testing.assert_allclose(boxes, [
+        [100 / 1.28, 80 / 1.28, 200 / 1.28, 160 / 1.28, 0.9, 1],
+        [590 / 1.28, 342 / 1.28, 500, 300, 0.8, 0],
+    ], rtol=1e-6)
+    assert model.blobs[0].shape == (1, 3, 640, 640)
+    assert model.names == {0: "ball", 1: "hoop"}
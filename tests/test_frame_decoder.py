@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+import pytest
+
+from processors.frame_decoder import FrameDecoder
+
+pytest.importorskip("av")
+
+CLIP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "videos", "Test_Vid_02.mp4")
+
+def decode(backend):
+    decoder = FrameDecoder(CLIP, buffers=3, backend=backend)
+    assert decoder.open()
+    assert decoder.backend == backend
+    frames = []
+    for frame in decoder:
+        frames.append((frame.frame_num, frame.image.copy()))
+        decoder.release(frame)
+    decoder.stop()
+    return frames
+
+def test_pyav_frames_match_opencv():
+    # The bundled clips are 10-bit HLG; both backends must convert them to the same colors
+    opencv_frames = decode("opencv")
+    pyav_frames = decode("pyav")
+    assert [num for num, _ in pyav_frames] == [num for num, _ in opencv_frames]
+    for (frame_num, expected), (_, image) in zip(opencv_frames, pyav_frames):
+        assert image.shape == expected.shape
+        difference = np.abs(image.astype(np.int16) - expected.astype(np.int16))
+        assert difference.mean() < 1.0, f"frame {frame_num}"
+        assert np.percentile(difference, 99) <= 8, f"frame {frame_num}"
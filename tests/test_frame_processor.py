@@ -0,0 +1,65 @@
+from models.detection_cache import DetectionTrack
+from processors.frame_processor import FrameProcessor
+from processors.shot_detector import ShotDetector
+
+HOOP = [300, 200, 360, 240, 0.5]
+SHOT_FRAMES = 40
+
+def ball_box(frame_num):
+    """A made shot every SHOT_FRAMES frames: up above the hoop, then down through it"""
+    t = frame_num % SHOT_FRAMES
+    if t >= 30:
+        return None
+    x = 150 + t * 5
+    y = 40 + (t - 15) ** 2 * 1.4
+    return [round(x), round(y), round(x) + 20, round(y) + 20, 0.5]
+
+class ScriptedDetector:
+    """Stands in for YOLODetector; each "frame" is its frame number"""
+    staged = None
+
+    def detect(self, frame, roi=None, imgsz=None):
+        return ball_box(frame), HOOP
+
+def make_processor():
+    processor = FrameProcessor(None, snapshot_interval=15)
+    processor.set_components(None, ShotDetector(), ScriptedDetector(), None, None)
+    processor.detection_cache = object()  # Only _load_track looks at it
+    processor.video_path = "clip.mp4"
+    processor.detection_track = DetectionTrack.empty()
+    return processor
+
+def tracking_state(shot_detector):
+    return shot_detector.get_stats(), shot_detector.frame_counter, shot_detector.shot_in_progress
+
+def play(processor, frame_nums):
+    """Analyze frame_nums in order; returns the tracking state after each"""
+    states = {}
+    for frame_num in frame_nums:
+        processor.analyze_frame(frame_num, frame_num)
+        states[frame_num] = tracking_state(processor.shot_detector)
+    return states
+
+def test_seek_after_dropped_frames_restores_played_state():
+    processor = make_processor()
+    # Play 300 frames, dropping some as late, including ones snapshots would fall on
+    dropped = {30, 31, 32, 44, 45, 90, 121, 122, 123, 124, 125, 200, 201, 260}
+    states = play(processor, [n for n in range(1, 301) if n not in dropped])
+    assert states[300][0][1] >= 5
+
+    for position in (35, 50, 100, 130, 210, 299):
+        processor.restore_tracking(position)
+        last_played = max(n for n in states if n <= position)
+        assert processor.tracking_exact
+        assert tracking_state(processor.shot_detector) == states[last_played]
+
+def test_seek_past_frames_never_played_is_approximate():
+    processor = make_processor()
+    states = play(processor, range(1, 61))
+    processor.restore_tracking(100)
+    assert not processor.tracking_exact
+    assert tracking_state(processor.shot_detector) == states[60]
+
+    # The next frame after the seek doesn't count as one following dropped frames
+    processor.analyze_frame(101, 101)
+    assert 101 not in processor.snapshots
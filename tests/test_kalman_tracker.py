@@ -0,0 +1,89 @@
+import pytest
+
+from models.kalman_tracker import GATE_CHI2, KalmanBallTracker
+
+FPS = 30
+SIZE = 20
+
+def ball(frame_num):
+    """Center of a thrown ball: constant velocity in x, gravity in y (px, px/s, px/s^2)"""
+    t = frame_num / FPS
+    return 100 + 300 * t, 500 - 600 * t + 0.5 * 980 * t * t
+
+def box(center, conf=0.9):
+    x, y = center
+    return (x - SIZE / 2, y - SIZE / 2, x + SIZE / 2, y + SIZE / 2, conf)
+
+def follow(tracker, frames):
+    """Feed the tracker the thrown ball's box on each of the given frames"""
+    for frame_num in frames:
+        tracker.update(frame_num / FPS, [box(ball(frame_num))])
+
+def test_constant_acceleration_estimates():
+    tracker = KalmanBallTracker()
+    follow(tracker, range(30))
+    t = 29 / FPS
+    (x, vx, ax), (y, vy, ay) = tracker.state
+    assert x == pytest.approx(ball(29)[0], abs=0.1)
+    assert y == pytest.approx(ball(29)[1], abs=0.1)
+    assert vx == pytest.approx(300, abs=1)
+    assert vy == pytest.approx(-600 + 980 * t, abs=1)
+    assert ax == pytest.approx(0, abs=10)
+    assert ay == pytest.approx(980, abs=10)
+
+    # Coasting follows the parabola
+    predicted = tracker.update(32 / FPS, [])
+    center_x, center_y = ball(32)
+    assert (predicted[0] + predicted[2]) / 2 == pytest.approx(center_x, abs=2)
+    assert (predicted[1] + predicted[3]) / 2 == pytest.approx(center_y, abs=2)
+
+def test_outlier_outside_gate_is_rejected():
+    tracker = KalmanBallTracker()
+    follow(tracker, range(10))
+    track_id = tracker.track_id
+    outlier = box((ball(10)[0] + 150, ball(10)[1] - 150), conf=0.95)
+    assert tracker._gate_distance(outlier) > GATE_CHI2
+
+    # Alone it leaves the track coasting rather than jumping to it
+    result = tracker.update(10 / FPS, [outlier])
+    assert result != outlier
+    assert (result[0] + result[2]) / 2 == pytest.approx(ball(10)[0], abs=2)
+    assert tracker.coasted == 1
+    assert tracker.track_id == track_id
+
+    # Listed before the real ball, it still loses to it
+    real = box(ball(11))
+    outlier = box((ball(11)[0] + 150, ball(11)[1] - 150), conf=0.95)
+    assert tracker.update(11 / FPS, [outlier, real]) == real
+    assert tracker.coasted == 0
+    assert tracker.track_id == track_id
+
+@pytest.mark.parametrize("confirm_hits", [1, 3, 5])
+def test_unconfirmed_track_is_dropped_on_a_miss(confirm_hits):
+    tracker = KalmanBallTracker(confirm_hits=confirm_hits)
+    follow(tracker, range(confirm_hits - 1))
+    if confirm_hits > 1:
+        assert tracker.update((confirm_hits - 1) / FPS, []) is None
+        assert tracker.state is None
+
+    tracker = KalmanBallTracker(confirm_hits=confirm_hits)
+    follow(tracker, range(confirm_hits))
+    assert tracker.update(confirm_hits / FPS, []) is not None
+    assert tracker.coasted == 1
+
+@pytest.mark.parametrize("max_coast", [0, 2, 5])
+def test_track_ends_after_max_coast_misses(max_coast):
+    tracker = KalmanBallTracker(max_coast=max_coast, coast_conf_decay=0.5)
+    follow(tracker, range(5))
+    for miss in range(1, max_coast + 1):
+        coasted = tracker.update((4 + miss) / FPS, [])
+        assert coasted is not None
+        assert coasted[4] == pytest.approx(0.9 * 0.5 ** miss)
+    assert tracker.update((5 + max_coast) / FPS, []) is None
+    assert tracker.state is None
+
+    # The next detection starts a new track
+    frame_num = 6 + max_coast
+    assert tracker.update(frame_num / FPS, [box(ball(frame_num))]) == box(ball(frame_num))
+    assert tracker.track_id == 2
+    assert tracker.hits == 1
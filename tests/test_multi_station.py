@@ -0,0 +1,32 @@
+from processors.multi_station import MAX_HOOP_CANDIDATES, MultiStationTracker
+
+HOOP = [600, 200, 680, 260, 0.9]
+
+def test_steady_hoop_becomes_station():
+    tracker = MultiStationTracker(min_hoop_hits=5)
+    for _ in range(5):
+        tracker.assign([], [HOOP])
+    assert len(tracker.stations) == 1
+    assert tracker.hoop_candidates == []
+
+def test_sparse_false_positive_hoops_do_not_become_stations():
+    tracker = MultiStationTracker(min_hoop_hits=5, max_hoop_gap=3)
+    # A false-positive hoop box every 20 frames over a long clip
+    for frame in range(1000):
+        tracker.assign([], [HOOP] if frame % 20 == 0 else [])
+    assert tracker.stations == []
+    assert len(tracker.hoop_candidates) <= 1
+
+def test_hoop_with_short_dropouts_still_becomes_station():
+    tracker = MultiStationTracker(min_hoop_hits=5, max_hoop_gap=3)
+    for frame in range(15):
+        tracker.assign([], [HOOP] if frame % 3 == 0 else [])
+    assert len(tracker.stations) == 1
+
+def test_candidate_list_is_capped():
+    tracker = MultiStationTracker(max_hoop_gap=1000)
+    for frame in range(200):
+        x = frame * 100
+        tracker.assign([], [[x, 0, x + 50, 40, 0.5]])
+    assert len(tracker.hoop_candidates) == MAX_HOOP_CANDIDATES
+    assert tracker.stations == []
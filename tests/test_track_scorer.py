@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from processors.shot_detector import DEFAULT_SHOT_PARAMS, ShotDetector
+from processors.track_scorer import score_track
+
+HOOP = (600, 300, 680, 360)
+
+def run_detector(ball_xyxy, hoop_xyxy, params=None):
+    """Shots found by feeding the boxes to ShotDetector.update frame by frame"""
+    detector = ShotDetector(**(params or {}))
+    start_frames, end_frames, made_flags = [], [], []
+    for index, (ball, hoop) in enumerate(zip(ball_xyxy, hoop_xyxy)):
+        up_frame = detector.ball_up_frame
+        status = detector.update(_box(ball), _box(hoop), index + 1)[0]
+        if status in ("MADE", "MISSED"):
+            start_frames.append(up_frame)
+            end_frames.append(index + 1)
+            made_flags.append(status == "MADE")
+    return {
+        "made": sum(made_flags),
+        "attempted": len(made_flags),
+        "start_frames": start_frames,
+        "end_frames": end_frames,
+        "made_flags": made_flags,
+    }
+
+def _box(row):
+    # Whole pixels, as DetectionTrack.get hands them to the live detector
+    return None if np.isnan(row[0]) else tuple(int(value) for value in row)
+
+def assert_same_shots(ball_xyxy, hoop_xyxy, params=None):
+    expected = run_detector(ball_xyxy, hoop_xyxy, params)
+    result = score_track(ball_xyxy, hoop_xyxy, params)
+    assert result["made"] == expected["made"]
+    assert result["attempted"] == expected["attempted"]
+    assert result["start_frames"].tolist() == expected["start_frames"]
+    assert result["end_frames"].tolist() == expected["end_frames"]
+    assert result["made_flags"].tolist() == expected["made_flags"]
+    return result
+
+def shot(start_x, end_x, apex_y, frames, floor_y=650):
+    """Ball centers of a shot rising from the floor to apex_y and falling back to floor_y"""
+    t = np.linspace(0.0, 1.0, frames)
+    xs = start_x + (end_x - start_x) * t
+    ys = floor_y - 4 * (floor_y - apex_y) * t * (1 - t)
+    return np.stack([xs - 10, ys - 10, xs + 10, ys + 10], axis=1)
+
+def clip(*segments, idle=10):
+    """Ball boxes of shots separated by idle frames without a ball, and a steady hoop"""
+    rows = [np.full((idle, 4), np.nan)]
+    for segment in segments:
+        rows += [segment, np.full((idle, 4), np.nan)]
+    ball = np.concatenate(rows)
+    hoop = np.tile(np.array(HOOP, dtype=np.float64), (len(ball), 1))
+    return ball, hoop
+
+def test_made_shot():
+    # Falls through the middle of the hoop
+    result = assert_same_shots(*clip(shot(300, 760, 120, 40)))
+    assert (result["made"], result["attempted"]) == (1, 1)
+
+def test_missed_shot():
+    # Comes down beside the hoop, crossing the rim line outside the tolerance
+    result = assert_same_shots(*clip(shot(300, 880, 120, 40)))
+    assert (result["made"], result["attempted"]) == (0, 1)
+
+def test_second_shot_waits_for_cooldown():
+    # Two quick shots, then the ball rests under the hoop
+    resting = np.tile([630.0, 640.0, 650.0, 660.0], (40, 1))
+    ball, hoop = clip(shot(300, 760, 120, 20), shot(300, 760, 120, 20), resting, idle=0)
+    result = assert_same_shots(ball, hoop)
+    assert result["attempted"] == 2
+    long_cooldown = assert_same_shots(ball, hoop, {"cooldown_frames": 30})
+    assert long_cooldown["attempted"] == 2
+    # Scored on the first frame after the cooldown, not when the ball came down
+    assert long_cooldown["end_frames"][1] == long_cooldown["end_frames"][0] + 30
+    assert long_cooldown["end_frames"][1] > result["end_frames"][1]
+
+def test_non_default_params():
+    ball, hoop = clip(shot(300, 760, 120, 40), shot(300, 880, 120, 40))
+    assert assert_same_shots(ball, hoop, {"rim_tolerance": 0.05})["made"] == 0
+    assert assert_same_shots(ball, hoop, {"rim_tolerance": 3.0})["made"] == 2
+    # The apex no longer reaches an upper zone this high, so nothing is a shot
+    assert assert_same_shots(ball, hoop, {"upper_zone_factor": 4.0})["attempted"] == 0
+
+def test_hoop_dropouts_use_the_averaged_hoop():
+    ball, hoop = clip(shot(300, 760, 120, 40), shot(300, 700, 150, 30))
+    hoop = hoop + np.random.default_rng(1).integers(-6, 7, hoop.shape)
+    hoop[5:40:3] = np.nan
+    assert_same_shots(ball, hoop, {"hoop_history": 3})
+
+def random_clip(rng):
+    segments = []
+    for _ in range(rng.integers(1, 6)):
+        segments.append(shot(rng.uniform(200, 1100), rng.uniform(450, 850), rng.uniform(60, 320),
+                             int(rng.integers(8, 50)), floor_y=rng.uniform(380, 700)))
+    ball, hoop = clip(*segments, idle=int(rng.integers(0, 20)))
+    ball = ball + rng.normal(0, 4, ball.shape)
+    ball[rng.random(len(ball)) < 0.15] = np.nan
+    hoop = hoop + rng.normal(0, 3, hoop.shape)
+    hoop[rng.random(len(hoop)) < 0.3] = np.nan
+    hoop[:int(rng.integers(0, 15))] = np.nan
+    return ball, hoop
+
+def random_params(rng):
+    params = {}
+    for name, default in DEFAULT_SHOT_PARAMS.items():
+        if rng.random() < 0.5:
+            if isinstance(default, int):
+                params[name] = int(rng.integers(1, 2 * default + 1))
+            else:
+                params[name] = float(default * rng.uniform(0.5, 1.5))
+    return params
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random_tracks(seed):
+    rng = np.random.default_rng(seed)
+    made = missed = 0
+    for _ in range(50):
+        ball, hoop = random_clip(rng)
+        result = assert_same_shots(ball, hoop, random_params(rng))
+        made += result["made"]
+        missed += result["attempted"] - result["made"]
+    # The clips exercise both outcomes
+    assert made > 0 and missed > 0
@@ -0,0 +1,61 @@
+import random
+from collections import deque
+
+import numpy as np
+import pytest
+
+from processors.trajectory_buffer import TrajectoryBuffer
+
+def point(i):
+    return (i * 1.5, 1000.0 - i, i + 1, i / 30)
+
+def assert_same(buffer, expected):
+    xs, ys, frames, times = zip(*expected) if expected else ((), (), (), ())
+    assert len(buffer) == len(expected)
+    np.testing.assert_array_equal(buffer.x, xs)
+    np.testing.assert_array_equal(buffer.y, ys)
+    np.testing.assert_array_equal(buffer.frames, frames)
+    np.testing.assert_array_equal(buffer.times, times)
+
+@pytest.mark.parametrize("capacity", [2, 3, 30])
+def test_ring_keeps_latest_points_in_order(capacity):
+    buffer = TrajectoryBuffer(capacity)
+    expected = deque(maxlen=capacity)
+    # Enough appends to compact the 2 * capacity arrays several times
+    for i in range(7 * capacity + 1):
+        buffer.append(*point(i))
+        expected.append(point(i))
+        assert_same(buffer, expected)
+    assert len(buffer._x) == 2 * capacity
+
+def test_growing_keeps_every_point_in_order():
+    buffer = TrajectoryBuffer(4, ring=False)
+    expected = []
+    for i in range(100):
+        buffer.append(*point(i))
+        expected.append(point(i))
+        assert_same(buffer, expected)
+    assert len(buffer._x) == 128
+
+@pytest.mark.parametrize("ring", [True, False])
+def test_clear_and_reset_to_against_deque(ring):
+    rng = random.Random(0)
+    capacity = 5
+    buffer = TrajectoryBuffer(capacity, ring=ring)
+    expected = deque(maxlen=capacity if ring else None)
+    for i in range(500):
+        action = rng.random()
+        if action < 0.05:
+            buffer.clear()
+            expected.clear()
+        elif action < 0.1:
+            buffer.reset_to(*point(i))
+            expected.clear()
+            expected.append(point(i))
+        else:
+            buffer.append(*point(i))
+            expected.append(point(i))
+        assert_same(buffer, expected)
+        if len(expected) >= 2:
+            (x1, y1, _, t1), (x2, y2, _, t2) = expected[-2], expected[-1]
+            assert buffer.last_step() == (x2 - x1, y2 - y1, t2 - t1)